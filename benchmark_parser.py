@@ -0,0 +1,249 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from docx import Document
+
+from lib.parser_faq import (converter_para_markdown, extrair_faqs, extrair_faqs_docx, extrair_tags_e_fonte,
+                            ler_paragrafos_docx, normalizar_para_busca)
+
+# ============================================================================
+# 1. CONFIGURAÇÕES
+# ============================================================================
+CAMINHO_BASELINE = "benchmark_baseline.json"
+TAMANHOS_PADRAO = [1000, 5000]
+REPETICOES_PADRAO = 3
+# Queda de desempenho (ou aumento de memória) acima desta fração conta como regressão
+TOLERANCIA_PADRAO = 0.25
+
+# Peso de cada tipo de bloco no documento sintético
+MIX_PADRAO = {"mesma_linha": 40, "multi_linha": 30, "metadados": 15, "lista": 10, "assunto": 5}
+
+PALAVRAS = ("medicamento", "dose", "vacina", "paciente", "farmácia", "prescrição", "registro", "anvisa",
+            "gestação", "criança", "reação", "adversa", "genérico", "receita", "armazenamento", "validade",
+            "saúde", "atenção", "básica", "insulina", "dipirona", "sus", "uso", "contínuo")
+
+# ============================================================================
+# 2. CORPUS SINTÉTICO
+# ============================================================================
+
+def _frase(rng: random.Random, minimo: int = 6, maximo: int = 18) -> str:
+    return " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(minimo, maximo))).capitalize()
+
+
+def _metadados(rng: random.Random) -> str:
+    tags = ", ".join(rng.sample(PALAVRAS, 3))
+    return f"TAGS: {tags} FONTE: Nota Técnica nº {rng.randint(1, 999)}/{rng.randint(2015, 2025)}."
+
+
+def gerar_paragrafos(total: int, mix: Dict[str, int], semente: int = 42) -> List[tuple]:
+    """(texto, estilo) de cada parágrafo de um documento de FAQ sintético com a mistura pedida."""
+    rng = random.Random(semente)
+    tipos, pesos = zip(*mix.items())
+    paragrafos = []
+    while len(paragrafos) < total:
+        tipo = rng.choices(tipos, pesos)[0]
+        if tipo == "mesma_linha":
+            paragrafos.append((f"{rng.randint(1, 99)}. P: {_frase(rng)}? R: {_frase(rng, 10, 40)}.", None))
+        elif tipo == "multi_linha":
+            paragrafos.append((f"PERGUNTA: {_frase(rng)}?", None))
+            paragrafos.append((f"RESPOSTA: {_frase(rng, 10, 40)}.", None))
+        elif tipo == "metadados":
+            paragrafos.append((f"P: {_frase(rng)}? R: {_frase(rng, 10, 40)}. {_metadados(rng)}", None))
+        elif tipo == "lista":
+            paragrafos.append((f"P: {_frase(rng)}?", None))
+            paragrafos.append((f"R: {_frase(rng, 4, 8)}:", None))
+            for _ in range(rng.randint(2, 4)):
+                paragrafos.append((_frase(rng, 3, 8), "List Bullet"))
+        elif tipo == "assunto":
+            paragrafos.append((f"[ASSUNTO: {_frase(rng, 1, 3)}]", None))
+    return paragrafos[:total]
+
+
+def tipografico(texto: str, rng: random.Random) -> str:
+    """O parágrafo como o Word o deixa ao digitar: aspas curvas, apóstrofo ’, travessão e reticências."""
+    palavras = texto.split()
+    i = rng.randrange(len(palavras))
+    palavras[i] = f"“{palavras[i]}”"
+    return f"{' '.join(palavras)} – conforme a d’água…"
+
+
+def gerar_docx(total: int, mix: Dict[str, int], semente: int = 42) -> bytes:
+    doc = Document()
+    for texto, estilo in gerar_paragrafos(total, mix, semente):
+        doc.add_paragraph(texto, style=estilo)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+# ============================================================================
+# 3. MEDIÇÃO
+# ============================================================================
+
+def medir(funcao: Callable[[], object], repeticoes: int) -> Dict[str, float]:
+    """Melhor tempo entre as repetições e o pico de memória Python (medido numa execução à parte)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"segundos": min(tempos), "pico_mb": pico / 1024 / 1024}
+
+
+def executar_tamanho(total: int, mix: Dict[str, int], repeticoes: int, semente: int,
+                     com_python_docx: bool, pasta_corpus: str = None) -> Dict[str, Dict]:
+    dados = gerar_docx(total, mix, semente)
+    if pasta_corpus:
+        os.makedirs(pasta_corpus, exist_ok=True)
+        with open(os.path.join(pasta_corpus, f"FAQ SINTETICO {total}.docx"), "wb") as f:
+            f.write(dados)
+
+    # Entradas de cada etapa preparadas fora da medição
+    paragrafos = ler_paragrafos_docx(dados)
+    faqs = len(extrair_faqs(paragrafos).faqs)
+    textos = [texto for texto, _ in gerar_paragrafos(total, mix, semente)]
+    rng = random.Random(semente)
+    textos_word = [tipografico(texto, rng) for texto in textos]
+
+    etapas = {
+        "leitor_rapido": lambda: ler_paragrafos_docx(dados, "rapido"),
+        "extrair_faqs": lambda: extrair_faqs(paragrafos),
+        "extrair_tags_e_fonte": lambda: [extrair_tags_e_fonte(paragrafos, i) for i in range(len(paragrafos))],
+        "normalizar_para_busca": lambda: [normalizar_para_busca(t) for t in textos],
+        "normalizar_tipografico": lambda: [normalizar_para_busca(t) for t in textos_word],
+        "docx_para_faqs": lambda: extrair_faqs_docx(dados, "FAQ SINTETICO.docx"),
+    }
+    if com_python_docx:
+        doc_paragrafos = Document(io.BytesIO(dados)).paragraphs
+        etapas["converter_para_markdown"] = lambda: [converter_para_markdown(p) for p in doc_paragrafos
+                                                     if p.text.strip()]
+
+    resultados = {}
+    for nome, funcao in etapas.items():
+        medida = medir(funcao, repeticoes)
+        medida["paragrafos_s"] = len(paragrafos) / medida["segundos"]
+        medida["faqs_s"] = faqs / medida["segundos"]
+        resultados[nome] = medida
+    return {"paragrafos": len(paragrafos), "faqs": faqs, "etapas": resultados}
+
+
+# ============================================================================
+# 4. BASELINE E RELATÓRIO
+# ============================================================================
+
+def comparar(atual: Dict, baseline: Dict, tolerancia: float) -> List[str]:
+    """Etapas que ficaram mais lentas ou gastaram mais memória que a baseline além da tolerância."""
+    regressoes = []
+    for tamanho, resultado in atual.items():
+        base = baseline.get(tamanho)
+        if not base:
+            continue
+        for etapa, medida in resultado["etapas"].items():
+            ref = base["etapas"].get(etapa)
+            if not ref:
+                continue
+            if medida["paragrafos_s"] < ref["paragrafos_s"] * (1 - tolerancia):
+                regressoes.append(f"{etapa} ({tamanho} parágrafos): {medida['paragrafos_s']:,.0f} par/s "
+                                  f"vs {ref['paragrafos_s']:,.0f} na baseline")
+            if medida["pico_mb"] > ref["pico_mb"] * (1 + tolerancia) + 0.5:
+                regressoes.append(f"{etapa} ({tamanho} parágrafos): pico {medida['pico_mb']:.1f} MB "
+                                  f"vs {ref['pico_mb']:.1f} MB na baseline")
+    return regressoes
+
+
+def imprimir_resultados(resultados: Dict, baseline: Dict):
+    for tamanho, resultado in resultados.items():
+        print(f"\n📄 {resultado['paragrafos']} parágrafos / {resultado['faqs']} FAQs")
+        print("─"*86)
+        print(f"{'etapa':<26}{'tempo (s)':>11}{'parágrafos/s':>15}{'FAQs/s':>12}{'pico MB':>10}{'vs baseline':>12}")
+        for etapa, m in resultado["etapas"].items():
+            ref = baseline.get(tamanho, {}).get("etapas", {}).get(etapa)
+            delta = f"{(m['paragrafos_s'] / ref['paragrafos_s'] - 1) * 100:+.0f}%" if ref else "—"
+            print(f"{etapa:<26}{m['segundos']:>11.4f}{m['paragrafos_s']:>15,.0f}{m['faqs_s']:>12,.0f}"
+                  f"{m['pico_mb']:>10.1f}{delta:>12}")
+        print("─"*86)
+
+
+def ler_mix(texto: str) -> Dict[str, int]:
+    mix = {}
+    for parte in texto.split(","):
+        tipo, peso = parte.split("=")
+        if tipo.strip() not in MIX_PADRAO:
+            raise argparse.ArgumentTypeError(f"tipo de bloco desconhecido: {tipo} (use {', '.join(MIX_PADRAO)})")
+        mix[tipo.strip()] = int(peso)
+    return mix
+
+
+def ler_argumentos(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark do parser de FAQs com documentos sintéticos.")
+    parser.add_argument("--paragrafos", default=",".join(map(str, TAMANHOS_PADRAO)),
+                        help="Tamanhos dos documentos, separados por vírgula")
+    parser.add_argument("--mix", type=ler_mix, default=MIX_PADRAO,
+                        help="Peso de cada tipo de bloco, ex.: mesma_linha=40,multi_linha=30,lista=10")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE, help="Arquivo JSON com os resultados de referência")
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava os resultados como nova baseline")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument("--falhar-em-regressao", action="store_true", help="Sai com código 1 se houver regressão")
+    parser.add_argument("--sem-python-docx", action="store_true", help="Não mede a etapa converter_para_markdown")
+    parser.add_argument("--salvar-corpus", metavar="PASTA", help="Guarda os .docx sintéticos gerados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = ler_argumentos(argv)
+    tamanhos = [int(t) for t in args.paragrafos.split(",")]
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            salvo = json.load(f)
+        if salvo.get("mix") == args.mix:
+            baseline = salvo["resultados"]
+        else:
+            print("⚠️ Baseline gerada com outro mix de blocos; comparação ignorada.")
+
+    print(f"🧪 Benchmark do parser — mix {args.mix}, {args.repeticoes} repetições")
+    resultados = {}
+    for total in tamanhos:
+        resultados[str(total)] = executar_tamanho(total, args.mix, args.repeticoes, args.semente,
+                                                  not args.sem_python_docx, args.salvar_corpus)
+    imprimir_resultados(resultados, baseline)
+
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    for r in regressoes:
+        print(f"🐢 Regressão: {r}")
+    if baseline and not regressoes:
+        print(f"✅ Nenhuma regressão acima de {args.tolerancia:.0%} em relação à baseline.")
+
+    if args.salvar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "gerado_em": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "maquina": platform.machine(),
+                "mix": args.mix,
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 Baseline salva em {args.baseline}")
+
+    return 1 if regressoes and args.falhar_em_regressao else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
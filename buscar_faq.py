@@ -0,0 +1,144 @@
+"""
+Busca híbrida nas FAQs: o mesmo caminho de leitura que o chatbot usa (lib/recuperacao.py).
+
+Gera o vetor da pergunta com cache (memória + cache local em disco), roda o $vectorSearch do
+Atlas (ou o índice local, com --local/--snapshot) e funde o resultado com a busca lexical em
+question_normalized, tags e categoria (índice invertido BM25 mantido pela sincronização, ou o
+índice $text do MongoDB enquanto ele não existe). Sem argumento de pergunta, abre um modo interativo.
+"""
+
+import os
+import time
+import argparse
+import logging
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from lib.busca_local import IndiceLocal
+from lib.cache_local import CacheLocalEmbeddings
+from lib.gemini_embendding import ServicoEmbedding
+from lib.indice_lexical import COL_INDICE_LEXICAL, IndiceLexical
+from lib.perfil_embedding import carregar_perfil
+from lib.recuperacao import (CONSULTAS_EM_CACHE, TTL_CONSULTA_SEGUNDOS, CacheConsultas,
+                             ClienteEmbeddingConsultas, Recuperador)
+from lib.troca_colecao import colecao_ativa
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+URI_MONGO = os.getenv("MONGODB_URI")
+DB_NAME = "ministerio_saude"
+COL_DADOS = "faq_medicamentos"
+COL_META = "sync_metadata"
+
+TAMANHO_RESPOSTA = 160
+
+
+def ler_argumentos(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Busca híbrida (vetorial + lexical) nas FAQs.")
+    parser.add_argument("pergunta", nargs="?", help="Pergunta a ser buscada (sem ela, abre o modo interativo)")
+    parser.add_argument("-k", type=int, default=5, help="Quantidade de resultados (padrão: 5)")
+    parser.add_argument("--categoria", help="Filtra por categoria")
+    parser.add_argument("--local", action="store_true",
+                        help="Busca vetorial no índice em memória (lib/busca_local.py) em vez do Atlas")
+    parser.add_argument("--snapshot", help="Com --local, carrega os vetores de um snapshot .npz")
+    parser.add_argument("--sem-cache-local", action="store_true",
+                        help="Não usa o cache em disco para os vetores das perguntas")
+    parser.add_argument("--lexical-atlas", action="store_true",
+                        help="Busca lexical pelo índice $text do MongoDB em vez do índice invertido em memória")
+    return parser.parse_args(argv)
+
+
+def carregar_indice_lexical(db):
+    """Índice invertido mantido pela sincronização; sem ele (ainda não sincronizado), a busca usa o $text."""
+    inicio = time.perf_counter()
+    col_indice = db[COL_INDICE_LEXICAL]
+    if not col_indice.estimated_document_count():
+        logger.info("📚 Índice lexical ainda vazio; usando o índice de texto do MongoDB.")
+        return None
+    indice = IndiceLexical.do_mongo(col_indice)
+    logger.info(f"📚 Índice lexical com {len(indice)} FAQs e {len(indice.postings)} termos carregado em "
+                f"{time.perf_counter() - inicio:.2f}s.")
+    return indice
+
+
+def imprimir_resultados(pergunta: str, resultados, tempo_ms: float):
+    print("\n" + "═"*60)
+    print(f"🔎 {pergunta}")
+    print("─"*60)
+    if not resultados:
+        print("⚠️ Nenhuma FAQ encontrada.")
+    for posicao, r in enumerate(resultados, start=1):
+        resposta = r.resposta if len(r.resposta) <= TAMANHO_RESPOSTA else r.resposta[:TAMANHO_RESPOSTA] + "…"
+        print(f"{posicao}. ({r.score:.4f} | {' + '.join(r.origens)}) {r.pergunta}")
+        print(f"   💬 {resposta}")
+        print(f"   📂 {r.categoria} — {r.arquivo}, linha {r.linha}")
+    print("─"*60)
+    print(f"⏱️  {tempo_ms:.1f} ms")
+    print("═"*60 + "\n")
+
+
+def main(argv=None):
+    args = ler_argumentos(argv)
+    if not URI_MONGO:
+        raise ValueError("❌ MONGODB_URI não definido! Configure no arquivo .env")
+
+    cache = CacheConsultas(int(os.getenv("CONSULTAS_EM_CACHE", CONSULTAS_EM_CACHE)),
+                           float(os.getenv("TTL_CONSULTA_SEGUNDOS", TTL_CONSULTA_SEGUNDOS)))
+    cache_local = None
+    client = MongoClient(URI_MONGO)
+
+    try:
+        db = client[DB_NAME]
+        col_dados = db[colecao_ativa(db[COL_META], COL_DADOS)]
+        perfil = carregar_perfil(db[COL_META])
+        if not args.sem_cache_local:
+            cache_local = CacheLocalEmbeddings(perfil.modelo, perfil.dimensao)
+        indice_local = None
+        if args.local:
+            indice_local = (IndiceLocal.do_snapshot(args.snapshot) if args.snapshot
+                            else IndiceLocal.do_mongo(col_dados, perfil.dimensao, campo=perfil.campo))
+            logger.info(f"📥 {len(indice_local)} vetores carregados para a busca local.")
+        indice_lexical = None if args.lexical_atlas else carregar_indice_lexical(db)
+
+        with ServicoEmbedding(modelo=perfil.modelo, dimensao=perfil.dimensao) as servico:
+            cliente = ClienteEmbeddingConsultas(servico, cache, cache_local)
+            recuperador = Recuperador(col_dados, cliente, perfil, indice_local, indice_lexical)
+
+            perguntas = [args.pergunta] if args.pergunta else None
+            while True:
+                if perguntas is None:
+                    try:
+                        pergunta = input("❓ Pergunta (vazio para sair): ").strip()
+                    except EOFError:
+                        break
+                    if not pergunta:
+                        break
+                elif perguntas:
+                    pergunta = perguntas.pop()
+                else:
+                    break
+
+                inicio = time.perf_counter()
+                resultados = recuperador.buscar(pergunta, args.k, categoria=args.categoria)
+                imprimir_resultados(pergunta, resultados, (time.perf_counter() - inicio) * 1000)
+
+        logger.info(f"🧠 Cache de consultas: {cache.acertos} acertos, {cache.faltas} faltas, "
+                    f"{cliente.chamadas_api} chamadas ao Gemini.")
+    finally:
+        client.close()
+        if cache_local:
+            cache_local.fechar()
+
+
+if __name__ == "__main__":
+    main()
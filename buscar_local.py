@@ -0,0 +1,118 @@
+"""
+Busca semântica local nas FAQs, sem o $vectorSearch do Atlas.
+
+Carrega os vetores de `faq_medicamentos` (ou de um snapshot .npz) para a memória e devolve
+as FAQs mais parecidas com a pergunta, com os mesmos filtros do índice vetorial (isActive e category).
+"""
+
+import os
+import time
+import argparse
+import logging
+from typing import Tuple
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from lib.busca_local import DOCS_PARA_APROXIMADO, SONDAS_PADRAO, IndiceLocal
+from lib.gemini_embendding import ServicoEmbedding
+from lib.perfil_embedding import PerfilEmbedding, carregar_perfil
+from lib.troca_colecao import colecao_ativa
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+URI_MONGO = os.getenv("MONGODB_URI")
+DB_NAME = "ministerio_saude"
+COL_DADOS = "faq_medicamentos"
+COL_META = "sync_metadata"
+
+TAMANHO_RESPOSTA = 160
+
+
+def ler_argumentos(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Busca semântica local nas FAQs (sem Atlas).")
+    parser.add_argument("pergunta", nargs="?", help="Pergunta a ser buscada")
+    parser.add_argument("-k", type=int, default=5, help="Quantidade de resultados (padrão: 5)")
+    parser.add_argument("--categoria", help="Filtra por categoria (mesmo filtro do índice do Atlas)")
+    parser.add_argument("--incluir-inativas", action="store_true", help="Inclui FAQs com isActive=false")
+    parser.add_argument("--snapshot", help="Carrega os vetores de um snapshot .npz em vez do MongoDB")
+    parser.add_argument("--salvar-snapshot", metavar="ARQUIVO", help="Grava os vetores carregados em um .npz")
+    parser.add_argument("--aproximado", action="store_true",
+                        help=f"Usa o índice aproximado IVF (útil acima de ~{DOCS_PARA_APROXIMADO:,} FAQs)")
+    parser.add_argument("--sondas", type=int, default=SONDAS_PADRAO, help="Células do IVF visitadas por busca")
+    return parser.parse_args(argv)
+
+
+def carregar_indice(args) -> Tuple[IndiceLocal, PerfilEmbedding]:
+    """Índice em memória e o perfil de embedding dos vetores carregados."""
+    inicio = time.perf_counter()
+    if args.snapshot:
+        perfil = carregar_perfil()
+        indice = IndiceLocal.do_snapshot(args.snapshot)
+        origem = args.snapshot
+    else:
+        if not URI_MONGO:
+            raise ValueError("❌ MONGODB_URI não definido! Configure no arquivo .env ou use --snapshot")
+        client = MongoClient(URI_MONGO)
+        try:
+            db = client[DB_NAME]
+            nome_dados = colecao_ativa(db[COL_META], COL_DADOS)
+            perfil = carregar_perfil(db[COL_META])
+            indice = IndiceLocal.do_mongo(db[nome_dados], perfil.dimensao, campo=perfil.campo)
+        finally:
+            client.close()
+        origem = f"{DB_NAME}.{nome_dados}"
+    logger.info(f"📥 {len(indice)} vetores carregados de {origem} em {time.perf_counter() - inicio:.2f}s "
+                f"({indice.matriz.nbytes / 1024 / 1024:.1f} MB em memória).")
+    if args.salvar_snapshot:
+        indice.salvar_snapshot(args.salvar_snapshot)
+        logger.info(f"💾 Snapshot salvo em {args.salvar_snapshot}")
+    return indice, perfil
+
+
+def main(argv=None):
+    args = ler_argumentos(argv)
+    indice, perfil = carregar_indice(args)
+    if not args.pergunta:
+        return
+
+    if args.aproximado:
+        inicio = time.perf_counter()
+        ivf = indice.construir_ivf()
+        logger.info(f"🧭 Índice IVF com {ivf.n_listas} células construído em {time.perf_counter() - inicio:.2f}s.")
+
+    with ServicoEmbedding(modelo=perfil.modelo, dimensao=perfil.dimensao) as servico:
+        consulta = servico.gerar(args.pergunta)
+
+    inicio = time.perf_counter()
+    resultados = indice.buscar(consulta, args.k, categoria=args.categoria, somente_ativos=not args.incluir_inativas,
+                               aproximado=args.aproximado, n_sondas=args.sondas)
+    tempo_ms = (time.perf_counter() - inicio) * 1000
+
+    print("\n" + "═"*60)
+    print(f"🔎 {args.pergunta}")
+    print("─"*60)
+    if not resultados:
+        print("⚠️ Nenhuma FAQ encontrada com esses filtros.")
+    for posicao, r in enumerate(resultados, start=1):
+        resposta = r.resposta if len(r.resposta) <= TAMANHO_RESPOSTA else r.resposta[:TAMANHO_RESPOSTA] + "…"
+        inativa = "" if r.ativo else " [inativa]"
+        print(f"{posicao}. ({r.score:.3f}) {r.pergunta}{inativa}")
+        print(f"   💬 {resposta}")
+        print(f"   📂 {r.categoria} — {r.arquivo}, linha {r.linha}")
+    print("─"*60)
+    print(f"⏱️  Busca {'aproximada' if args.aproximado else 'exata'} em {tempo_ms:.1f} ms")
+    print("═"*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,58 @@
+import time
+INICIO_PROCESSO = time.perf_counter()  # Antes dos imports: o --check mede a partida inteira
+
 import os
-import re
-import io
 import logging
-import unicodedata
-import time
-import hashlib
+import argparse
+from contextlib import nullcontext
 from datetime import datetime, timezone
-from typing import List, Tuple, Dict, Optional
+from typing import Iterator, List, Tuple, Dict, Optional
 
-# Bibliotecas externas
+# Bibliotecas externas (pymongo, googleapiclient, google-genai e python-docx só são importados quando usados)
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from pymongo.operations import SearchIndexModel
-from docx import Document
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 
 # Módulos locais
-from lib.gemini_embendding import gerarEmbedding
+from lib.gemini_embendding import ServicoEmbedding
+from lib.agendador_embedding import AgendadorEmbedding
+from lib.cache_local import CacheLocalEmbeddings
+from lib.pipeline_sync import (ConfigPipeline, PipelineSync, ARQUIVOS_POR_LOTE_GRAVACAO, DOWNLOADS_PARALELOS,
+                               PARSERS_PARALELOS, TAMANHO_FILA)
+from lib.drive_cliente import ClienteDrive, documento_descoberta
+from lib.drive_listagem import listar_pasta_recursiva
+from lib.reconciliacao import Reconciliador
+from lib.indice_lexical import COL_INDICE_LEXICAL, atualizar_arquivos, construir_indice, remover_arquivos
+from lib.parser_faq import extrair_faqs_docx, normalizar_para_busca
+from lib.perfil_embedding import PerfilEmbedding, carregar_perfil, dimensao_do_indice
+from lib.recuperacao import INDICE_TEXTO, garantir_indice_texto
+from lib.troca_colecao import colecao_ativa
+from lib.coordenacao import (CHAVE_BACKLOG, DURACAO_LEASE, LeasesArquivos, OrcamentoCompartilhado, id_trabalhador,
+                             rodada_atual, sessao_sincronizacao)
+from lib.metricas import MetricasExecucao, ProgressoAmostrado, iniciar_log_em_fila, parar_log_em_fila
+from lib.perfilador import PASTA_PERFIS, UM_PERFIL_POR_PROCESSO, Perfilador
+from lib.orcamento_embedding import (COL_BACKLOG, POLITICAS, AlocadorOrcamento, BacklogEmbeddings,
+                                     carregar_politica)
+from lib.planejador import carregar_metadados, montar_plano, estimar_embeddings, imprimir_plano
+from lib.vetores import Vetor
+from lib.repositorio_embeddings import (COL_EMBEDDINGS, RepositorioEmbeddings, gerar_hash_conteudo,
+                                       texto_para_embedding)
+from lib.drive_mudancas import (carregar_estado, salvar_estado, obter_token_inicial, listar_mudancas,
+                                desativar_arquivos_removidos, filtrar_conhecidos)
 
 # ============================================================================
 # 1. CONFIGURAÇÕES E LOGGING
 # ============================================================================
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler("sync_ms_inteligente.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+ARQUIVO_LOG = "sync_ms_inteligente.log"
 logger = logging.getLogger(__name__)
 
+def configurar_log(em_arquivo: bool = True):
+    """Chamado no main (e não no import): o --check e quem importa o módulo não tocam no arquivo de log."""
+    handlers = [logging.StreamHandler()]
+    if em_arquivo:
+        handlers.insert(0, logging.FileHandler(ARQUIVO_LOG, encoding='utf-8'))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', handlers=handlers)
+
 # Configurações do Ambiente (carregadas do arquivo .env)
 ID_PASTA_DRIVE = os.getenv("ID_PASTA_DRIVE")
 FILE_CREDENTIALS = os.getenv("FILE_CREDENTIALS", "credentials.json")
@@ -46,315 +64,646 @@ if not URI_MONGO:
     raise ValueError("❌ MONGODB_URI não definido! Configure no arquivo .env")
 DB_NAME = "ministerio_saude"
 COL_DADOS = "faq_medicamentos"
+# Relatório JSON de cada execução e textfile do Prometheus (node_exporter)
+PASTA_METRICAS = os.getenv("METRICAS_DIR", ".metricas")
 COL_META = "sync_metadata" 
 
 # ============================================================================
-# 2. FERRAMENTAS DE TRATAMENTO DE TEXTO
+# 2. CONFIGURAÇÃO DO ÍNDICE VETORIAL ATLAS
 # ============================================================================
 
-def normalizar_para_busca(texto: str) -> str:
-    """Padroniza o texto para que o chatbot encontre respostas sem erro de acento."""
-    if not texto: return ""
-    nksel = unicodedata.normalize('NFKD', texto)
-    sem_acentos = "".join([c for c in nksel if not unicodedata.combining(c)])
-    limpo = re.sub(r'[^\w\s]', '', sem_acentos)
-    return re.sub(r'\s+', ' ', limpo).strip().lower()
-
-def converter_para_markdown(p) -> str:
-    """Preserva a formatação de listas do Word para o Chatbot."""
-    texto = p.text.strip()
-    if p.style.name.startswith('List') or texto.startswith(('•', '-', '*', '➢')):
-        texto_limpo = re.sub(r'^[•\-*➢]\s*', '', texto)
-        return f"- {texto_limpo}"
-    return texto
-
-def extrair_tags_e_fonte(paragrafos: List[str], i: int) -> Tuple[List[str], str]:
-    """Busca metadados ao redor da pergunta/resposta encontrada."""
-    janela = " ".join(paragrafos[max(0, i-1):min(len(paragrafos), i+2)])
-    
-    f_match = re.search(r'(?:FONTE:|Ref:|\(Ref:)\s*([^)\n\t]+)', janela, re.IGNORECASE)
-    fonte = f_match.group(1).strip().rstrip('.)') if f_match else ""
-
-    t_match = re.search(r'TAGS:\s*(.+?)(?=\s*P:|\s*PERGUNTA:|$|\n)', janela, re.IGNORECASE)
-    tags = [t.strip().lower() for t in re.split(r'[,\s]+', t_match.group(1).replace('#', '')) if t.strip()] if t_match else []
-    
-    return tags, fonte
-
-def gerar_hash_conteudo(pergunta: str, resposta: str) -> str:
-    """Gera hash MD5 do conteúdo para detectar mudanças."""
-    conteudo = f"{pergunta}|{resposta}"
-    return hashlib.md5(conteudo.encode('utf-8')).hexdigest()
-
-def carregar_embeddings_existentes(collection, file_id: str) -> Dict[str, List[float]]:
-    """Carrega embeddings existentes indexados por hash do conteúdo."""
-    cache = {}
-    docs = collection.find(
-        {"file_id": file_id, "content_hash": {"$exists": True}, "embedding": {"$ne": None}},
-        {"content_hash": 1, "embedding": 1}
-    )
-    for doc in docs:
-        cache[doc["content_hash"]] = doc["embedding"]
-    return cache
-
-# ============================================================================
-# 3. CONFIGURAÇÃO DO ÍNDICE VETORIAL ATLAS
-# ============================================================================
-
-def criar_indice_vetorial(collection):
-    """Cria o índice vetorial no MongoDB Atlas para busca semântica."""
-    INDEX_NAME = "vector_index"
-    
+def criar_indice_vetorial(collection, perfil: PerfilEmbedding):
+    """Cria o índice vetorial no MongoDB Atlas para busca semântica, com a definição gerada pelo perfil."""
     # Verifica se o índice já existe
-    existing_indexes = list(collection.list_search_indexes())
-    if any(idx.get("name") == INDEX_NAME for idx in existing_indexes):
-        logger.info(f"✅ Índice vetorial '{INDEX_NAME}' já existe.")
+    dim_atual = dimensao_do_indice(collection.list_search_indexes(), perfil.indice)
+    if dim_atual == perfil.dimensao:
+        logger.info(f"✅ Índice vetorial '{perfil.indice}' já existe.")
+        return
+    if dim_atual is not None:
+        logger.warning(f"⚠️ Índice vetorial '{perfil.indice}' tem {dim_atual} dimensões, mas o perfil usa {perfil.dimensao}. "
+                       f"Rode limpar_banco.py --reconstruir para trocar sem indisponibilidade.")
         return
-    
-    search_index_model = SearchIndexModel(
-        definition={
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "embedding",
-                    "numDimensions": 3072,
-                    "similarity": "cosine"
-                },
-                {
-                    "type": "filter",
-                    "path": "isActive"
-                },
-                {
-                    "type": "filter",
-                    "path": "category"
-                }
-            ]
-        },
-        name=INDEX_NAME,
-        type="vectorSearch"
-    )
     
     try:
-        collection.create_search_index(model=search_index_model)
-        logger.info(f"✅ Índice vetorial '{INDEX_NAME}' criado com sucesso.")
+        collection.create_search_index(model=perfil.modelo_indice())
+        logger.info(f"✅ Índice vetorial '{perfil.indice}' criado com sucesso ({perfil}).")
     except Exception as e:
         logger.warning(f"⚠️ Não foi possível criar índice vetorial: {e}")
 
+def criar_indice_texto(collection):
+    """Índice de texto em question_normalized/tags usado pela busca lexical (lib/recuperacao.py)."""
+    try:
+        garantir_indice_texto(collection)
+        logger.info(f"✅ Índice de texto '{INDICE_TEXTO}' pronto.")
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível criar índice de texto: {e}")
+
 # ============================================================================
-# 4. LÓGICA DE SINCRONIZAÇÃO INTELIGENTE
+# 3. LÓGICA DE SINCRONIZAÇÃO INTELIGENTE
 # ============================================================================
 
-# Limite máximo de embeddings novos gerados por execução (após atingir, envia sem embedding)
+# Limite máximo de embeddings novos gerados por execução, repartido entre os arquivos pela política de
+# orçamento (lib/orcamento_embedding.py); o excedente é enviado sem embedding e entra no backlog
 LIMITE_EMBEDDINGS = 700
 
-def processar_faqs_drive(db) -> Tuple[int, int]:
-    col_dados = db[COL_DADOS]
+def extrair_faqs_arquivo(trabalho: Dict) -> Dict:
+    """Etapa de parse: transforma o .docx baixado nos itens de FAQ (o vetor é posto depois, no campo do perfil).
+
+    Roda em um processo separado no modo paralelo, por isso recebe e devolve só dados simples.
+    """
+    arq = trabalho['arquivo']
+    file_id = arq['id']
+    nome_arq = arq['name']
+
+    resultado = extrair_faqs_docx(trabalho.pop('conteudo'), nome_arq)
+    for aviso in resultado.avisos:
+        logger.warning(f"  ⚠️ {aviso.mensagem} na linha {aviso.linha} de '{nome_arq}'")
+
+    agora = datetime.now(timezone.utc)
+    lote_arquivo = [{
+        "question": faq.pergunta,
+        "question_normalized": normalizar_para_busca(faq.pergunta),
+        "answer": faq.resposta,
+        "category": faq.categoria,
+        "tags": faq.tags,
+        "source": faq.fonte,
+        "file_id": file_id,
+        "file_origin": nome_arq,
+        "line_reference": faq.linha,
+        "content_hash": gerar_hash_conteudo(faq.pergunta, faq.resposta),  # Hash para cache de embeddings
+        "isActive": True,
+        "updatedAt": agora
+    } for faq in resultado.faqs]
+
+    trabalho['itens'] = lote_arquivo
+    return trabalho
+
+
+class EtapaEmbedding:
+    """
+    Etapa de embedding: reaproveita vetores já conhecidos e gera os novos em lote, dentro da cota de cada
+    arquivo dada pelo alocador. O que não cabe na cota vai para o backlog, com a prioridade do arquivo.
+    """
+
+    def __init__(self, cache_embeddings: Dict[str, Vetor], repositorio: RepositorioEmbeddings,
+                 agendador: AgendadorEmbedding, perfil: PerfilEmbedding, alocador: AlocadorOrcamento,
+                 backlog: Optional[BacklogEmbeddings] = None, metricas: Optional[MetricasExecucao] = None):
+        self.cache_embeddings = cache_embeddings  # content_hash → embedding, carregado uma vez pelo planejador
+        self.repositorio = repositorio            # Armazém global onde os vetores novos são guardados
+        self.agendador = agendador
+        self.perfil = perfil                      # Formato em que o vetor é gravado nas FAQs
+        self.alocador = alocador                  # Cota de embeddings novos de cada arquivo nesta execução
+        self.backlog = backlog
+        self.metricas = metricas
+        self.embedding_desativado = False   # Flag: True = cota da API esgotada, nada mais é gerado
+        self.avisou_orcamento = False
+
+    def __call__(self, trabalhos: List[Dict]):
+        # content_hash → (trabalho, item) que precisam desse vetor; textos repetidos viram uma só chamada
+        pendentes: Dict[str, List[Tuple[Dict, Dict]]] = {}
+        for trabalho in trabalhos:
+            trabalho['embeddings_reutilizados'] = 0
+            trabalho['embeddings_gerados'] = 0
+            for item in trabalho['itens']:
+                item.setdefault(self.perfil.campo, None)
+                vetor = self.cache_embeddings.get(item['content_hash'])
+                if vetor is not None:
+                    item[self.perfil.campo] = self.perfil.codificar(vetor)
+                    trabalho['embeddings_reutilizados'] += 1
+                else:
+                    pendentes.setdefault(item['content_hash'], []).append((trabalho, item))
+
+        if not pendentes:
+            return
+
+        # Vetores do cache local em disco não gastam API nem contam para o orçamento da execução
+        textos_por_hash = {h: texto_para_embedding(itens[0][1]['question'], itens[0][1]['answer'])
+                           for h, itens in pendentes.items()}
+        do_cache_local = self.agendador.buscar_cache_local(list(textos_por_hash.values()))
+        recuperados = {}
+        for content_hash, texto in textos_por_hash.items():
+            if texto in do_cache_local:
+                recuperados[content_hash] = do_cache_local[texto]
+                codificado = self.perfil.codificar(recuperados[content_hash])
+                for trabalho, item in pendentes.pop(content_hash):
+                    item[self.perfil.campo] = codificado
+                    trabalho['embeddings_reutilizados'] += 1
+        self.cache_embeddings.update(recuperados)
+        self.repositorio.salvar(recuperados)
+
+        if not pendentes:
+            return
+
+        # Cada texto conta para a cota do primeiro arquivo que precisa dele
+        por_arquivo: Dict[str, List[str]] = {}
+        for content_hash, itens in pendentes.items():
+            por_arquivo.setdefault(itens[0][0]['arquivo']['id'], []).append(content_hash)
+        hashes, excedentes = [], []
+        for file_id, hashes_arquivo in por_arquivo.items():
+            concedidos = 0 if self.embedding_desativado else self.alocador.reservar(file_id, len(hashes_arquivo))
+            hashes += hashes_arquivo[:concedidos]
+            excedentes += hashes_arquivo[concedidos:]
+
+        novos = {}
+        if hashes:
+            textos = [textos_por_hash[h] for h in hashes]
+            logger.debug(f"   🔄 Gerando {len(textos)} embeddings em lote ({self.alocador.usados}/{self.alocador.limite} reservados)...")
+            for content_hash, vetor in zip(hashes, self.agendador.gerar(textos)):
+                if vetor is None:
+                    excedentes.append(content_hash)
+                    continue
+                novos[content_hash] = vetor
+                self.cache_embeddings[content_hash] = vetor
+                codificado = self.perfil.codificar(vetor)
+                for trabalho, item in pendentes[content_hash]:
+                    item[self.perfil.campo] = codificado
+                    trabalho['embeddings_gerados'] += 1
+            self.alocador.devolver(len(hashes) - len(novos))  # Falhas na API não gastam orçamento
+            self.repositorio.salvar(novos)
+
+        if self.agendador.cota_esgotada and not self.embedding_desativado:
+            self.embedding_desativado = True
+            logger.warning(f"\n  🛑 COTA DA API GEMINI ESGOTADA MESMO APÓS NOVAS TENTATIVAS!")
+            logger.warning(f"  ⏭️  Restante será enviado SEM embedding e entra no backlog.\n")
+
+        if excedentes:
+            self._enfileirar(excedentes, pendentes, textos_por_hash)
+
+    def _enfileirar(self, hashes: List[str], pendentes: Dict[str, List[Tuple[Dict, Dict]]],
+                    textos_por_hash: Dict[str, str]):
+        if not self.avisou_orcamento and not self.embedding_desativado:
+            self.avisou_orcamento = True
+            logger.warning(f"\n  🛑 COTA DE EMBEDDINGS DE UM ARQUIVO ESGOTADA (política '{self.alocador.politica}', "
+                           f"limite {self.alocador.limite})!")
+            logger.warning(f"  ⏭️  Excedente será enviado SEM embedding e entra no backlog.\n")
+        if self.metricas is not None:
+            self.metricas.contar("embeddings_backlog_enfileirados", len(hashes))
+        if self.backlog is None:
+            return
+        self.backlog.enfileirar([{
+            "content_hash": h,
+            "texto": textos_por_hash[h],
+            "file_id": pendentes[h][0][0]['arquivo']['id'],
+            "category": pendentes[h][0][1]['category'],
+            "priority": self.alocador.prioridade(pendentes[h][0][0]['arquivo']['id']),
+        } for h in hashes])
+
+
+def gravar_arquivos(reconciliador: Reconciliador, trabalhos: List[Dict],
+                    metricas: Optional[MetricasExecucao] = None, col_indice=None) -> int:
+    """
+    Etapa de gravação: aplica só a diferença de cada arquivo (por content_hash), em uma transação por lote.
+    Com `col_indice`, regrava em seguida a entrada dos arquivos no índice lexical.
+    """
+    trabalhos = [t for t in trabalhos if t['itens']]
+    if not trabalhos:
+        return 0
+
+    contagens = reconciliador.gravar(trabalhos)
+    if col_indice is not None:
+        atualizar_arquivos(reconciliador.col_dados, col_indice, [t['arquivo']['id'] for t in trabalhos])
+
+    for trabalho in trabalhos:
+        lote_arquivo = trabalho['itens']
+        c = contagens[trabalho['arquivo']['id']]
+        sem_embedding = sum(1 for item in lote_arquivo if item.get(reconciliador.campo_embedding) is None)
+        # Detalhe por arquivo só em DEBUG: o andamento geral sai amostrado (ProgressoAmostrado)
+        logger.debug(f"   ✔️ {trabalho['arquivo']['name']}: {len(lote_arquivo)} itens sincronizados "
+                     f"({c['inseridos']} novos, {c['atualizados']} atualizados, {c['removidos']} removidos, {c['inalterados']} inalterados).")
+        logger.debug(f"   💰 Embeddings: {trabalho.get('embeddings_reutilizados', 0)} reutilizados, {trabalho.get('embeddings_gerados', 0)} novos gerados, {sem_embedding} sem embedding.")
+        if metricas is not None:
+            for operacao, quantidade in c.items():
+                metricas.contar(f"itens_{operacao}", quantidade)
+            metricas.contar("embeddings_reutilizados", trabalho.get('embeddings_reutilizados', 0))
+            metricas.contar("embeddings_gerados", trabalho.get('embeddings_gerados', 0))
+            metricas.contar("embeddings_sem_vetor", sem_embedding)
+    return sum(len(t['itens']) for t in trabalhos)
+
+
+def copiar_duplicados(col_dados, col_meta, reconciliador: Reconciliador, duplicados: List[Dict],
+                      metricas: Optional[MetricasExecucao] = None, col_indice=None) -> Tuple[int, List[Dict]]:
+    """
+    Grava as FAQs de arquivos idênticos (mesmo md5Checksum) a outro já sincronizado, copiando os itens
+    gravados da origem (com embedding) em vez de baixar e ler o .docx de novo.
+
+    Retorna (itens gravados, arquivos cuja origem não está mais com aquele conteúdo e precisam de parse).
+    """
+    if not duplicados:
+        return 0, []
+    origens = list({dup['origem'] for dup in duplicados})
+    checksums = {doc['file_id']: doc.get('md5_checksum') for doc in col_meta.find(
+        {"file_id": {"$in": origens}}, {"_id": 0, "file_id": 1, "md5_checksum": 1})}
+    itens_por_origem: Dict[str, List[Dict]] = {}
+    for doc in col_dados.find({"file_id": {"$in": origens}, "isActive": True}, {"_id": 0}):
+        itens_por_origem.setdefault(doc['file_id'], []).append(doc)
+
+    agora = datetime.now(timezone.utc)
+    trabalhos, sem_origem = [], []
+    for dup in duplicados:
+        arq = dup['arquivo']
+        if checksums.get(dup['origem']) != arq.get('md5Checksum'):
+            sem_origem.append(arq)
+            continue
+        itens = [{**item, "file_id": arq['id'], "file_origin": arq['name'], "updatedAt": agora}
+                 for item in itens_por_origem.get(dup['origem'], [])]
+        trabalhos.append({"arquivo": arq, "itens": itens,
+                          "embeddings_reutilizados": sum(1 for i in itens if i.get(reconciliador.campo_embedding) is not None)})
+        logger.debug(f"   👯 {arq['name']}: cópia idêntica de {dup['origem']}, {len(itens)} itens copiados")
+
+    gravados = 0
+    for i in range(0, len(trabalhos), ARQUIVOS_POR_LOTE_GRAVACAO):
+        gravados += gravar_arquivos(reconciliador, trabalhos[i:i + ARQUIVOS_POR_LOTE_GRAVACAO], metricas, col_indice)
+    return gravados, sem_origem
+
+
+def drenar_backlog(col_dados, backlog: BacklogEmbeddings, agendador: AgendadorEmbedding,
+                   repositorio: RepositorioEmbeddings, perfil: PerfilEmbedding, alocador: AlocadorOrcamento,
+                   metricas: MetricasExecucao, leases: Optional[LeasesArquivos] = None):
+    """
+    Gasta o orçamento que o alocador ainda tem com as entradas mais prioritárias do backlog.
+    Com vários trabalhadores, só quem pega o lease do backlog drena (senão as mesmas entradas seriam geradas duas vezes).
+    """
+    if leases is not None and not leases.reivindicar(CHAVE_BACKLOG):
+        logger.info("   📋 Backlog sendo drenado por outro trabalhador; pulando.")
+        return
+    try:
+        with metricas.etapa("backlog"):
+            r = backlog.drenar(col_dados, agendador, repositorio, perfil, alocador.restante, alocador)
+    finally:
+        if leases is not None:
+            leases.liberar(CHAVE_BACKLOG)
+    if r['gerados'] or r['reaproveitados'] or r['descartados']:
+        logger.info(f"   📋 Backlog: {r['gerados']} embeddings gerados, {r['reaproveitados']} reaproveitados, "
+                    f"{r['descartados']} descartados ({r['documentos']} FAQs atualizadas).")
+    metricas.contar("embeddings_backlog_drenados", r['gerados'] + r['reaproveitados'])
+
+
+def reivindicados(trabalhos: List[Dict], leases: Optional[LeasesArquivos],
+                  metricas: MetricasExecucao) -> Iterator[Dict]:
+    """
+    Entrega ao pipeline só os arquivos cujo lease este trabalhador conseguiu. A reivindicação é
+    preguiçosa (no ritmo da fila de downloads), então os trabalhadores se intercalam nos arquivos.
+    """
+    if leases is None:
+        yield from trabalhos
+        return
+    for trabalho in trabalhos:
+        arq = trabalho['arquivo']
+        if leases.reivindicar(arq['id'], arq['modifiedTime']):
+            metricas.contar("arquivos_reivindicados")
+            yield trabalho
+        else:
+            metricas.contar("arquivos_com_outro_trabalhador")
+
+
+def processar_faqs_drive(db, agendador: AgendadorEmbedding, config: Optional[ConfigPipeline] = None,
+                         completo: bool = False, somente_plano: bool = False,
+                         perfil: Optional[PerfilEmbedding] = None,
+                         metricas: Optional[MetricasExecucao] = None,
+                         alocador: Optional[AlocadorOrcamento] = None,
+                         leases: Optional[LeasesArquivos] = None,
+                         drive: Optional[ClienteDrive] = None) -> Tuple[int, int]:
+    """
+    Sincroniza a pasta do Drive. Se já existe um token da Changes API salvo (e `completo` é False),
+    consulta só as mudanças desde a última execução; senão lista a pasta inteira.
+
+    Antes de processar, monta o plano (arquivos a pular/reprocessar) com consultas em lote ao Atlas.
+    Com `somente_plano=True`, baixa e lê os arquivos alterados só para estimar os embeddings e o
+    custo na API, sem chamar o Gemini e sem gravar nada.
+
+    O orçamento de embeddings (`alocador`) vai primeiro para o backlog das execuções anteriores; o
+    que sobra é repartido entre os arquivos a processar, e a sobra das cotas volta para o backlog no fim.
+
+    Com `leases` (modo trabalhador), cada arquivo e cada cópia idêntica só é processado depois de
+    reivindicado em sync_metadata, o backlog é drenado por um trabalhador por vez e o token da
+    Changes API só avança quando todos os arquivos do plano estão gravados, por qualquer trabalhador.
+    """
     col_meta = db[COL_META]
+    col_dados = db[colecao_ativa(col_meta, COL_DADOS)]
+    perfil = perfil or carregar_perfil(col_meta)
+    metricas = metricas or MetricasExecucao()
+    alocador = alocador or AlocadorOrcamento(LIMITE_EMBEDDINGS, *carregar_politica())
+    backlog = BacklogEmbeddings(db[COL_BACKLOG], perfil.modelo, perfil.dimensao)
     
-    creds = service_account.Credentials.from_service_account_file(
-        FILE_CREDENTIALS, scopes=['https://www.googleapis.com/auth/drive.readonly'])
-    service = build('drive', 'v3', credentials=creds)
-
-    query = f"'{ID_PASTA_DRIVE}' in parents and name contains '.docx' and mimeType = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'"
-    results = service.files().list(q=query, fields="files(id, name, modifiedTime)").execute()
-    arquivos = results.get('files', [])
+    drive = drive or ClienteDrive(FILE_CREDENTIALS)
+    service = drive.servico()
 
     itens_novos_total = 0
-    arquivos_pulados = 0
-    embeddings_gerados_global = 0  # Contador global de embeddings gerados nesta execução
-    embedding_desativado = False   # Flag: True = parou de gerar embeddings (limite ou erro de API)
-
-    for arq in arquivos:
-        file_id = arq['id']
-        nome_arq = arq['name']
-        data_drive = arq['modifiedTime']
-
-        meta = col_meta.find_one({"file_id": file_id})
-        if meta and meta.get('last_modified') == data_drive:
-            arquivos_pulados += 1
-            continue
 
-        logger.info(f"🔄 Atualizando: {nome_arq}")
-        try:
-            # Carregar cache de embeddings existentes antes de deletar
-            cache_embeddings = carregar_embeddings_existentes(col_dados, file_id)
-            embeddings_reutilizados = 0
-            embeddings_gerados = 0
-            
-            request = service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done: _, done = downloader.next_chunk()
-            
-            doc = Document(fh)
-            linhas = [converter_para_markdown(p) for p in doc.paragraphs if p.text.strip()]
-            
-            lote_arquivo = []
-            categoria_atual = nome_arq.replace("FAQ", "").replace(".docx", "").strip().lower()
-            
-            # Variáveis de controle para rastreamento de perguntas multi-linha
-            pergunta_pendente = ""
-            linha_inicio_pergunta = 0
-            perguntas_no_arquivo = 0  # Contador para este arquivo
-
-            # Iteração sobre os parágrafos do documento
-            for i, linha in enumerate(linhas):
-                try:
-                    num_linha_real = i + 1 # Para facilitar a localização manual no Word (que não começa em 0)
-
-                    # 1. Verificação de troca de Assunto/Categoria
-                    assunto_m = re.search(r'\[ASSUNTO:\s*(.+?)\]', linha, re.IGNORECASE)
-                    if assunto_m: 
-                        categoria_atual = assunto_m.group(1).strip().lower()
-                        continue
-
-                    pergunta, resposta = None, None
-
-                    # 2. EXTRAÇÃO: Caso Pergunta e Resposta estejam na MESMA LINHA
-                    if re.search(r'\b(P|PERGUNTA):\s*', linha, re.IGNORECASE) and re.search(r'\b(R|RESPOSTA):\s*', linha, re.IGNORECASE):
-                        partes = re.split(r'\s*\b(R|RESPOSTA):\s*', linha, flags=re.IGNORECASE)
-                        pergunta = re.sub(r'(\d+\.\s*)?\b(P|PERGUNTA):\s*', '', partes[0], flags=re.IGNORECASE).strip()
-                        # Extrai a resposta removendo possíveis tags/fontes que vierem na mesma linha
-                        resposta = re.split(r'tags:|fonte:|ref:|\(ref:', partes[2], flags=re.IGNORECASE)[0].strip()
-
-                    # 3. EXTRAÇÃO: Caso seja apenas o início de uma PERGUNTA (P:)
-                    elif re.search(r'^(\d+\.\s*)?\b(P|PERGUNTA):\s*', linha, re.IGNORECASE):
-                        pergunta_pendente = re.sub(r'^(\d+\.\s*)?\b(P|PERGUNTA):\s*', '', linha, flags=re.IGNORECASE).strip()
-                        linha_inicio_pergunta = num_linha_real
-                        continue
-
-                    # 4. EXTRAÇÃO: Caso seja a RESPOSTA (R:) para uma pergunta detectada anteriormente
-                    elif re.search(r'^\b(R|RESPOSTA):\s*', linha, re.IGNORECASE):
-                        if pergunta_pendente:
-                            pergunta = pergunta_pendente
-                            # Limpa o prefixo 'R:' e remove metadados do final
-                            corpo_res = re.sub(r'^\b(R|RESPOSTA):\s*', '', linha, flags=re.IGNORECASE)
-                            resposta = re.split(r'tags:|fonte:|ref:|\(ref:', corpo_res, flags=re.IGNORECASE)[0].strip()
-                            pergunta_pendente = "" # Reseta para a próxima captura
-                        else:
-                            # Log de aviso: encontrou um R: mas não viu o P: antes
-                            logger.warning(f"  ⚠️ Resposta sem pergunta correspondente na linha {num_linha_real} de '{nome_arq}'")
-
-                    # Se conseguimos formar um par P&R, salvamos no lote
-                    if pergunta and resposta:
-                        perguntas_no_arquivo += 1
-                        total_ate_agora = itens_novos_total + perguntas_no_arquivo
-                        tags, fonte = extrair_tags_e_fonte(linhas, i)
-                        
-                        # Verificar se já temos embedding cacheado para este conteúdo
-                        content_hash = gerar_hash_conteudo(pergunta, resposta)
-                        embedding_vector = cache_embeddings.get(content_hash)
-                        
-                        if embedding_vector:
-                            embeddings_reutilizados += 1
-                            logger.info(f"   📌 [{total_ate_agora}] Reutilizando embedding...")
-                        elif embedding_desativado:
-                            # Limite atingido ou erro de API — envia sem embedding
-                            logger.info(f"   ⏭️  [{total_ate_agora}] Sem embedding (limite atingido).")
-                            embedding_vector = None
-                        else:
-                            # Gerar novo embedding apenas se o conteúdo mudou
-                            texto_para_embedding = f"{pergunta} {resposta}"
-                            try:
-                                logger.info(f"   🔄 [{total_ate_agora}] Gerando embedding ({embeddings_gerados_global + 1}/{LIMITE_EMBEDDINGS})...")
-                                embedding_result = gerarEmbedding(texto_para_embedding)
-                                embedding_vector = embedding_result.embeddings[0].values
-                                embeddings_gerados += 1
-                                embeddings_gerados_global += 1
-                                
-                                # Verificar se atingiu o limite
-                                if embeddings_gerados_global >= LIMITE_EMBEDDINGS:
-                                    embedding_desativado = True
-                                    logger.warning(f"\n  🛑 LIMITE DE {LIMITE_EMBEDDINGS} EMBEDDINGS ATINGIDO!")
-                                    logger.warning(f"  ⏭️  Restante será enviado SEM embedding para o banco.\n")
-                            except Exception as emb_error:
-                                logger.warning(f"  ⚠️ Falha ao gerar embedding na linha {num_linha_real}: {emb_error}")
-                                embedding_vector = None
-                                # Se o erro parece ser de limite/rate limit, desativa embeddings
-                                erro_str = str(emb_error).lower()
-                                if any(termo in erro_str for termo in ['rate limit', 'quota', 'resource exhausted', '429', 'limit exceeded']):
-                                    embedding_desativado = True
-                                    logger.warning(f"\n  🛑 ERRO DE LIMITE DA API GEMINI DETECTADO!")
-                                    logger.warning(f"  ⏭️  Restante será enviado SEM embedding para o banco.\n")
-                        
-                        lote_arquivo.append({
-                            "question": pergunta,
-                            "question_normalized": normalizar_para_busca(pergunta),
-                            "answer": resposta,
-                            "category": categoria_atual,
-                            "tags": tags,
-                            "source": fonte,
-                            "file_id": file_id,
-                            "file_origin": nome_arq,
-                            "line_reference": num_linha_real,
-                            "content_hash": content_hash,  # Hash para cache de embeddings
-                            "isActive": True,
-                            "updatedAt": datetime.now(timezone.utc),
-                            "embedding": embedding_vector
-                        })
-
-                except Exception as line_error:
-                    # RASTREABILIDADE: Loga o erro sem parar o processamento do resto do arquivo
-                    logger.error(f"  ❌ Erro ao processar parágrafo na linha {i+1} do arquivo '{nome_arq}': {line_error}")
-                    continue
-
-            # Verificação de segurança: sobrou pergunta sem resposta no final do arquivo?
-            if pergunta_pendente:
-                logger.warning(f"  ⚠️ Pergunta detectada na linha {linha_inicio_pergunta} de '{nome_arq}' ficou sem resposta (R:).")
-
-            # ATUALIZAÇÃO ATÔMICA POR ARQUIVO
-            if lote_arquivo:
-                col_dados.delete_many({"file_id": file_id})
-                col_dados.insert_many(lote_arquivo)
-                col_meta.update_one(
-                    {"file_id": file_id},
-                    {"$set": {"last_modified": data_drive, "updated_at": datetime.now(timezone.utc)}},
-                    upsert=True
-                )
-                itens_novos_total += len(lote_arquivo)
-                sem_embedding = sum(1 for item in lote_arquivo if item.get('embedding') is None)
-                logger.info(f"   ✔️ Sucesso: {len(lote_arquivo)} itens sincronizados.")
-                logger.info(f"   💰 Embeddings: {embeddings_reutilizados} reutilizados, {embeddings_gerados} novos gerados, {sem_embedding} sem embedding.")
-
-        except Exception as file_error:
-            logger.error(f"   ❌ Falha crítica ao processar o arquivo {nome_arq}: {file_error}")
+    estado = None if completo else carregar_estado(col_meta)
+    plano = None
+    if estado:
+        # MODO INCREMENTAL: só o que foi adicionado, editado, excluído ou movido desde a última execução
+        pastas = set(estado.get('pastas') or [ID_PASTA_DRIVE])
+        with metricas.etapa("listagem"):
+            alterados, removidos, novo_token, estrutura_mudou = listar_mudancas(
+                service, estado['page_token'], ID_PASTA_DRIVE, pastas)
+            removidos = filtrar_conhecidos(col_meta, removidos)
+        logger.info(f"🔎 Changes API: {len(alterados)} arquivo(s) alterado(s), {len(removidos)} removido(s).")
+        if estrutura_mudou:
+            logger.info("   📂 Subpastas mudaram; listando a árvore inteira novamente.")
+        else:
+            # Mesmo na Changes API, um arquivo só "tocado" (md5Checksum igual) ou copiado não precisa de parse
+            metadados = carregar_metadados(col_meta, [a['id'] for a in alterados],
+                                           [a.get('md5Checksum') for a in alterados])
+            plano = montar_plano(alterados, metadados)
+            plano['remover'] = removidos
+    else:
+        # MODO COMPLETO: pega o cursor antes de listar, para não perder edições feitas durante a execução
+        novo_token = obter_token_inicial(service)
+
+    if plano is None:
+        with metricas.etapa("listagem"):
+            manifesto = listar_pasta_recursiva(drive.servico, ID_PASTA_DRIVE)
+            metadados = carregar_metadados(col_meta)
+        pastas = set(manifesto['pastas'])
+        plano = montar_plano(manifesto['arquivos'], metadados)
+        ids_no_drive = {arq['id'] for arq in manifesto['arquivos']}
+        plano['remover'] = [fid for fid in metadados if fid not in ids_no_drive]
+
+    if not somente_plano:
+        imprimir_plano(plano)
+    arquivos_pulados = len(plano['pular']) + len(plano['tocar'])
+    trabalhos = [{"arquivo": arq} for arq in plano['reprocessar']]
+    metricas.contar("arquivos_pulados", len(plano['pular']))
+    metricas.contar("arquivos_mesmo_conteudo", len(plano['tocar']))
+    metricas.contar("arquivos_duplicados", len(plano['duplicados']))
+    metricas.contar("arquivos_para_processar", len(trabalhos))
+
+    reconciliador = Reconciliador(col_dados, col_meta, perfil.campo)
+    col_indice = db[COL_INDICE_LEXICAL]
+    if not somente_plano:
+        desativados = desativar_arquivos_removidos(col_dados, col_meta, plano['remover'])
+        remover_arquivos(col_indice, plano['remover'])
+        if desativados:
+            logger.info(f"   🚫 {desativados} FAQs desativadas (arquivos que não estão mais na pasta).")
+        reconciliador.tocar(plano['tocar'])
+        if not col_indice.estimated_document_count():
+            # Daqui em diante o índice lexical é atualizado arquivo a arquivo, junto com a gravação
+            with metricas.etapa("indice_lexical"):
+                indexadas = construir_indice(col_dados, col_indice)
+            if indexadas:
+                logger.info(f"   📚 Índice lexical construído com {indexadas} FAQs.")
+
+    repositorio = RepositorioEmbeddings(db[COL_EMBEDDINGS], perfil.modelo, perfil.dimensao)
+    logger.info(f"📋 Backlog de embeddings: {backlog.tamanho()} item(ns) aguardando.")
+    if not somente_plano:
+        # O que ficou sem vetor nas execuções anteriores passa na frente dos arquivos desta execução
+        backlog.garantir_indice()
+        repositorio.garantir_indice()
+        drenar_backlog(col_dados, backlog, agendador, repositorio, perfil, alocador, metricas, leases)
+    alocador.planejar(plano['reprocessar'])
+
+    # Cache de embeddings carregado uma única vez do armazém global, e só se houver algo a processar
+    cache_embeddings = {}
+    if trabalhos or plano['duplicados']:
+        if not somente_plano:
+            repositorio.semear_de(col_dados, perfil.campo)
+        cache_embeddings = repositorio.carregar_todos()
+
+    def baixar(trabalho: Dict) -> Dict:
+        # Cada thread de download usa o seu serviço do Drive (o cliente HTTP não é thread-safe)
+        logger.debug(f"🔄 Atualizando: {trabalho['arquivo']['name']}")
+        trabalho['conteudo'] = drive.baixar(trabalho['arquivo']['id'])
+        metricas.contar("bytes_baixados", len(trabalho['conteudo']))
+        return trabalho
+
+    if somente_plano:
+        itens_extraidos = []
+        pipeline = PipelineSync(baixar, extrair_faqs_arquivo,
+                                lambda lote: itens_extraidos.extend(i for t in lote for i in t['itens']),
+                                lambda lote: None, config, metricas)
+        pipeline.executar(trabalhos)
+        # Considera também o que já está no cache local em disco
+        textos_faltantes = {texto_para_embedding(i['question'], i['answer']): i['content_hash']
+                            for i in itens_extraidos if i['content_hash'] not in cache_embeddings}
+        for texto, vetor in agendador.buscar_cache_local(list(textos_faltantes)).items():
+            cache_embeddings[textos_faltantes[texto]] = vetor
+        imprimir_plano(plano, estimar_embeddings(itens_extraidos, cache_embeddings), alocador.restante)
+        return 0, arquivos_pulados
+
+    progresso = ProgressoAmostrado(len(trabalhos))
+
+    def gravar(lote: List[Dict]):
+        nonlocal itens_novos_total
+        itens_novos_total += gravar_arquivos(reconciliador, lote, metricas, col_indice)
+        progresso.avancar(len(lote))
+        if leases is not None:
+            for trabalho in lote:
+                leases.liberar(trabalho['arquivo']['id'], trabalho['arquivo']['modifiedTime'])
+
+    etapa_embedding = EtapaEmbedding(cache_embeddings, repositorio, agendador, perfil, alocador, backlog, metricas)
+    pipeline = PipelineSync(baixar, extrair_faqs_arquivo, etapa_embedding, gravar, config, metricas)
+    pipeline.executar(reivindicados(trabalhos, leases, metricas))
+
+    # Cópias idênticas: as FAQs vêm da origem já gravada; se a origem falhou ou mudou, a cópia passa pelo pipeline
+    duplicados = plano['duplicados']
+    if leases is not None:
+        duplicados = [dup for dup in duplicados
+                      if leases.reivindicar(dup['arquivo']['id'], dup['arquivo']['modifiedTime'])]
+    with metricas.etapa("duplicados"):
+        copiados, sem_origem = copiar_duplicados(col_dados, col_meta, reconciliador, duplicados, metricas, col_indice)
+    itens_novos_total += copiados
+    if leases is not None:
+        ids_sem_origem = {arq['id'] for arq in sem_origem}
+        for dup in duplicados:
+            if dup['arquivo']['id'] not in ids_sem_origem:
+                leases.liberar(dup['arquivo']['id'], dup['arquivo']['modifiedTime'])
+    if sem_origem:
+        alocador.planejar(sem_origem)
+        pipeline.executar(reivindicados([{"arquivo": arq} for arq in sem_origem], leases, metricas))
+    metricas.contar("arquivos_com_falha", len(pipeline.falhas))
+
+    # Cotas não usadas (arquivos com poucos textos novos) vão para o backlog, inclusive o desta execução
+    drenar_backlog(col_dados, backlog, agendador, repositorio, perfil, alocador, metricas, leases)
+    metricas.contar("backlog_embeddings_restante", backlog.tamanho())
+
+    # Só avança o cursor se tudo foi gravado; senão os arquivos com falha voltam na próxima execução
+    pendentes = []
+    if leases is not None and not pipeline.falhas:
+        pendentes = leases.pendentes(plano['reprocessar'] + [dup['arquivo'] for dup in plano['duplicados']])
+    if pipeline.falhas:
+        logger.warning(f"⚠️ {len(pipeline.falhas)} arquivo(s) com falha; o token da Changes API não foi avançado.")
+    elif pendentes:
+        # Outros trabalhadores ainda estão com arquivos desta rodada: o último a terminar avança o token
+        logger.info(f"⏳ {len(pendentes)} arquivo(s) ainda com outros trabalhadores; o token da Changes API fica "
+                    f"para o último a terminar.")
+    else:
+        salvar_estado(col_meta, novo_token, pastas)
 
     return itens_novos_total, arquivos_pulados
 
 # ============================================================================
-# 5. EXECUÇÃO
+# 4. EXECUÇÃO
 # ============================================================================
 
-def main():
+def ler_argumentos(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sincroniza as FAQs do Google Drive com o MongoDB Atlas.")
+    parser.add_argument("--serial", action="store_true",
+                        help="Processa um arquivo por vez, sem paralelismo (útil para depuração)")
+    parser.add_argument("--downloads", type=int, default=DOWNLOADS_PARALELOS,
+                        help=f"Downloads simultâneos do Drive (padrão: {DOWNLOADS_PARALELOS})")
+    parser.add_argument("--parsers", type=int, default=PARSERS_PARALELOS,
+                        help=f"Processos de leitura dos .docx (padrão: {PARSERS_PARALELOS})")
+    parser.add_argument("--fila", type=int, default=TAMANHO_FILA,
+                        help=f"Arquivos aguardando entre duas etapas (padrão: {TAMANHO_FILA})")
+    parser.add_argument("--completo", action="store_true",
+                        help="Ignora o token da Changes API e lista a pasta inteira do Drive")
+    parser.add_argument("--plan-only", action="store_true",
+                        help="Só mostra o plano e a estimativa de embeddings/custo, sem chamar o Gemini nem gravar")
+    parser.add_argument("--sem-cache-local", action="store_true",
+                        help="Não usa o cache de embeddings em disco (.cache/embeddings.sqlite)")
+    parser.add_argument("--aquecer-cache-local", action="store_true",
+                        help="Antes de sincronizar, copia para o cache em disco os vetores que já estão no MongoDB")
+    parser.add_argument("--parser-em-threads", action="store_true",
+                        help="Usa threads em vez de processos para a leitura dos .docx")
+    parser.add_argument("--politica-orcamento", choices=POLITICAS, default=carregar_politica()[0],
+                        help="Como repartir o limite de embeddings entre os arquivos: justa (por categoria e arquivo), "
+                             "recencia (arquivos editados por último primeiro) ou prioridade (ORCAMENTO_PRIORIDADES "
+                             "do .env recebem peso maior)")
+    parser.add_argument("--metricas-dir", default=PASTA_METRICAS,
+                        help=f"Pasta do relatório JSON e do textfile do Prometheus (padrão: {PASTA_METRICAS})")
+    parser.add_argument("--trabalhador", action="store_true",
+                        help="Modo trabalhador: vários processos (em um ou mais hosts) dividem os arquivos por leases "
+                             "em sync_metadata e compartilham o limite de embeddings da rodada")
+    parser.add_argument("--rodada", default=None,
+                        help="Com --trabalhador, nome da rodada que compartilha o orçamento de embeddings "
+                             "(padrão: a hora UTC atual, ex.: 2026-10-18T05)")
+    parser.add_argument("--lease-segundos", type=float, default=DURACAO_LEASE,
+                        help=f"Com --trabalhador, segundos até o lease de um trabalhador parado expirar "
+                             f"(padrão: {DURACAO_LEASE:.0f})")
+    parser.add_argument("--profile", nargs="?", const=PASTA_PERFIS, metavar="PASTA",
+                        help=f"Perfila cada etapa (listagem, download, parse, embedding, gravação...) com cProfile, "
+                             f"por execução e por arquivo, com pilhas para flamegraph em PASTA (padrão: {PASTA_PERFIS})")
+    parser.add_argument("--profile-memoria", action="store_true",
+                        help="Com --profile (implícito), mede com tracemalloc o pico de memória de cada lote de embedding")
+    parser.add_argument("--check", action="store_true",
+                        help="Só confere a configuração (.env, credenciais, documento de descoberta do Drive) "
+                             "e sai, sem nenhuma chamada de rede")
+    return parser.parse_args(argv)
+
+def verificar_configuracao(inicio: float) -> bool:
+    """--check: confere o que a sincronização precisa antes de abrir qualquer conexão."""
+    ok = True
+    if os.path.isfile(FILE_CREDENTIALS):
+        logger.info(f"🔑 Credenciais do Drive: {FILE_CREDENTIALS}")
+    else:
+        logger.error(f"❌ Arquivo de credenciais não encontrado: {FILE_CREDENTIALS}")
+        ok = False
+    if documento_descoberta() is not None:
+        logger.info("📄 Documento de descoberta do Drive v3: cópia estática do googleapiclient")
+    else:
+        logger.warning("⚠️ Sem cópia estática do documento de descoberta; a sincronização vai buscá-lo na rede")
+    logger.info(f"📁 Pasta do Drive: {ID_PASTA_DRIVE} | 🍃 Banco: {DB_NAME}.{COL_DADOS} | "
+                f"🎯 Limite de embeddings: {LIMITE_EMBEDDINGS}")
+    logger.info(f"{'✅' if ok else '❌'} Verificação concluída em {time.perf_counter() - inicio:.3f}s")
+    return ok
+
+def main(argv=None):
+    args = ler_argumentos(argv)
+    configurar_log(em_arquivo=not args.check)
+    if args.check:
+        if not verificar_configuracao(INICIO_PROCESSO):
+            raise SystemExit(1)
+        return
+    from pymongo import MongoClient  # ~175 ms de import: fica fora do --check
+    perfilando = bool(args.profile or args.profile_memoria)
+    config = ConfigPipeline(
+        downloads_paralelos=args.downloads,
+        parsers_paralelos=args.parsers,
+        tamanho_fila=args.fila,
+        # Perfilando, o parse roda em threads: o cProfile não enxerga os processos filhos
+        parser_em_processos=not (args.parser_em_threads or perfilando),
+        # Python 3.12+: um cProfile por processo, então perfilar implica --serial
+        modo_serial=args.serial or (perfilando and UM_PERFIL_POR_PROCESSO)
+    )
+    if perfilando and UM_PERFIL_POR_PROCESSO and not args.serial:
+        logger.info("🔬 Python 3.12+ aceita um cProfile por processo: perfilando em modo serial.")
+
     tempo_start = time.time()
+    ouvinte_log = iniciar_log_em_fila()
+    metricas = MetricasExecucao("enviar_dados")
+    perfilador = None
+    if perfilando:
+        perfilador = metricas.perfilador = Perfilador(args.profile or PASTA_PERFIS, "enviar_dados",
+                                                      memoria=args.profile_memoria, etapas_memoria=("embedding",))
+    # Um cliente de cada serviço para a execução inteira (Mongo, Drive e Gemini)
     client = MongoClient(URI_MONGO)
+    drive = ClienteDrive(FILE_CREDENTIALS)
+    servico_embedding = None
+    cache_local = None
     
-    try:
-        db = client[DB_NAME]
-        col_dados = db[COL_DADOS]
+    with perfilador or nullcontext():
+        try:
+            db = client[DB_NAME]
+            col_dados = db[colecao_ativa(db[COL_META], COL_DADOS)]
+            # O perfil gravado por uma migração (gerar_embeddings.py --migrar) vale mais que o .env
+            perfil = carregar_perfil(db[COL_META])
+            servico_embedding = ServicoEmbedding(modelo=perfil.modelo, dimensao=perfil.dimensao)
+            if not args.sem_cache_local:
+                cache_local = CacheLocalEmbeddings(perfil.modelo, perfil.dimensao)
         
-        print("\n" + "═"*60)
-        logger.info("🚀 INICIANDO SINCRONIZADOR INTELIGENTE (MODO INCREMENTAL)")
+            if cache_local and args.aquecer_cache_local:
+                cache_local.aquecer(col_dados, db[COL_EMBEDDINGS], perfil.campo)
         
-        # Garante que o índice vetorial existe
-        criar_indice_vetorial(col_dados)
+            print("\n" + "═"*60)
+            logger.info("🚀 INICIANDO SINCRONIZADOR INTELIGENTE (MODO INCREMENTAL)")
+            logger.info(f"🧬 Perfil de embedding: {perfil}")
         
-        novos, pulados = processar_faqs_drive(db)
+            # Garante que os índices vetorial e de texto existem
+            if not args.plan_only:
+                with metricas.etapa("indices"):
+                    criar_indice_vetorial(col_dados, perfil)
+                    criar_indice_texto(col_dados)
         
-        total_ativos = col_dados.count_documents({"isActive": True})
-
-        print("\n" + "📊 RELATÓRIO FINAL DE OPERAÇÃO")
-        print("─"*60)
-        print(f"⏭️  Arquivos Pulados (Sem alteração): {pulados}")
-        print(f"📥 Itens Novos/Atualizados:         {novos}")
-        print(f"🟢 Total de FAQ Ativas no Chatbot:  {total_ativos}")
-        print(f"🕒 Tempo de execução:               {time.time() - tempo_start:.2f}s")
-        print("═"*60 + "\n")
-
-    except Exception as e:
-        logger.critical(f"Falha Crítica na execução principal: {e}")
-    finally:
-        client.close()
+            agendador = AgendadorEmbedding(servico_embedding, cache_local=cache_local, metricas=metricas,
+                                           concorrencia=1 if config.modo_serial else None)
+            compartilhado = leases = None
+            if args.trabalhador and not args.plan_only:
+                rodada = args.rodada or rodada_atual()
+                compartilhado = OrcamentoCompartilhado(db[COL_META], rodada, LIMITE_EMBEDDINGS)
+                compartilhado.limpar_antigos()
+                leases = LeasesArquivos(db[COL_META], id_trabalhador(), args.lease_segundos)
+                logger.info(f"👷 Trabalhador {leases.dono} na rodada '{rodada}' "
+                            f"({compartilhado.restante} embeddings ainda disponíveis para a rodada)")
+            alocador = AlocadorOrcamento(LIMITE_EMBEDDINGS, args.politica_orcamento, carregar_politica()[1], compartilhado)
+            logger.info(f"🎯 Orçamento: até {LIMITE_EMBEDDINGS} embeddings novos (política '{alocador.politica}')")
+            # Registrada em sync_metadata: o limpar_banco.py não limpa nem troca a coleção durante a sincronização
+            sessao = nullcontext() if args.plan_only else sessao_sincronizacao(db[COL_META])
+            with sessao, leases or nullcontext():
+                novos, pulados = processar_faqs_drive(db, agendador, config, completo=args.completo,
+                                                      somente_plano=args.plan_only, perfil=perfil, metricas=metricas,
+                                                      alocador=alocador, leases=leases, drive=drive)
+        
+            total_ativos = col_dados.count_documents({"isActive": True})
+
+            print("\n" + "📊 RELATÓRIO FINAL DE OPERAÇÃO")
+            print("─"*60)
+            print(f"⏭️  Arquivos Pulados (Sem alteração): {pulados}")
+            print(f"📥 Itens Novos/Atualizados:         {novos}")
+            print(f"🟢 Total de FAQ Ativas no Chatbot:  {total_ativos}")
+            print(f"🕒 Tempo de execução:               {time.time() - tempo_start:.2f}s")
+            print("─"*60)
+            for linha in metricas.resumo():
+                print(f"   {linha}")
+            print("═"*60 + "\n")
+
+        except Exception as e:
+            metricas.sucesso = False
+            logger.critical(f"Falha Crítica na execução principal: {e}")
+        finally:
+            if servico_embedding:
+                servico_embedding.fechar()
+            if cache_local:
+                cache_local.fechar()
+            client.close()
+            if not args.plan_only:
+                try:
+                    caminho_json, caminho_prom = metricas.salvar(args.metricas_dir)
+                    logger.info(f"📈 Métricas salvas em {caminho_json} e {caminho_prom}")
+                except OSError as e:
+                    logger.warning(f"⚠️ Não foi possível salvar as métricas: {e}")
+            parar_log_em_fila(ouvinte_log)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
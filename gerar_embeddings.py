@@ -1,84 +1,447 @@
+"""
+Preenche o embedding das FAQs gravadas sem vetor (backfill).
+
+Antes de tudo, drena o backlog de embeddings (textos que ficaram sem vetor por falta de orçamento
+no sincronizador), na ordem de prioridade. Depois percorre `faq_medicamentos` em lotes ordenados por _id, lendo só _id/question/answer/content_hash.
+Reaproveita primeiro o armazém global de vetores e o cache local em disco, gera o restante no
+Gemini até o orçamento (--limite) e grava cada lote com um único bulk_write. O último _id
+concluído fica salvo em `sync_metadata`: uma execução interrompida continua de onde parou.
+Não faz perguntas, então pode rodar pelo cron.
+
+Com --migrar, o mesmo backfill grava o perfil do .env em um segundo campo (embedding_v2) enquanto
+o campo e o índice atuais continuam atendendo; com 100% de cobertura, o perfil ativo é trocado.
+"""
+
 import os
+import sys
 import time
+import argparse
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from lib.gemini_embendding import gerarEmbedding
+from pymongo.operations import UpdateOne
+
+from lib.gemini_embendding import ServicoEmbedding
+from lib.agendador_embedding import AgendadorEmbedding
+from lib.cache_local import CacheLocalEmbeddings
+from lib.metricas import MetricasExecucao
+from lib.perfilador import PASTA_PERFIS, UM_PERFIL_POR_PROCESSO, Perfilador
+from lib.perfil_embedding import PerfilEmbedding, carregar_perfil
+from lib.migracao_embedding import (carregar_migracao, concluir_migracao, garantir_indice_destino,
+                                    iniciar_migracao, medir_cobertura, mesmo_vetor, perfil_destino, perfil_em_uso,
+                                    registrar_cobertura, registrar_progresso)
+from lib.orcamento_embedding import COL_BACKLOG, BacklogEmbeddings
+from lib.coordenacao import sessao_sincronizacao
+from lib.troca_colecao import colecao_ativa, indice_pronto
+from lib.repositorio_embeddings import (COL_EMBEDDINGS, RepositorioEmbeddings, gerar_hash_conteudo,
+                                       texto_para_embedding)
 
 load_dotenv()
 
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
 URI_MONGO = os.getenv("MONGODB_URI")
 DB_NAME = "ministerio_saude"
 COL_DADOS = "faq_medicamentos"
+COL_META = "sync_metadata"
 LIMITE_EMBEDDINGS = 200
+DOCS_POR_LOTE = 500
+
+# Documento de sync_metadata com o progresso do backfill
+ID_CHECKPOINT = "backfill_embeddings"
+PROJECAO_BACKFILL = {"_id": 1, "question": 1, "answer": 1, "content_hash": 1}
+
+
+def ler_argumentos(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gera os embeddings das FAQs que ainda não têm vetor.")
+    parser.add_argument("--limite", type=int, default=LIMITE_EMBEDDINGS,
+                        help=f"Máximo de embeddings novos (chamadas ao Gemini) nesta execução (padrão: {LIMITE_EMBEDDINGS}; "
+                             f"0 só reaproveita vetores dos caches)")
+    parser.add_argument("--lote", type=int, default=DOCS_POR_LOTE,
+                        help=f"Documentos lidos e gravados por lote (padrão: {DOCS_POR_LOTE})")
+    parser.add_argument("--do-inicio", action="store_true",
+                        help="Ignora o checkpoint salvo e percorre a coleção desde o primeiro documento")
+    parser.add_argument("--migrar", action="store_true",
+                        help="Migra para o perfil do .env (modelo/dimensão/formato) em um segundo campo, sem tirar "
+                             "a busca do ar; cada execução avança a migração e troca o perfil ativo com 100%% de cobertura")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="Com --migrar, segundos de espera entre dois lotes (alivia o cluster durante o dia)")
+    parser.add_argument("--manter-antigo", action="store_true",
+                        help="Com --migrar, mantém o campo e o índice antigos depois da troca (permite voltar atrás)")
+    parser.add_argument("--profile", nargs="?", const=PASTA_PERFIS, metavar="PASTA",
+                        help=f"Perfila cada etapa (leitura, lote, backlog, embedding_api) com cProfile e grava os "
+                             f"dumps e as pilhas para flamegraph em PASTA (padrão: {PASTA_PERFIS})")
+    parser.add_argument("--profile-memoria", action="store_true",
+                        help="Com --profile (implícito), mede com tracemalloc o pico de memória de cada lote")
+    return parser.parse_args(argv)
+
+
+# ============================================================================
+# CHECKPOINT
+# ============================================================================
+
+def carregar_checkpoint(col_meta, perfil: PerfilEmbedding):
+    """Último _id concluído, se o checkpoint salvo for do mesmo perfil de embedding."""
+    estado = col_meta.find_one({"_id": ID_CHECKPOINT})
+    if not estado or estado.get("perfil") != str(perfil):
+        return None
+    return estado.get("ultimo_id")
+
+
+def salvar_checkpoint(col_meta, perfil: PerfilEmbedding, ultimo_id):
+    col_meta.update_one(
+        {"_id": ID_CHECKPOINT},
+        {"$set": {"ultimo_id": ultimo_id, "perfil": str(perfil), "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+def limpar_checkpoint(col_meta):
+    col_meta.delete_one({"_id": ID_CHECKPOINT})
+
+
+# ============================================================================
+# BACKFILL
+# ============================================================================
+
+def concorrencia_perfilada(metricas: Optional[MetricasExecucao]) -> Optional[int]:
+    """Python 3.12+ aceita um cProfile por processo: perfilando, as requisições à API rodam sem pool."""
+    return 1 if metricas is not None and UM_PERFIL_POR_PROCESSO else None
+
+
+class Backfill:
+    """Processa um lote de FAQs sem embedding por vez, respeitando o orçamento de chamadas ao Gemini."""
+
+    def __init__(self, col_dados, repositorio: RepositorioEmbeddings, agendador: AgendadorEmbedding,
+                 perfil: PerfilEmbedding, limite: int, metricas: Optional[MetricasExecucao] = None):
+        self.col_dados = col_dados
+        self.repositorio = repositorio
+        self.agendador = agendador
+        self.perfil = perfil
+        self.restante = limite
+        self.metricas = metricas  # Só com --profile: as etapas medidas são as que o perfilador separa
+        self.estatisticas = {"lotes": 0, "lidos": 0, "atualizados": 0, "gerados": 0,
+                             "do_armazem": 0, "do_cache_local": 0, "erros": 0}
+
+    def etapa(self, nome: str):
+        return self.metricas.etapa(nome) if self.metricas is not None else nullcontext()
+
+    def ler_lote(self, depois_de, tamanho: int) -> List[Dict]:
+        # Paginação por _id: cada lote é uma consulta curta, sem cursor aberto durante as chamadas ao Gemini
+        filtro = {self.perfil.campo: None}
+        if depois_de is not None:
+            filtro["_id"] = {"$gt": depois_de}
+        return list(self.col_dados.find(filtro, PROJECAO_BACKFILL).sort("_id", 1).limit(tamanho))
+
+    def processar(self, docs: List[Dict]) -> Optional[object]:
+        """
+        Gera e grava os vetores do lote; devolve o último _id que pode ir para o checkpoint.
+
+        Se o orçamento acabar no meio do lote, o checkpoint para antes do primeiro documento que
+        ficou sem vetor por falta de orçamento (ele é retomado na próxima execução); os documentos
+        seguintes cujo vetor veio dos caches são gravados mesmo assim. Documentos
+        cujo lote falhou na API contam como erro e são retentados quando o backfill recomeçar do início.
+        """
+        self.estatisticas["lotes"] += 1
+        self.estatisticas["lidos"] += len(docs)
+
+        # Agrupa por conteúdo: documentos repetidos compartilham o mesmo vetor
+        docs_por_hash: Dict[str, List[Dict]] = {}
+        for doc in docs:
+            content_hash = doc.get("content_hash") or gerar_hash_conteudo(doc["question"], doc["answer"])
+            doc["content_hash"] = content_hash
+            docs_por_hash.setdefault(content_hash, []).append(doc)
+
+        # Primeiro, o armazém global de vetores no MongoDB
+        vetores = self.repositorio.buscar(docs_por_hash)
+        self.estatisticas["do_armazem"] += len(vetores)
+
+        # Depois, o cache local em disco (também sem custo de API)
+        textos = {texto_para_embedding(grupo[0]["question"], grupo[0]["answer"]): h
+                  for h, grupo in docs_por_hash.items() if h not in vetores}
+        do_cache_local = {textos[t]: v for t, v in self.agendador.buscar_cache_local(list(textos)).items()}
+        self.repositorio.salvar(do_cache_local)
+        vetores.update(do_cache_local)
+        self.estatisticas["do_cache_local"] += len(do_cache_local)
+
+        faltantes = [(t, h) for t, h in textos.items() if h not in vetores]
+        if self.agendador.cota_esgotada:
+            self.restante = 0
+        a_gerar = faltantes[:max(0, self.restante)]
+        sem_orcamento = {h for _, h in faltantes[len(a_gerar):]}
+        falharam = set()
+        if a_gerar:
+            self.restante -= len(a_gerar)
+            novos = {}
+            for (_, content_hash), vetor in zip(a_gerar, self.agendador.gerar([t for t, _ in a_gerar])):
+                if vetor is None:
+                    falharam.add(content_hash)
+                else:
+                    novos[content_hash] = vetor
+            self.repositorio.salvar(novos)
+            vetores.update(novos)
+            self.estatisticas["gerados"] += len(novos)
+            if self.agendador.cota_esgotada:
+                # Lotes recusados por cota não são erro do documento: ficam para a próxima execução
+                sem_orcamento |= falharam
+                self.restante = 0
+            else:
+                self.estatisticas["erros"] += sum(len(docs_por_hash[h]) for h in falharam)
+
+        operacoes = []
+        ultimo_id = None
+        checkpoint_parado = False
+        for doc in docs:
+            if doc["content_hash"] in sem_orcamento:
+                # O checkpoint para aqui, mas os documentos seguintes com vetor (caches) ainda são gravados
+                checkpoint_parado = True
+                continue
+            if not checkpoint_parado:
+                ultimo_id = doc["_id"]
+            vetor = vetores.get(doc["content_hash"])
+            if vetor is not None:
+                operacoes.append(UpdateOne(
+                    {"_id": doc["_id"], self.perfil.campo: None},
+                    {"$set": {self.perfil.campo: self.perfil.codificar(vetor), "content_hash": doc["content_hash"]}}
+                ))
+        if operacoes:
+            self.col_dados.bulk_write(operacoes, ordered=False)
+            self.estatisticas["atualizados"] += len(operacoes)
+        return ultimo_id
 
-def main():
+
+def percorrer(backfill: Backfill, ultimo_id, tamanho_lote: int, registrar, pausa: float = 0.0) -> Optional[str]:
+    """
+    Processa os lotes depois de `ultimo_id` até o fim da coleção. `registrar` recebe o último _id
+    concluído de cada lote (None no fim da coleção: a próxima execução recomeça do início e retenta
+    os erros). Quando o orçamento acaba, o checkpoint para de avançar, mas a varredura continua
+    gravando os vetores que vêm dos caches. Devolve a situação quando o orçamento acabou.
+    """
+    lido_ate = ultimo_id
+    esgotado = False
+    while True:
+        with backfill.etapa("leitura"):
+            docs = backfill.ler_lote(lido_ate, tamanho_lote)
+        if not docs:
+            if esgotado:
+                return "Orçamento de embeddings esgotado; a próxima execução continua do checkpoint"
+            registrar(None)
+            return None
+        with backfill.etapa("lote"):
+            concluido = backfill.processar(docs)
+        lido_ate = docs[-1]["_id"]
+        if not esgotado:
+            if concluido is not None:
+                registrar(concluido)
+            esgotado = concluido != lido_ate
+        logger.info(f"  📦 Lote {backfill.estatisticas['lotes']}: {backfill.estatisticas['atualizados']} "
+                    f"documentos atualizados até agora")
+        if pausa > 0:
+            time.sleep(pausa)
+
+
+def imprimir_relatorio(estatisticas: Dict[str, int], segundos: float, restantes: int, situacao: str):
+    segundos = max(segundos, 1e-9)
+    print("\n" + "📊 RELATÓRIO FINAL")
+    print("─"*60)
+    print(f"📦 Lotes processados: {estatisticas['lotes']} ({estatisticas['lidos']} documentos lidos)")
+    print(f"✅ Embeddings gerados: {estatisticas['gerados']}")
+    print(f"💰 Reaproveitados: {estatisticas['do_armazem']} do armazém, {estatisticas['do_cache_local']} do cache local")
+    print(f"📝 Documentos atualizados: {estatisticas['atualizados']}")
+    print(f"❌ Erros: {estatisticas['erros']}")
+    print(f"⏭️  Restantes sem embedding: {restantes}")
+    print(f"⏱️  {segundos:.1f}s — {estatisticas['atualizados'] / segundos:.1f} documentos/s, "
+          f"{estatisticas['gerados'] / segundos:.1f} embeddings gerados/s")
+    print(f"🏁 {situacao}")
+    print("═"*60 + "\n")
+
+
+# ============================================================================
+# MIGRAÇÃO DE PERFIL (campo novo em segundo plano)
+# ============================================================================
+
+def migrar(db, args, inicio: float, metricas: Optional[MetricasExecucao] = None) -> int:
+    """
+    Uma rodada da migração: grava os vetores do perfil de destino no campo novo em lotes (dentro do
+    orçamento), com o progresso em sync_metadata. O campo e o índice antigos continuam atendendo;
+    com 100% de cobertura e o índice novo pronto, o perfil ativo é trocado.
+    """
+    col_meta = db[COL_META]
+    col_dados = db[colecao_ativa(col_meta, COL_DADOS)]
+    migracao = carregar_migracao(col_meta)
+    if migracao is None:
+        origem, alvo = perfil_em_uso(col_dados, col_meta), carregar_perfil()
+        if mesmo_vetor(origem, alvo):
+            print(f"✅ O perfil ativo ({origem}) já é o do .env: nada a migrar.")
+            return 0
+        migracao = iniciar_migracao(col_meta, origem, perfil_destino(origem, alvo))
+    origem, destino = migracao["origem"], migracao["destino"]
+
+    print("\n" + "═"*60)
+    print("🚚 MIGRAÇÃO DE EMBEDDINGS")
+    print("─"*60)
+    print(f"🧬 Origem: '{origem.campo}' — {origem}")
+    print(f"🧬 Destino: '{destino.campo}' — {destino}")
+    print(f"📊 Cobertura: {migracao.get('cobertura', 0.0):.2f}% ({migracao.get('migrados', 0)}/{migracao.get('total', 0)})")
+    print(f"🎯 Orçamento: até {args.limite} embeddings novos")
+    garantir_indice_destino(col_dados, destino)
+
+    cache_local = None
+    backfill = None
+    situacao = "Concluído"
+    restantes = 0
+    try:
+        servico = ServicoEmbedding(modelo=destino.modelo, dimensao=destino.dimensao)
+        cache_local = CacheLocalEmbeddings(destino.modelo, destino.dimensao)
+        repositorio = RepositorioEmbeddings(db[COL_EMBEDDINGS], destino.modelo, destino.dimensao)
+        if origem.modelo == destino.modelo:
+            # Mesmo modelo em dimensão menor: os vetores atuais viram o destino sem chamar a API
+            repositorio.semear_de(col_dados, origem.campo)
+        agendador = AgendadorEmbedding(servico, cache_local=cache_local, metricas=metricas,
+                                       concorrencia=concorrencia_perfilada(metricas))
+        backfill = Backfill(col_dados, repositorio, agendador, destino, args.limite, metricas)
+        # Registrada como sincronização: o limpar_banco.py não troca nem limpa a coleção no meio da migração
+        with sessao_sincronizacao(col_meta), servico:
+            situacao = percorrer(backfill, migracao.get("ultimo_id"), args.lote,
+                                 lambda ultimo: registrar_progresso(col_meta, ultimo), args.pausa) or situacao
+
+            cobertura = medir_cobertura(col_dados, destino)
+            registrar_cobertura(col_meta, cobertura)
+            restantes = cobertura["faltantes"]
+            if restantes:
+                if situacao == "Concluído":
+                    situacao = "A próxima execução continua a migração"
+                situacao += f" (cobertura de {cobertura['cobertura']:.2f}%)"
+            elif not indice_pronto(col_dados, destino.indice):
+                situacao = f"Cobertura de 100%; aguardando o índice '{destino.indice}' ficar pronto para trocar o perfil"
+            else:
+                concluir_migracao(col_dados, col_meta, origem, destino, args.manter_antigo)
+                if (origem.modelo, origem.dimensao) != (destino.modelo, destino.dimensao):
+                    # Entradas do backlog do perfil antigo nunca mais seriam drenadas
+                    db[COL_BACKLOG].delete_many({"model": origem.modelo, "dimensions": origem.dimensao})
+                situacao = f"Migração concluída: o perfil ativo agora é {destino}"
+    except KeyboardInterrupt:
+        situacao = "Interrompido; a próxima execução continua do progresso salvo"
+    except Exception as e:
+        print(f"❌ Erro crítico: {e}")
+        situacao = "Interrompido por erro; a próxima execução continua do progresso salvo"
+        return 1
+    finally:
+        if cache_local:
+            cache_local.fechar()
+        if backfill:
+            imprimir_relatorio(backfill.estatisticas, time.perf_counter() - inicio, restantes, situacao)
+    return 0
+
+
+def gerar(args, metricas: Optional[MetricasExecucao] = None) -> int:
+    """Backfill do perfil ativo: backlog primeiro, depois a varredura por _id a partir do checkpoint."""
     client = MongoClient(URI_MONGO)
-    
+    cache_local = None
+    backfill = None
+    situacao = "Concluído"
+    total_sem_embedding = 0
+    inicio = time.perf_counter()
+
     try:
         db = client[DB_NAME]
-        col_dados = db[COL_DADOS]
-        
-        docs_sem_embedding = list(col_dados.find({"embedding": None}))
-        total_sem_embedding = len(docs_sem_embedding)
-        
+        col_meta = db[COL_META]
+        col_dados = db[colecao_ativa(col_meta, COL_DADOS)]
+        perfil = carregar_perfil(col_meta)
+
+        total_sem_embedding = col_dados.count_documents({perfil.campo: None})
         print("\n" + "═"*60)
         print("🔄 GERAÇÃO DE EMBEDDINGS")
         print("─"*60)
+        print(f"🧬 Perfil de embedding: {perfil}")
         print(f"📊 Documentos sem embedding: {total_sem_embedding}")
-        
+        print(f"🎯 Orçamento: até {args.limite} embeddings novos")
+
         if total_sem_embedding == 0:
+            limpar_checkpoint(col_meta)
             print("✅ Todos os documentos já possuem embedding!")
-            return
-        
-        limite_atual = min(LIMITE_EMBEDDINGS, total_sem_embedding)
-        print(f"🎯 Serão processados: {limite_atual} embeddings")
-        
-        confirmacao = input("\n▶️  Deseja continuar? (sim/não): ")
-        
-        if confirmacao.lower() != "sim":
-            print("❌ Operação cancelada.")
-            return
-        
-        print("\n🚀 Iniciando geração de embeddings...\n")
-        
-        embeddings_gerados = 0
-        erros = 0
-        
-        for idx, doc in enumerate(docs_sem_embedding[:LIMITE_EMBEDDINGS], 1):
-            try:
-                texto = f"{doc['question']} {doc['answer']}"
-                print(f"   🔄 [{idx}/{limite_atual}] Gerando embedding...")
-                
-                embedding_result = gerarEmbedding(texto)
-                embedding_vector = embedding_result.embeddings[0].values
-                
-                col_dados.update_one(
-                    {"_id": doc["_id"]},
-                    {"$set": {"embedding": embedding_vector}}
-                )
-                
-                embeddings_gerados += 1
-                
-            except Exception as e:
-                erros += 1
-                print(f"   ❌ Erro no documento {doc.get('file_origin', 'desconhecido')}: {e}")
-                
-                erro_str = str(e).lower()
-                if any(termo in erro_str for termo in ['rate limit', 'quota', 'resource exhausted', '429', 'limit exceeded']):
-                    print("\n🛑 Limite da API atingido! Parando execução.")
-                    break
-        
-        print("\n" + "📊 RELATÓRIO FINAL")
-        print("─"*60)
-        print(f"✅ Embeddings gerados: {embeddings_gerados}")
-        print(f"❌ Erros: {erros}")
-        print(f"⏭️  Restantes: {total_sem_embedding - embeddings_gerados}")
-        print("═"*60 + "\n")
-        
+            return 0
+
+        ultimo_id = None if args.do_inicio else carregar_checkpoint(col_meta, perfil)
+        if ultimo_id is not None:
+            logger.info(f"↪️  Retomando após o _id {ultimo_id}")
+
+        servico = ServicoEmbedding(modelo=perfil.modelo, dimensao=perfil.dimensao)
+        cache_local = CacheLocalEmbeddings(perfil.modelo, perfil.dimensao)
+        repositorio = RepositorioEmbeddings(db[COL_EMBEDDINGS], perfil.modelo, perfil.dimensao)
+        agendador = AgendadorEmbedding(servico, cache_local=cache_local, metricas=metricas,
+                                       concorrencia=concorrencia_perfilada(metricas))
+        backfill = Backfill(col_dados, repositorio, agendador, perfil, args.limite, metricas)
+
+        with sessao_sincronizacao(col_meta), servico:
+            # O backlog do sincronizador tem prioridade sobre a varredura por _id
+            backlog = BacklogEmbeddings(db[COL_BACKLOG], perfil.modelo, perfil.dimensao)
+            with backfill.etapa("backlog"):
+                drenado = backlog.drenar(col_dados, agendador, repositorio, perfil, args.limite)
+            backfill.restante -= drenado["gerados"]
+            backfill.estatisticas["gerados"] += drenado["gerados"]
+            backfill.estatisticas["do_armazem"] += drenado["reaproveitados"]
+            backfill.estatisticas["atualizados"] += drenado["documentos"]
+            if drenado["documentos"] or drenado["descartados"]:
+                logger.info(f"  📋 Backlog: {drenado['documentos']} documentos atualizados, "
+                            f"{drenado['descartados']} entradas descartadas, {backlog.tamanho()} restantes")
+
+            def registrar(ultimo):
+                if ultimo is None:
+                    limpar_checkpoint(col_meta)
+                else:
+                    salvar_checkpoint(col_meta, perfil, ultimo)
+
+            situacao = percorrer(backfill, ultimo_id, args.lote, registrar) or situacao
+    except KeyboardInterrupt:
+        situacao = "Interrompido; a próxima execução continua do checkpoint"
     except Exception as e:
         print(f"❌ Erro crítico: {e}")
+        situacao = "Interrompido por erro; a próxima execução continua do checkpoint"
+        return 1
     finally:
+        if cache_local:
+            cache_local.fechar()
+        if backfill:
+            restantes = total_sem_embedding - backfill.estatisticas["atualizados"]
+            imprimir_relatorio(backfill.estatisticas, time.perf_counter() - inicio, restantes, situacao)
         client.close()
+    return 0
+
+
+def main(argv=None):
+    args = ler_argumentos(argv)
+    if not URI_MONGO:
+        raise ValueError("❌ MONGODB_URI não definido! Configure no arquivo .env")
+
+    metricas = perfilador = None
+    if args.profile or args.profile_memoria:
+        metricas = MetricasExecucao("gerar_embeddings")
+        perfilador = metricas.perfilador = Perfilador(args.profile or PASTA_PERFIS, "gerar_embeddings",
+                                                      memoria=args.profile_memoria, etapas_memoria=("lote",))
+    with perfilador or nullcontext():
+        if args.migrar:
+            client = MongoClient(URI_MONGO)
+            try:
+                codigo = migrar(client[DB_NAME], args, time.perf_counter(), metricas)
+            finally:
+                client.close()
+        else:
+            codigo = gerar(args, metricas)
+    if metricas is not None:
+        for linha in metricas.resumo():
+            print(f"   {linha}")
+    return codigo
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
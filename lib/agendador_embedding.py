@@ -0,0 +1,166 @@
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from lib.gemini_embendding import ServicoEmbedding, estimar_tokens
+from lib.cache_local import CacheLocalEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURAÇÕES (podem ser sobrescritas pelo .env: GEMINI_RPM, GEMINI_TPM, GEMINI_CONCORRENCIA)
+# ============================================================================
+RPM_PADRAO = 100          # Requisições por minuto
+TPM_PADRAO = 30000        # Tokens por minuto
+CONCORRENCIA_PADRAO = 4
+MAX_TENTATIVAS = 8
+BACKOFF_BASE = 1.0     # segundos
+BACKOFF_MAX = 60.0     # segundos
+
+# Códigos HTTP que valem nova tentativa (limite de taxa e falhas do servidor)
+CODIGOS_RETENTAVEIS = {408, 429, 500, 502, 503, 504}
+
+
+class BaldeTokens:
+    """Token bucket thread-safe: libera `capacidade` unidades por minuto, de forma contínua."""
+
+    def __init__(self, capacidade_por_minuto: int):
+        self.capacidade = float(capacidade_por_minuto)
+        self.taxa = self.capacidade / 60.0
+        self.disponivel = self.capacidade
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.ultimo) * self.taxa)
+        self.ultimo = agora
+
+    def consumir(self, quantidade: float = 1):
+        """Bloqueia até haver saldo suficiente e então desconta a quantidade."""
+        quantidade = min(quantidade, self.capacidade)
+        while True:
+            with self._lock:
+                self._reabastecer()
+                if self.disponivel >= quantidade:
+                    self.disponivel -= quantidade
+                    return
+                espera = (quantidade - self.disponivel) / self.taxa
+            time.sleep(espera)
+
+
+def eh_retentavel(erro: Exception) -> bool:
+    from google.genai import errors
+    return isinstance(erro, errors.APIError) and erro.code in CODIGOS_RETENTAVEIS
+
+
+def calcular_backoff(tentativa: int, base: float = BACKOFF_BASE, maximo: float = BACKOFF_MAX) -> float:
+    """Backoff exponencial com jitter completo."""
+    return random.uniform(0, min(maximo, base * (2 ** tentativa)))
+
+
+class AgendadorEmbedding:
+    """Executa requisições de embedding em paralelo respeitando os limites de RPM e TPM da API."""
+
+    def __init__(self, servico: ServicoEmbedding, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 concorrencia: Optional[int] = None, max_tentativas: int = MAX_TENTATIVAS,
+                 cache_local: Optional[CacheLocalEmbeddings] = None, metricas=None):
+        rpm = rpm or int(os.getenv("GEMINI_RPM", RPM_PADRAO))
+        tpm = tpm or int(os.getenv("GEMINI_TPM", TPM_PADRAO))
+        concorrencia = concorrencia or int(os.getenv("GEMINI_CONCORRENCIA", CONCORRENCIA_PADRAO))
+
+        self.servico = servico
+        self.balde_requisicoes = BaldeTokens(rpm)
+        self.balde_tokens = BaldeTokens(tpm)
+        self.concorrencia = max(1, concorrencia)
+        self.max_tentativas = max_tentativas
+        self.cache_local = cache_local
+        # lib.metricas.MetricasExecucao: latência de cada requisição à API ("embedding_api")
+        self.metricas = metricas
+        # Vira True quando a cota continua esgotada mesmo após todas as tentativas
+        self.cota_esgotada = False
+
+    def _medir(self):
+        if self.metricas is None:
+            return nullcontext()
+        self.metricas.contar("requisicoes_embedding")
+        return self.metricas.etapa("embedding_api")
+
+    def _requisitar(self, textos: List[str]) -> List[List[float]]:
+        from google.genai import errors  # Já carregado pelo cliente do Gemini; aqui só para o except
+        tokens = sum(estimar_tokens(t) for t in textos)
+        for tentativa in range(self.max_tentativas):
+            if self.cota_esgotada:
+                raise RuntimeError("Cota da API Gemini esgotada nesta execução")
+            self.balde_requisicoes.consumir(1)
+            self.balde_tokens.consumir(tokens)
+            try:
+                with self._medir():
+                    result = self.servico.embed_content(textos)
+                return self.servico.valores(result)
+            except errors.APIError as e:
+                if self.metricas is not None:
+                    self.metricas.contar("erros_api_embedding")
+                if not eh_retentavel(e) or tentativa == self.max_tentativas - 1:
+                    if e.code == 429:
+                        self.cota_esgotada = True
+                    raise
+                espera = calcular_backoff(tentativa)
+                logger.warning(f"  ⏳ API Gemini respondeu {e.code}; nova tentativa em {espera:.1f}s "
+                               f"({tentativa + 1}/{self.max_tentativas}).")
+                time.sleep(espera)
+
+    def buscar_cache_local(self, textos: List[str]) -> Dict[str, List[float]]:
+        """Vetores já disponíveis no cache em disco (sem custo de API), indexados pelo texto."""
+        if self.cache_local is None:
+            return {}
+        return self.cache_local.buscar(textos)
+
+    def gerar(self, textos: List[str]) -> List[Optional[List[float]]]:
+        """Gera os vetores de todos os textos; itens cujo lote falhou definitivamente ficam como None."""
+        if any(not t or not t.strip() for t in textos):
+            raise ValueError("Textos para embedding não podem estar vazios")
+
+        vetores: List[Optional[List[float]]] = [None] * len(textos)
+        do_cache = self.buscar_cache_local(textos)
+        faltantes = []
+        for i, texto in enumerate(textos):
+            if texto in do_cache:
+                vetores[i] = do_cache[texto]
+            else:
+                faltantes.append(i)
+
+        lotes = self.servico.lotes([textos[i] for i in faltantes])
+        if not lotes:
+            return vetores
+
+        novos: Dict[str, List[float]] = {}
+
+        def guardar(indices: List[int], obter_resultado):
+            try:
+                for i, valor in zip(indices, obter_resultado()):
+                    vetores[i] = valor
+                    novos[textos[i]] = valor
+            except Exception as e:
+                logger.warning(f"  ⚠️ Lote de {len(indices)} embeddings falhou: {e}")
+
+        originais_por_lote = [[faltantes[i] for i in indices] for indices in lotes]
+        if self.concorrencia == 1:
+            # Sem pool: as requisições rodam na thread de quem chamou (--profile no Python 3.12+)
+            for originais in originais_por_lote:
+                guardar(originais, lambda: self._requisitar([textos[i] for i in originais]))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concorrencia, len(lotes))) as executor:
+                futuros = {executor.submit(self._requisitar, [textos[i] for i in originais]): originais
+                           for originais in originais_por_lote}
+                for futuro in as_completed(futuros):
+                    guardar(futuros[futuro], futuro.result)
+
+        if self.cache_local is not None:
+            self.cache_local.salvar(novos)
+        return vetores
@@ -0,0 +1,218 @@
+import json
+import math
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from bson.binary import Binary
+
+from lib.vetores import eh_int8
+
+logger = logging.getLogger(__name__)
+
+# Campos das FAQs carregados junto com os vetores (o que a busca devolve e o que os filtros usam)
+PROJECAO_BUSCA = {"question": 1, "answer": 1, "category": 1, "isActive": 1, "file_origin": 1,
+                  "line_reference": 1}
+
+# Acima disso vale a pena usar o índice aproximado (IVF); abaixo a busca exata já leva poucos milissegundos
+DOCS_PARA_APROXIMADO = 50_000
+SONDAS_PADRAO = 8
+ITERACOES_KMEANS = 10
+BLOCO_ATRIBUICAO = 65_536
+# Abaixo desta fração de FAQs aprovadas pelos filtros, a busca exata copia só as linhas filtradas
+FRACAO_PARA_COPIAR = 0.25
+
+
+@dataclass
+class ResultadoBusca:
+    id: str
+    score: float
+    pergunta: str
+    resposta: str
+    categoria: str
+    arquivo: str
+    linha: Optional[int]
+    ativo: bool
+
+
+def _vetor_numpy(valor) -> np.ndarray:
+    """Lê o vetor gravado sem passar por listas Python (binData é lido direto dos bytes)."""
+    if isinstance(valor, Binary):
+        # 2 bytes de cabeçalho do binData vector (tipo + padding)
+        if eh_int8(valor):
+            return np.frombuffer(valor, dtype=np.int8, offset=2).astype(np.float32)
+        return np.frombuffer(valor, dtype='<f4', offset=2)
+    return np.asarray(valor, dtype=np.float32)
+
+
+def _normalizar_linhas(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    matriz /= normas
+    return matriz
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Posições dos k maiores scores, em ordem decrescente (argpartition evita ordenar tudo)."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    parte = np.argpartition(-scores, k)[:k]
+    return parte[np.argsort(-scores[parte])]
+
+
+class IndiceIVF:
+    """
+    Índice aproximado por listas invertidas: k-means esférico agrupa os vetores em `n_listas`
+    células; a busca compara a consulta só com os vetores das `n_sondas` células mais próximas.
+    """
+
+    def __init__(self, matriz: np.ndarray, n_listas: Optional[int] = None,
+                 iteracoes: int = ITERACOES_KMEANS, semente: int = 0):
+        n = len(matriz)
+        self.n_listas = min(n, n_listas or max(1, int(math.sqrt(n))))
+        rng = np.random.default_rng(semente)
+        self.centroides = matriz[rng.choice(n, self.n_listas, replace=False)].copy()
+
+        for _ in range(iteracoes):
+            atribuicao = self._atribuir(matriz)
+            contagem = np.bincount(atribuicao, minlength=self.n_listas)
+            ordem = np.argsort(atribuicao, kind='stable')
+            inicios = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+            ocupadas = contagem > 0
+            # Soma dos membros de cada célula de uma vez (células vazias mantêm o centróide anterior)
+            self.centroides[ocupadas] = np.add.reduceat(matriz[ordem], inicios[ocupadas], axis=0)
+            _normalizar_linhas(self.centroides)
+
+        atribuicao = self._atribuir(matriz)
+        ordem = np.argsort(atribuicao, kind='stable')
+        limites = np.cumsum(np.bincount(atribuicao, minlength=self.n_listas))[:-1]
+        self.listas: List[np.ndarray] = np.split(ordem, limites)
+
+    def _atribuir(self, matriz: np.ndarray) -> np.ndarray:
+        # Em blocos, para não materializar a matriz n × n_listas inteira
+        return np.concatenate([
+            np.argmax(matriz[i:i + BLOCO_ATRIBUICAO] @ self.centroides.T, axis=1)
+            for i in range(0, len(matriz), BLOCO_ATRIBUICAO)
+        ]) if len(matriz) else np.empty(0, dtype=np.int64)
+
+    def candidatos(self, consulta: np.ndarray, n_sondas: int = SONDAS_PADRAO) -> np.ndarray:
+        celulas = _top_k(self.centroides @ consulta, min(n_sondas, self.n_listas))
+        return np.sort(np.concatenate([self.listas[c] for c in celulas]))
+
+
+class IndiceLocal:
+    """
+    Busca vetorial em memória sobre as FAQs: matriz NumPy contígua (float32, linhas normalizadas),
+    top-k exato por cosseno e os mesmos pré-filtros do índice do Atlas (isActive e category).
+    """
+
+    def __init__(self, matriz: np.ndarray, metadados: List[Dict]):
+        self.matriz = _normalizar_linhas(np.ascontiguousarray(matriz, dtype=np.float32))
+        self.metadados = metadados
+        self.ativos = np.array([bool(m.get("isActive")) for m in metadados], dtype=bool)
+        self.categorias = np.array([m.get("category") or "" for m in metadados], dtype=object)
+        self.ivf: Optional[IndiceIVF] = None
+
+    def __len__(self):
+        return len(self.metadados)
+
+    @property
+    def dimensao(self) -> int:
+        return self.matriz.shape[1] if self.matriz.ndim == 2 else 0
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    @classmethod
+    def do_mongo(cls, col_dados, dimensao: int, filtro: Optional[Dict] = None,
+                 campo: str = "embedding") -> "IndiceLocal":
+        """Carrega os vetores (do `campo` do perfil ativo) da coleção de FAQs direto para uma matriz pré-alocada."""
+        consulta = {campo: {"$ne": None}, **(filtro or {})}
+        total = col_dados.count_documents(consulta)
+        matriz = np.empty((total, dimensao), dtype=np.float32)
+        metadados: List[Dict] = []
+        ignorados = 0
+        for doc in col_dados.find(consulta, {**PROJECAO_BUSCA, campo: 1}):
+            if len(metadados) >= total:
+                break  # Documentos inseridos durante a carga ficam para a próxima
+            vetor = _vetor_numpy(doc.pop(campo))
+            if vetor.shape[0] != dimensao:
+                ignorados += 1
+                continue
+            matriz[len(metadados)] = vetor
+            doc["_id"] = str(doc["_id"])
+            metadados.append(doc)
+        if ignorados:
+            logger.warning(f"⚠️ {ignorados} vetores com dimensão diferente de {dimensao} foram ignorados.")
+        return cls(matriz[:len(metadados)], metadados)
+
+    def salvar_snapshot(self, caminho: str):
+        """Grava matriz + metadados em um .npz, para buscar depois sem acessar o MongoDB."""
+        np.savez(caminho, matriz=self.matriz,
+                 metadados=np.array(json.dumps(self.metadados, ensure_ascii=False, default=str)))
+
+    @classmethod
+    def do_snapshot(cls, caminho: str) -> "IndiceLocal":
+        with np.load(caminho, allow_pickle=False) as dados:
+            return cls(dados["matriz"], json.loads(str(dados["metadados"])))
+
+    def construir_ivf(self, n_listas: Optional[int] = None, iteracoes: int = ITERACOES_KMEANS) -> IndiceIVF:
+        self.ivf = IndiceIVF(self.matriz, n_listas, iteracoes)
+        return self.ivf
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+    def _mascara(self, somente_ativos: bool, categoria: Optional[str]) -> Optional[np.ndarray]:
+        mascara = None
+        if somente_ativos:
+            mascara = self.ativos
+        if categoria:
+            por_categoria = self.categorias == categoria.strip().lower()
+            mascara = por_categoria if mascara is None else mascara & por_categoria
+        return mascara
+
+    def buscar(self, consulta, k: int = 5, categoria: Optional[str] = None, somente_ativos: bool = True,
+               aproximado: bool = False, n_sondas: int = SONDAS_PADRAO) -> List[ResultadoBusca]:
+        """Top-k por similaridade de cosseno entre `consulta` e as FAQs que passam pelos filtros."""
+        q = np.asarray(consulta, dtype=np.float32)
+        if q.shape[0] != self.dimensao:
+            raise ValueError(f"Consulta com {q.shape[0]} dimensões; o índice tem {self.dimensao}")
+        q = q / (np.linalg.norm(q) or 1.0)
+        if not len(self):
+            return []
+
+        mascara = self._mascara(somente_ativos, categoria)
+        if aproximado:
+            if self.ivf is None:
+                self.construir_ivf()
+            posicoes = self.ivf.candidatos(q, n_sondas)
+            if mascara is not None:
+                posicoes = posicoes[mascara[posicoes]]
+        elif mascara is not None and mascara.mean() < FRACAO_PARA_COPIAR:
+            # Filtro seletivo: copiar só as linhas que passam sai mais barato que multiplicar a matriz toda
+            posicoes = np.flatnonzero(mascara)
+        else:
+            posicoes = None
+
+        if posicoes is None:
+            scores = self.matriz @ q
+            if mascara is not None:
+                scores[~mascara] = -np.inf
+            melhores = _top_k(scores, min(k, len(scores) if mascara is None else int(mascara.sum())))
+            pares = zip(melhores, scores[melhores])
+        else:
+            scores = self.matriz[posicoes] @ q
+            melhores = _top_k(scores, k)
+            pares = zip(posicoes[melhores], scores[melhores])
+
+        resultados = []
+        for posicao, score in pares:
+            m = self.metadados[posicao]
+            resultados.append(ResultadoBusca(
+                id=m["_id"], score=float(score), pergunta=m.get("question", ""), resposta=m.get("answer", ""),
+                categoria=m.get("category", ""), arquivo=m.get("file_origin", ""),
+                linha=m.get("line_reference"), ativo=bool(m.get("isActive"))
+            ))
+        return resultados
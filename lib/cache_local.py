@@ -0,0 +1,158 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lib.repositorio_embeddings import texto_para_embedding
+from lib.vetores import ajustar_dimensao, decodificar, dimensao_de, eh_int8
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURAÇÕES (podem ser sobrescritas pelo .env: EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB)
+# ============================================================================
+CAMINHO_PADRAO = os.path.join(".cache", "embeddings.sqlite")
+TAMANHO_MAXIMO_MB = 512
+# Ao passar do limite, remove os menos usados até sobrar esta fração do tamanho máximo
+FRACAO_APOS_LIMPEZA = 0.9
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    chave TEXT PRIMARY KEY,
+    modelo TEXT NOT NULL,
+    dimensao INTEGER NOT NULL,
+    vetor BLOB NOT NULL,
+    tamanho INTEGER NOT NULL,
+    ultimo_acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_acesso ON embeddings (ultimo_acesso);
+"""
+
+
+def _para_blob(vetor: List[float]) -> bytes:
+    return array('f', vetor).tobytes()
+
+
+def _de_blob(blob: bytes) -> List[float]:
+    vetor = array('f')
+    vetor.frombytes(blob)
+    return vetor.tolist()
+
+
+class CacheLocalEmbeddings:
+    """
+    Cache persistente em SQLite na frente da API de embeddings.
+
+    A chave é o hash do texto enviado + modelo + dimensão; os vetores ficam em float32.
+    Quando o arquivo passa do tamanho máximo, os vetores acessados há mais tempo são removidos.
+    """
+
+    def __init__(self, modelo: str, dimensao: int, caminho: Optional[str] = None,
+                 tamanho_maximo_mb: Optional[int] = None):
+        self.modelo = modelo
+        self.dimensao = dimensao
+        self.caminho = caminho or os.getenv("EMBEDDING_CACHE_PATH", CAMINHO_PADRAO)
+        self.tamanho_maximo = (tamanho_maximo_mb or int(os.getenv("EMBEDDING_CACHE_MAX_MB", TAMANHO_MAXIMO_MB))) * 1024 * 1024
+
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        # A etapa de embedding do pipeline roda em outra thread: uma conexão compartilhada, protegida por lock
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.executescript(ESQUEMA)
+        self._lock = threading.Lock()
+
+    def chave(self, texto: str) -> str:
+        hash_texto = hashlib.sha256(texto.encode('utf-8')).hexdigest()
+        return f"{hash_texto}|{self.modelo}|{self.dimensao}"
+
+    def buscar(self, textos: Iterable[str]) -> Dict[str, List[float]]:
+        """Vetores em cache para os textos informados, indexados pelo próprio texto."""
+        por_chave = {self.chave(t): t for t in textos}
+        if not por_chave:
+            return {}
+        encontrados: Dict[str, List[float]] = {}
+        chaves = list(por_chave)
+        with self._lock:
+            # SQLite limita o número de parâmetros por consulta
+            for i in range(0, len(chaves), 500):
+                parte = chaves[i:i + 500]
+                marcadores = ",".join("?" * len(parte))
+                linhas = self._conexao.execute(
+                    f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", parte).fetchall()
+                for chave, blob in linhas:
+                    encontrados[por_chave[chave]] = _de_blob(blob)
+            if encontrados:
+                agora = time.time()
+                self._conexao.executemany(
+                    "UPDATE embeddings SET ultimo_acesso = ? WHERE chave = ?",
+                    [(agora, self.chave(t)) for t in encontrados])
+                self._conexao.commit()
+        return encontrados
+
+    def salvar(self, vetores: Dict[str, List[float]]):
+        """Guarda vetores (texto → vetor) e aplica o limite de tamanho."""
+        if not vetores:
+            return
+        agora = time.time()
+        linhas: List[Tuple] = []
+        for texto, vetor in vetores.items():
+            blob = _para_blob(vetor)
+            linhas.append((self.chave(texto), self.modelo, self.dimensao, blob, len(blob), agora))
+        with self._lock:
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO embeddings (chave, modelo, dimensao, vetor, tamanho, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?, ?, ?)", linhas)
+            self._conexao.commit()
+            self._limpar_excesso()
+
+    def _limpar_excesso(self):
+        total = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM embeddings").fetchone()[0]
+        if total <= self.tamanho_maximo:
+            return
+        alvo = total - int(self.tamanho_maximo * FRACAO_APOS_LIMPEZA)
+        removidos, liberado = 0, 0
+        for chave, tamanho in self._conexao.execute(
+                "SELECT chave, tamanho FROM embeddings ORDER BY ultimo_acesso").fetchall():
+            if liberado >= alvo:
+                break
+            self._conexao.execute("DELETE FROM embeddings WHERE chave = ?", (chave,))
+            liberado += tamanho
+            removidos += 1
+        self._conexao.commit()
+        logger.info(f"🧹 Cache local: {removidos} vetores antigos removidos ({liberado / 1024 / 1024:.1f} MB).")
+
+    def aquecer(self, col_dados, col_embeddings=None, campo: str = "embedding") -> int:
+        """
+        Preenche o cache com os vetores que já estão no Mongo (FAQs e, se informado, o armazém global),
+        para que uma reconstrução do banco não precise chamar a API.
+        """
+        do_armazem = {}
+        if col_embeddings is not None:
+            docs = col_embeddings.find({"model": self.modelo, "dimensions": self.dimensao},
+                                       {"_id": 0, "content_hash": 1, "embedding": 1})
+            do_armazem = {doc["content_hash"]: doc["embedding"] for doc in docs}
+
+        vetores: Dict[str, List[float]] = {}
+        for doc in col_dados.find({}, {"_id": 0, "question": 1, "answer": 1, "content_hash": 1, campo: 1}):
+            vetor = do_armazem.get(doc.get("content_hash"))
+            if vetor is None:
+                vetor = doc.get(campo)
+                # Vetores int8 perderam precisão e não servem de cache; maiores são truncados para a dimensão atual
+                if vetor is None or eh_int8(vetor) or dimensao_de(vetor) < self.dimensao:
+                    continue
+            vetor = decodificar(vetor)
+            if len(vetor) > self.dimensao:
+                vetor = ajustar_dimensao(vetor, self.dimensao)
+            vetores[texto_para_embedding(doc["question"], doc["answer"])] = vetor
+        self.salvar(vetores)
+        logger.info(f"🔥 Cache local aquecido com {len(vetores)} vetores do MongoDB.")
+        return len(vetores)
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
@@ -0,0 +1,262 @@
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# COORDENAÇÃO ENTRE TRABALHADORES (vários enviar_dados.py, em um ou mais hosts)
+# Tudo fica em sync_metadata: um documento de lease por arquivo e um contador de orçamento por rodada.
+# Os prazos usam o relógio do servidor ($$NOW), então hosts com relógios diferentes não se atrapalham.
+# ============================================================================
+PREFIXO_LEASE = "lease:"                  # _id dos leases: "lease:<file_id>" (sem o campo file_id, que é dos metadados)
+PREFIXO_ORCAMENTO = "orcamento_global:"   # _id dos contadores: "orcamento_global:<rodada>"
+DURACAO_LEASE = 300.0                     # Segundos até um lease sem renovação poder ser tomado por outro trabalhador
+DIAS_CONTADORES = 7                       # Contadores de rodadas mais antigas são apagados
+CHAVE_BACKLOG = "backlog_embeddings"      # Lease da drenagem do backlog (um trabalhador por vez)
+CHAVE_MANUTENCAO = "manutencao_colecao"   # Lease exclusivo do limpar_banco.py (limpeza ou reconstrução)
+PREFIXO_SINCRONIZACAO = "sincronizacao:"  # Lease de cada execução que grava na coleção: "sincronizacao:<dono>"
+ESPERA_SINCRONIZACOES = 1800.0            # Segundos que a manutenção espera as sincronizações em andamento terminarem
+INTERVALO_ESPERA = 5.0
+
+_LIBERADO = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def id_trabalhador() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def rodada_atual() -> str:
+    """Rodada padrão: a hora UTC em que o cron disparou os trabalhadores (todos caem na mesma)."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H")
+
+
+class LeasesArquivos:
+    """
+    Reivindica arquivos com leases atômicos (find_one_and_update com upsert) em sync_metadata.
+
+    Um lease pode ser tomado se não existe, se expirou ou se já é deste trabalhador; se outro o
+    detém, o upsert esbarra no _id e a reivindicação falha. Ao liberar um arquivo gravado, o
+    lease guarda a versão (modifiedTime) concluída, e ninguém mais reprocessa essa versão.
+    Uma thread renova os leases ativos a cada terço da duração; se o processo morrer, eles
+    expiram e outro trabalhador assume os arquivos.
+    """
+
+    def __init__(self, col_meta, dono: Optional[str] = None, duracao: float = DURACAO_LEASE):
+        self.col_meta = col_meta
+        self.dono = dono or id_trabalhador()
+        self.duracao = duracao
+        self.ativos: Set[str] = set()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _prazo(self) -> Dict:
+        return {"$add": ["$$NOW", int(self.duracao * 1000)]}
+
+    def reivindicar(self, chave: str, versao: Optional[str] = None) -> bool:
+        """Tenta pegar o lease de `chave`; com `versao`, falha também se essa versão já foi concluída."""
+        from pymongo.errors import DuplicateKeyError
+        filtro = {"_id": PREFIXO_LEASE + chave,
+                  "$or": [{"dono": self.dono}, {"$expr": {"$lt": ["$expira_em", "$$NOW"]}}]}
+        if versao is not None:
+            filtro["versao_concluida"] = {"$ne": versao}
+        try:
+            self.col_meta.find_one_and_update(
+                filtro,
+                [{"$set": {"dono": self.dono, "expira_em": self._prazo(), "adquirido_em": "$$NOW"}}],
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        with self._lock:
+            self.ativos.add(chave)
+        return True
+
+    def liberar(self, chave: str, versao: Optional[str] = None):
+        """Solta o lease; com `versao`, registra que essa versão do arquivo está gravada."""
+        campos = {"dono": None, "expira_em": _LIBERADO}
+        if versao is not None:
+            campos["versao_concluida"] = versao
+        self.col_meta.update_one({"_id": PREFIXO_LEASE + chave, "dono": self.dono}, {"$set": campos})
+        with self._lock:
+            self.ativos.discard(chave)
+
+    def descartar(self, chave: str):
+        """Apaga o documento do lease (em vez de soltá-lo), para chaves que não se repetem entre execuções."""
+        self.col_meta.delete_one({"_id": PREFIXO_LEASE + chave, "dono": self.dono})
+        with self._lock:
+            self.ativos.discard(chave)
+
+    def liberar_todos(self):
+        """Solta (sem marcar versão) o que ficou preso: arquivos que falharam voltam para a fila."""
+        with self._lock:
+            chaves = list(self.ativos)
+            self.ativos.clear()
+        if chaves:
+            self.col_meta.update_many({"_id": {"$in": [PREFIXO_LEASE + c for c in chaves]}, "dono": self.dono},
+                                      {"$set": {"dono": None, "expira_em": _LIBERADO}})
+
+    def pendentes(self, arquivos: List[Dict]) -> List[str]:
+        """IDs dos arquivos cuja versão atual (modifiedTime) ainda não foi gravada por nenhum trabalhador."""
+        concluidas = {doc["_id"][len(PREFIXO_LEASE):]: doc.get("versao_concluida") for doc in self.col_meta.find(
+            {"_id": {"$in": [PREFIXO_LEASE + a['id'] for a in arquivos]}}, {"versao_concluida": 1})}
+        return [a['id'] for a in arquivos if concluidas.get(a['id']) != a['modifiedTime']]
+
+    def renovar(self) -> int:
+        with self._lock:
+            chaves = list(self.ativos)
+        if not chaves:
+            return 0
+        resultado = self.col_meta.update_many(
+            {"_id": {"$in": [PREFIXO_LEASE + c for c in chaves]}, "dono": self.dono},
+            [{"$set": {"expira_em": self._prazo()}}]
+        )
+        if resultado.matched_count < len(chaves):
+            logger.warning(f"⚠️ {len(chaves) - resultado.matched_count} lease(s) expiraram antes da renovação "
+                           f"e podem ter sido assumidos por outro trabalhador.")
+        return resultado.matched_count
+
+    def _laco_renovacao(self):
+        while not self._parar.wait(self.duracao / 3):
+            try:
+                self.renovar()
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao renovar os leases: {e}")
+
+    def __enter__(self):
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._laco_renovacao, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+        self.liberar_todos()
+
+
+class OrcamentoCompartilhado:
+    """
+    Contador global de embeddings novos da rodada, em sync_metadata, compartilhado pelos trabalhadores.
+
+    Reservar é um `$inc` atômico; o que passar do limite é devolvido logo em seguida, então a
+    soma concedida a todos os trabalhadores nunca ultrapassa o limite. O primeiro trabalhador da
+    rodada fixa o limite.
+    """
+
+    def __init__(self, col_meta, rodada: str, limite: int):
+        self.col_meta = col_meta
+        self.rodada = rodada
+        self.limite = max(0, limite)
+        self._id = PREFIXO_ORCAMENTO + rodada
+
+    def _incrementar(self, quantidade: int) -> Dict:
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+        atualizacao = {"$inc": {"usados": quantidade},
+                       "$setOnInsert": {"limite": self.limite, "criado_em": datetime.now(timezone.utc)}}
+        try:
+            return self.col_meta.find_one_and_update({"_id": self._id}, atualizacao, upsert=True,
+                                                     return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # Dois trabalhadores criando o contador ao mesmo tempo: agora ele existe
+            return self.col_meta.find_one_and_update({"_id": self._id}, atualizacao,
+                                                     return_document=ReturnDocument.AFTER)
+
+    def reservar(self, quantidade: int) -> int:
+        """Quantos dos `quantidade` embeddings cabem no orçamento global da rodada."""
+        if quantidade <= 0:
+            return 0
+        doc = self._incrementar(quantidade)
+        excesso = min(quantidade, max(0, doc["usados"] - doc.get("limite", self.limite)))
+        if excesso:
+            self.col_meta.update_one({"_id": self._id}, {"$inc": {"usados": -excesso}})
+        return quantidade - excesso
+
+    def devolver(self, quantidade: int):
+        if quantidade > 0:
+            self.col_meta.update_one({"_id": self._id}, {"$inc": {"usados": -quantidade}})
+
+    @property
+    def restante(self) -> int:
+        doc = self.col_meta.find_one({"_id": self._id}) or {}
+        return max(0, doc.get("limite", self.limite) - doc.get("usados", 0))
+
+    def limpar_antigos(self, dias: int = DIAS_CONTADORES):
+        self.col_meta.delete_many({"_id": {"$regex": f"^{PREFIXO_ORCAMENTO}"},
+                                   "criado_em": {"$lt": datetime.now(timezone.utc) - timedelta(days=dias)}})
+
+
+# ============================================================================
+# SINCRONIZAÇÕES × MANUTENÇÃO DA COLEÇÃO (limpar_banco.py)
+# Cada sincronização ou backfill registra um lease próprio e só então confere o lease de manutenção;
+# a manutenção pega o seu e só então espera os das sincronizações sumirem. Como os dois lados gravam
+# antes de ler, pelo menos um deles enxerga o outro: nenhuma escrita cai entre a cópia e a troca.
+# ============================================================================
+
+def _lease_vigente() -> Dict:
+    return {"$expr": {"$gt": ["$expira_em", "$$NOW"]}}
+
+
+def manutencao_ativa(col_meta) -> Optional[str]:
+    """Dono do lease de manutenção, se o limpar_banco.py estiver limpando ou reconstruindo a coleção."""
+    doc = col_meta.find_one({"_id": PREFIXO_LEASE + CHAVE_MANUTENCAO, **_lease_vigente()}, {"dono": 1})
+    return doc["dono"] if doc else None
+
+
+def sincronizacoes_ativas(col_meta) -> List[str]:
+    """Donos das sincronizações (e backfills) em andamento, pelos leases ainda não expirados."""
+    return [doc["dono"] for doc in col_meta.find(
+        {"_id": {"$regex": f"^{PREFIXO_LEASE}{PREFIXO_SINCRONIZACAO}"}, **_lease_vigente()}, {"dono": 1})]
+
+
+@contextmanager
+def sessao_sincronizacao(col_meta, dono: Optional[str] = None, duracao: float = DURACAO_LEASE):
+    """
+    Registra uma execução que grava na coleção de FAQs (renovado enquanto ela roda). Recusa começar
+    se o limpar_banco.py estiver com a coleção: as escritas se perderiam na troca ou na limpeza.
+    """
+    leases = LeasesArquivos(col_meta, dono, duracao)
+    chave = PREFIXO_SINCRONIZACAO + leases.dono
+    with leases:
+        leases.reivindicar(chave)
+        try:
+            em_manutencao = manutencao_ativa(col_meta)
+            if em_manutencao:
+                raise RuntimeError(f"O limpar_banco.py ({em_manutencao}) está limpando ou reconstruindo a coleção "
+                                   f"de FAQs; rode de novo quando ele terminar")
+            yield leases
+        finally:
+            # O dono leva o pid: solto, o documento ficaria para sempre em sync_metadata
+            leases.descartar(chave)
+
+
+@contextmanager
+def manutencao_exclusiva(col_meta, dono: Optional[str] = None, duracao: float = DURACAO_LEASE,
+                         espera: float = ESPERA_SINCRONIZACOES, intervalo: float = INTERVALO_ESPERA):
+    """
+    Lease exclusivo da limpeza/reconstrução: novas sincronizações recusam começar e as que já estão
+    rodando terminam antes do bloco. Um processo que morreu sem liberar o lease deixa de contar quando ele expira.
+    """
+    leases = LeasesArquivos(col_meta, dono, duracao)
+    with leases:
+        if not leases.reivindicar(CHAVE_MANUTENCAO):
+            raise RuntimeError("Outra limpeza ou reconstrução da coleção já está em andamento")
+        limite = time.monotonic() + espera
+        while True:
+            ativas = sincronizacoes_ativas(col_meta)
+            if not ativas:
+                break
+            if time.monotonic() >= limite:
+                raise TimeoutError(f"{len(ativas)} sincronização(ões) ainda em andamento após {espera:.0f}s: "
+                                   f"{', '.join(ativas)}")
+            logger.info(f"⏳ Aguardando {len(ativas)} sincronização(ões) em andamento: {', '.join(ativas)}")
+            time.sleep(intervalo)
+        yield leases
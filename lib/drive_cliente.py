@@ -0,0 +1,80 @@
+import io
+import json
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CLIENTE DO GOOGLE DRIVE
+# googleapiclient e google.oauth2 só são importados quando o Drive é usado de fato. O documento de
+# descoberta do Drive v3 vem da cópia estática que acompanha o googleapiclient (sem rede) e é lido
+# uma única vez por processo; cada thread monta o seu serviço a partir dele.
+# ============================================================================
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+API_DRIVE = "drive"
+VERSAO_DRIVE = "v3"
+
+_documento: Optional[Dict] = None
+_lock_documento = threading.Lock()
+
+
+def documento_descoberta() -> Optional[Dict]:
+    """Documento de descoberta do Drive v3, já interpretado; None se o googleapiclient não traz a cópia estática."""
+    global _documento
+    with _lock_documento:
+        if _documento is None:
+            try:
+                from googleapiclient.discovery_cache import get_static_doc
+            except ImportError:  # googleapiclient < 2.0, sem cópias estáticas
+                return None
+            texto = get_static_doc(API_DRIVE, VERSAO_DRIVE)
+            if texto is None:
+                return None
+            _documento = json.loads(texto)
+        return _documento
+
+
+class ClienteDrive:
+    """
+    Credenciais carregadas uma vez e um serviço do Drive por thread, reutilizado pela execução inteira
+    (listagem, Changes API e downloads). O cliente HTTP do googleapiclient não é thread-safe.
+    """
+
+    def __init__(self, arquivo_credenciais: str):
+        self.arquivo_credenciais = arquivo_credenciais
+        self._credenciais = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def credenciais(self):
+        with self._lock:
+            if self._credenciais is None:
+                from google.oauth2 import service_account
+                self._credenciais = service_account.Credentials.from_service_account_file(
+                    self.arquivo_credenciais, scopes=SCOPES)
+            return self._credenciais
+
+    def servico(self):
+        """O serviço do Drive desta thread (criado na primeira chamada)."""
+        if not hasattr(self._local, "service"):
+            documento = documento_descoberta()
+            if documento is not None:
+                from googleapiclient.discovery import build_from_document
+                self._local.service = build_from_document(documento, credentials=self.credenciais)
+            else:
+                from googleapiclient.discovery import build
+                self._local.service = build(API_DRIVE, VERSAO_DRIVE, credentials=self.credenciais)
+        return self._local.service
+
+    def baixar(self, file_id: str) -> bytes:
+        from googleapiclient.http import MediaIoBaseDownload
+        request = self.servico().files().get_media(fileId=file_id)
+        fh = io.BytesIO()
+        downloader = MediaIoBaseDownload(fh, request)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+        return fh.getvalue()
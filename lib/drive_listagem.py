@@ -0,0 +1,74 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MIME_PASTA = "application/vnd.google-apps.folder"
+
+TAMANHO_PAGINA = 1000       # Máximo aceito por files().list
+LISTAGENS_PARALELAS = 4
+# Só o necessário para decidir se o arquivo precisa ser processado (md5Checksum detecta conteúdo igual)
+CAMPOS_LISTAGEM = "nextPageToken, files(id, name, mimeType, modifiedTime, md5Checksum)"
+
+
+def eh_docx(arquivo: Dict) -> bool:
+    return arquivo.get("mimeType") == MIME_DOCX and arquivo.get("name", "").endswith(".docx")
+
+
+def listar_filhos(service, id_pasta: str) -> List[Dict]:
+    """Lista todos os .docx e subpastas diretos de uma pasta, percorrendo todas as páginas."""
+    query = (f"'{id_pasta}' in parents and trashed = false and "
+             f"(mimeType = '{MIME_DOCX}' or mimeType = '{MIME_PASTA}')")
+    itens: List[Dict] = []
+    pagina = None
+    while True:
+        resposta = service.files().list(
+            q=query, pageSize=TAMANHO_PAGINA, pageToken=pagina, fields=CAMPOS_LISTAGEM
+        ).execute()
+        itens.extend(resposta.get("files", []))
+        pagina = resposta.get("nextPageToken")
+        if not pagina:
+            return itens
+
+
+def listar_pasta_recursiva(criar_servico: Callable[[], object], id_raiz: str,
+                           paralelos: int = LISTAGENS_PARALELAS) -> Dict:
+    """
+    Percorre a pasta raiz e todas as subpastas em paralelo e devolve o manifesto da árvore:
+
+        {"arquivos": [{id, name, mimeType, modifiedTime, md5Checksum, pasta}], "pastas": {id_pasta: nome}}
+
+    Cada subpasta é listada assim que descoberta, então o tempo total acompanha a largura
+    da árvore e não a soma de todas as pastas. `criar_servico` é chamado uma vez por thread,
+    porque o cliente HTTP do googleapiclient não é thread-safe.
+    """
+    local = threading.local()
+
+    def listar(id_pasta: str) -> List[Dict]:
+        if not hasattr(local, "service"):
+            local.service = criar_servico()
+        return listar_filhos(local.service, id_pasta)
+
+    arquivos: List[Dict] = []
+    pastas: Dict[str, str] = {id_raiz: ""}
+
+    with ThreadPoolExecutor(max_workers=max(1, paralelos)) as executor:
+        pendentes = {executor.submit(listar, id_raiz): id_raiz}
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                id_pasta = pendentes.pop(futuro)
+                for item in futuro.result():
+                    if item["mimeType"] == MIME_PASTA:
+                        if item["id"] not in pastas:
+                            pastas[item["id"]] = item["name"]
+                            pendentes[executor.submit(listar, item["id"])] = item["id"]
+                    elif eh_docx(item) and not item["name"].startswith("~$"):
+                        item["pasta"] = id_pasta
+                        arquivos.append(item)
+
+    logger.info(f"📂 Drive: {len(arquivos)} arquivo(s) .docx em {len(pastas)} pasta(s).")
+    return {"arquivos": arquivos, "pastas": pastas}
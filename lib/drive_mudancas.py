@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from lib.drive_listagem import MIME_PASTA, eh_docx
+
+# Documento especial da coleção sync_metadata que guarda o cursor da Changes API
+ID_TOKEN_MUDANCAS = "drive_changes_page_token"
+
+CAMPOS_MUDANCAS = ("nextPageToken, newStartPageToken, "
+                   "changes(fileId, removed, file(id, name, mimeType, modifiedTime, md5Checksum, trashed, parents))")
+
+
+def carregar_estado(col_meta) -> Optional[Dict]:
+    """Cursor salvo da Changes API e as pastas da árvore sincronizada: {"page_token", "pastas"}."""
+    return col_meta.find_one({"_id": ID_TOKEN_MUDANCAS})
+
+
+def salvar_estado(col_meta, token: str, pastas: Iterable[str]):
+    col_meta.update_one(
+        {"_id": ID_TOKEN_MUDANCAS},
+        {"$set": {"page_token": token, "pastas": sorted(pastas), "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+def obter_token_inicial(service) -> str:
+    """Cursor do "agora" no Drive: mudanças posteriores a ele aparecem na próxima execução."""
+    return service.changes().getStartPageToken().execute()["startPageToken"]
+
+
+def listar_mudancas(service, token: str, id_raiz: str, pastas: Set[str]) -> Tuple[List[Dict], List[str], str, bool]:
+    """
+    Lê as mudanças do Drive desde `token`, considerando a árvore formada por `pastas` (raiz inclusa).
+
+    Retorna (arquivos alterados ou novos na árvore, ids removidos/excluídos/movidos para fora,
+    novo token, estrutura_mudou). `estrutura_mudou` indica que uma subpasta entrou, saiu ou foi
+    excluída: nesse caso o conteúdo dela não aparece como mudança e é preciso listar a árvore de novo.
+    Cada arquivo alterado leva em "pasta" a pasta da árvore em que está, como na listagem completa.
+    Os ids "fora" incluem qualquer arquivo da conta que mudou fora da árvore: passe-os por
+    `filtrar_conhecidos` antes de desativar. Sem mudanças, custa uma única chamada à API.
+    """
+    alterados: Dict[str, Dict] = {}
+    removidos: Dict[str, bool] = {}
+    estrutura_mudou = False
+    pagina = token
+
+    while True:
+        resposta = service.changes().list(
+            pageToken=pagina, spaces="drive", includeRemoved=True, pageSize=1000, fields=CAMPOS_MUDANCAS
+        ).execute()
+
+        # Mudanças chegam em ordem cronológica: a última de cada arquivo prevalece
+        for mudanca in resposta.get("changes", []):
+            file_id = mudanca["fileId"]
+            arquivo = mudanca.get("file") or {}
+            pais_na_arvore = [p for p in arquivo.get("parents", []) if p in pastas]
+            na_arvore = bool(pais_na_arvore)
+            fora = mudanca.get("removed") or arquivo.get("trashed") or (file_id != id_raiz and not na_arvore)
+
+            if arquivo.get("mimeType") == MIME_PASTA or (fora and file_id in pastas):
+                if (file_id in pastas) == fora:
+                    estrutura_mudou = True
+            elif fora:
+                alterados.pop(file_id, None)
+                removidos[file_id] = True
+            elif eh_docx(arquivo) and not arquivo["name"].startswith("~$"):
+                removidos.pop(file_id, None)
+                alterados[file_id] = {k: arquivo[k] for k in ("id", "name", "mimeType", "modifiedTime", "md5Checksum")
+                                      if k in arquivo}
+                alterados[file_id]["pasta"] = pais_na_arvore[0]
+
+        if "newStartPageToken" in resposta:
+            return list(alterados.values()), list(removidos), resposta["newStartPageToken"], estrutura_mudou
+        pagina = resposta["nextPageToken"]
+
+
+def filtrar_conhecidos(col_meta, file_ids: List[str]) -> List[str]:
+    """Só os ids que já foram sincronizados (têm metadados): o resto mudou fora da pasta e nunca esteve nela."""
+    if not file_ids:
+        return []
+    conhecidos = set(col_meta.distinct("file_id", {"file_id": {"$in": file_ids}}))
+    return [fid for fid in file_ids if fid in conhecidos]
+
+
+def desativar_arquivos_removidos(col_dados, col_meta, file_ids: List[str]) -> int:
+    """Tira do ar as FAQs de arquivos que saíram da pasta e esquece seus metadados de sincronização."""
+    if not file_ids:
+        return 0
+    resultado = col_dados.update_many(
+        {"file_id": {"$in": file_ids}, "isActive": True},
+        {"$set": {"isActive": False, "updatedAt": datetime.now(timezone.utc)}}
+    )
+    col_meta.delete_many({"file_id": {"$in": file_ids}})
+    return resultado.modified_count
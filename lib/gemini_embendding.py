@@ -1,22 +1,137 @@
 import os
-from google import genai
-from google.genai import types
+from typing import Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
+from lib.vetores import normalizar
+
+# ============================================================================
+# CONFIGURAÇÕES DO MODELO
+# ============================================================================
+MODELO_EMBEDDING = "gemini-embedding-001"
+DIMENSAO_EMBEDDING = 3072
+TASK_TYPE = "SEMANTIC_SIMILARITY"
+
+# Limites de cada requisição em lote (batchEmbedContents aceita até 100 textos)
+MAX_ITENS_POR_LOTE = 100
+MAX_TOKENS_POR_LOTE = 20000
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token) sem chamar a API."""
+    return max(1, len(texto) // 4)
+
+
+def dividir_em_lotes(textos: List[str], max_itens: int = MAX_ITENS_POR_LOTE,
+                     max_tokens: int = MAX_TOKENS_POR_LOTE) -> List[List[int]]:
+    """Agrupa os índices dos textos em lotes limitados por quantidade e por tokens estimados."""
+    lotes: List[List[int]] = []
+    atual: List[int] = []
+    tokens_atual = 0
+    for i, texto in enumerate(textos):
+        tokens = estimar_tokens(texto)
+        if atual and (len(atual) >= max_itens or tokens_atual + tokens > max_tokens):
+            lotes.append(atual)
+            atual, tokens_atual = [], 0
+        atual.append(i)
+        tokens_atual += tokens
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+class ServicoEmbedding:
+    """Mantém um único cliente Gemini aberto e gera embeddings em lote."""
+
+    def __init__(self, api_key: Optional[str] = None, modelo: str = MODELO_EMBEDDING,
+                 dimensao: int = DIMENSAO_EMBEDDING, max_itens_por_lote: int = MAX_ITENS_POR_LOTE,
+                 max_tokens_por_lote: int = MAX_TOKENS_POR_LOTE):
+        self.api_key = api_key
+        self.modelo = modelo
+        self.dimensao = dimensao
+        self.max_itens_por_lote = max_itens_por_lote
+        self.max_tokens_por_lote = max_tokens_por_lote
+        self._client = None
+        self._configuracao = None
+
+    @property
+    def client(self):
+        """
+        Cria o cliente na primeira utilização e o reutiliza pelo resto da execução. O google-genai
+        (meio segundo de import) só é carregado aqui: execuções que não geram embeddings nem o importam.
+        """
+        if self._client is None:
+            from google import genai
+            if self.api_key is None:
+                load_dotenv()
+                self.api_key = os.getenv("GEMINI_API_KEY")
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def _config(self):
+        if self._configuracao is None:
+            from google.genai import types
+            self._configuracao = types.EmbedContentConfig(task_type=TASK_TYPE, output_dimensionality=self.dimensao)
+        return self._configuracao
+
+    def embed_content(self, conteudo):
+        """Chamada direta à API (um texto ou uma lista de textos em uma única requisição)."""
+        return self.client.models.embed_content(model=self.modelo, contents=conteudo, config=self._config())
+
+    def valores(self, result) -> List[List[float]]:
+        """Vetores da resposta da API, prontos para gravar (caminho comum do serviço e do agendador)."""
+        # Só o vetor completo (3072) já vem normalizado; os truncados pelo output_dimensionality não
+        if self.dimensao < DIMENSAO_EMBEDDING:
+            return [normalizar(emb.values) for emb in result.embeddings]
+        return [emb.values for emb in result.embeddings]
+
+    def lotes(self, textos: List[str]) -> List[List[int]]:
+        return dividir_em_lotes(textos, self.max_itens_por_lote, self.max_tokens_por_lote)
+
+    def iterar_lotes(self, textos: List[str]) -> Iterator[Tuple[List[int], List[List[float]]]]:
+        """Envia os textos em lotes, devolvendo (índices, vetores) a cada requisição concluída."""
+        if any(not t or not t.strip() for t in textos):
+            raise ValueError("Textos para embedding não podem estar vazios")
+
+        for indices in self.lotes(textos):
+            yield indices, self.valores(self.embed_content([textos[i] for i in indices]))
+
+    def gerar_lote(self, textos: List[str]) -> List[List[float]]:
+        """Gera os vetores de vários textos, enviando quantos couberem em cada requisição."""
+        vetores: List[List[float]] = [None] * len(textos)
+        for indices, valores in self.iterar_lotes(textos):
+            for i, valor in zip(indices, valores):
+                vetores[i] = valor
+        return vetores
+
+    def gerar(self, texto: str) -> List[float]:
+        return self.gerar_lote([texto])[0]
+
+    def fechar(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+_servico_padrao: Optional[ServicoEmbedding] = None
+
+
+def obter_servico_padrao() -> ServicoEmbedding:
+    """Serviço compartilhado pelo processo, para quem ainda usa gerarEmbedding."""
+    global _servico_padrao
+    if _servico_padrao is None:
+        _servico_padrao = ServicoEmbedding()
+    return _servico_padrao
+
+
 def gerarEmbedding(question):
     if not question or not question.strip():
         raise ValueError("Question não pode estar vazio")
-    
-    load_dotenv()
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    
-    try:
-        result = client.models.embed_content(
-            model="gemini-embedding-001",
-            contents=question,
-            config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY", output_dimensionality=3072)
-        )
-        return result
-    finally:
-        client.close()
\ No newline at end of file
+
+    return obter_servico_padrao().embed_content(question)
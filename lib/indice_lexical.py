@@ -0,0 +1,185 @@
+import math
+import heapq
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from lib.parser_faq import normalizar_para_busca
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# ÍNDICE LEXICAL INVERTIDO (BM25) — sem Gemini e sem Atlas Search
+# A sincronização grava um documento por arquivo do Drive em `indice_lexical`, com os termos de cada
+# FAQ ativa (pergunta normalizada, tags e categoria); a busca monta as listas invertidas em memória.
+# ============================================================================
+COL_INDICE_LEXICAL = "indice_lexical"
+ARQUIVOS_POR_LOTE_INDICE = 200
+
+# Peso de cada campo na frequência do termo (mesma ordem do índice $text: a pergunta vale mais)
+PESO_PERGUNTA = 3
+PESO_TAGS = 2
+PESO_CATEGORIA = 1
+
+# Parâmetros do BM25
+K1 = 1.2
+B = 0.75
+
+# Termos que não existem no vocabulário (erro de digitação) casam com os de trigramas parecidos, com peso menor
+SIMILARIDADE_MINIMA = 0.5
+PESO_APROXIMADO = 0.5
+TERMOS_APROXIMADOS = 2
+
+# Já sem acento (normalizar_para_busca): "é" vira "e", "não" vira "nao"
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "da", "do", "das", "dos", "em", "no", "na", "nos",
+    "nas", "e", "ou", "ao", "aos", "por", "para", "pra", "com", "sem", "que", "se", "como", "qual", "quais",
+    "quando", "onde", "eu", "meu", "minha", "ser", "esta", "isso", "pode", "posso", "devo", "ha", "tem",
+}
+
+
+def tokenizar(texto: str) -> List[str]:
+    return [t for t in normalizar_para_busca(texto).split() if t not in STOPWORDS]
+
+
+def termos_ponderados(doc: Dict) -> Dict[str, int]:
+    """Frequência de cada termo da FAQ, já multiplicada pelo peso do campo em que aparece."""
+    termos: Counter = Counter()
+    for termo in tokenizar(doc.get("question_normalized") or doc.get("question", "")):
+        termos[termo] += PESO_PERGUNTA
+    for termo in tokenizar(" ".join(doc.get("tags") or [])):
+        termos[termo] += PESO_TAGS
+    for termo in tokenizar(doc.get("category", "")):
+        termos[termo] += PESO_CATEGORIA
+    return dict(termos)
+
+
+def trigramas(termo: str) -> Set[str]:
+    marcado = f" {termo} "
+    return {marcado[i:i + 3] for i in range(len(marcado) - 2)}
+
+
+# ============================================================================
+# GRAVAÇÃO (sincronização)
+# ============================================================================
+
+def _entrada_arquivo(file_id: str, docs: List[Dict], agora: datetime) -> Dict:
+    return {"_id": file_id, "updated_at": agora,
+            "faqs": [{"id": doc["_id"], "c": (doc.get("category") or "").strip().lower(), "t": termos_ponderados(doc)}
+                     for doc in docs]}
+
+
+def atualizar_arquivos(col_dados, col_indice, file_ids: Iterable[str]) -> int:
+    """
+    Regrava a entrada dos arquivos a partir das FAQs ativas no banco (depois da gravação do lote):
+    o índice acompanha o que está gravado, inclusive os _id. Arquivos sem FAQs ativas saem do índice.
+    """
+    from pymongo.operations import DeleteOne, ReplaceOne
+    file_ids = list(dict.fromkeys(file_ids))
+    if not file_ids:
+        return 0
+    por_arquivo: Dict[str, List[Dict]] = defaultdict(list)
+    for doc in col_dados.find({"file_id": {"$in": file_ids}, "isActive": True},
+                              {"question_normalized": 1, "question": 1, "tags": 1, "category": 1, "file_id": 1}):
+        por_arquivo[doc["file_id"]].append(doc)
+
+    agora = datetime.now(timezone.utc)
+    operacoes = [ReplaceOne({"_id": fid}, _entrada_arquivo(fid, por_arquivo[fid], agora), upsert=True)
+                 if por_arquivo.get(fid) else DeleteOne({"_id": fid}) for fid in file_ids]
+    col_indice.bulk_write(operacoes, ordered=False)
+    return sum(len(docs) for docs in por_arquivo.values())
+
+
+def remover_arquivos(col_indice, file_ids: List[str]):
+    if file_ids:
+        col_indice.delete_many({"_id": {"$in": file_ids}})
+
+
+def construir_indice(col_dados, col_indice) -> int:
+    """
+    Monta o índice de todas as FAQs ativas (primeira sincronização com o índice, ou depois de limpar_banco.py).
+    Cada arquivo é regravado por inteiro, então dois trabalhadores construindo ao mesmo tempo chegam ao mesmo índice.
+    """
+    file_ids = col_dados.distinct("file_id", {"isActive": True})
+    total = 0
+    for i in range(0, len(file_ids), ARQUIVOS_POR_LOTE_INDICE):
+        total += atualizar_arquivos(col_dados, col_indice, file_ids[i:i + ARQUIVOS_POR_LOTE_INDICE])
+    return total
+
+
+# ============================================================================
+# CONSULTA (em memória)
+# ============================================================================
+
+class IndiceLexical:
+    """Listas invertidas termo → [(posição da FAQ, frequência)], com score BM25 e tolerância a erros por trigramas."""
+
+    def __init__(self, entradas: Iterable[Dict]):
+        self.ids: List = []
+        self.categorias: List[str] = []
+        comprimentos: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for entrada in entradas:
+            for faq in entrada["faqs"]:
+                posicao = len(self.ids)
+                self.ids.append(faq["id"])
+                self.categorias.append(faq["c"])
+                comprimentos.append(sum(faq["t"].values()))
+                for termo, frequencia in faq["t"].items():
+                    postings[termo].append((posicao, frequencia))
+
+        n = len(self.ids)
+        media = sum(comprimentos) / n if n else 1.0
+        # Normalização de comprimento do BM25 calculada uma vez por FAQ
+        self.normas = [K1 * (1 - B + B * c / media) for c in comprimentos]
+        self.postings = dict(postings)
+        self.idf = {termo: math.log(1 + (n - len(lista) + 0.5) / (len(lista) + 0.5))
+                    for termo, lista in self.postings.items()}
+        self.por_trigrama: Dict[str, List[str]] = defaultdict(list)
+        self.n_trigramas: Dict[str, int] = {}
+        for termo in self.postings:
+            proprios = trigramas(termo)
+            self.n_trigramas[termo] = len(proprios)
+            for trigrama in proprios:
+                self.por_trigrama[trigrama].append(termo)
+
+    @classmethod
+    def do_mongo(cls, col_indice) -> "IndiceLexical":
+        return cls(col_indice.find({}, {"faqs": 1}))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def aproximados(self, termo: str) -> List[Tuple[str, float]]:
+        """Termos do vocabulário com trigramas parecidos (Jaccard), para "dipirna" achar "dipirona"."""
+        alvo = trigramas(termo)
+        comuns: Counter = Counter()
+        for trigrama in alvo:
+            comuns.update(self.por_trigrama.get(trigrama, ()))
+        n_alvo = len(alvo)
+        similares = [(candidato, n_comuns / (n_alvo + self.n_trigramas[candidato] - n_comuns))
+                     for candidato, n_comuns in comuns.items()]
+        similares = [par for par in similares if par[1] >= SIMILARIDADE_MINIMA]
+        return heapq.nlargest(TERMOS_APROXIMADOS, similares, key=lambda par: par[1])
+
+    def buscar(self, consulta: str, k: int, categoria: Optional[str] = None) -> List[Tuple[object, float]]:
+        """As k FAQs (_id, score BM25) que mais casam com os termos da consulta."""
+        termos: Dict[str, float] = {}
+        for termo in tokenizar(consulta):
+            if termo in self.postings:
+                termos[termo] = max(termos.get(termo, 0.0), 1.0)
+                continue
+            for similar, similaridade in self.aproximados(termo):
+                termos[similar] = max(termos.get(similar, 0.0), PESO_APROXIMADO * similaridade)
+
+        filtro = categoria.strip().lower() if categoria else None
+        scores: Dict[int, float] = defaultdict(float)
+        for termo, peso in termos.items():
+            idf = self.idf[termo] * peso
+            for posicao, frequencia in self.postings[termo]:
+                scores[posicao] += idf * frequencia * (K1 + 1) / (frequencia + self.normas[posicao])
+        if filtro:
+            scores = {p: s for p, s in scores.items() if self.categorias[p] == filtro}
+        melhores = heapq.nlargest(k, scores.items(), key=lambda par: par[1])
+        return [(self.ids[posicao], score) for posicao, score in melhores]
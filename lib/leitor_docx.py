@@ -0,0 +1,149 @@
+import io
+import os
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+# ============================================================================
+# LEITOR RÁPIDO DE .DOCX
+# Lê o word/document.xml direto do zip com um parser XML incremental, sem montar
+# o modelo de objetos do python-docx (estilos, runs, tabelas...). O texto e o nome
+# do estilo de cada parágrafo seguem as mesmas regras do python-docx.
+# ============================================================================
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+TIPO_DOCUMENTO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+TIPO_ESTILOS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+# Mesmos apelidos que o python-docx traduz do nome interno para o nome exibido no Word
+APELIDOS_ESTILO = {f"heading {n}": f"Heading {n}" for n in range(1, 10)}
+APELIDOS_ESTILO.update({"caption": "Caption", "footer": "Footer", "header": "Header"})
+
+# Equivalente em texto dos elementos de um run (w:t é tratado à parte)
+TEXTO_ELEMENTOS_RUN = {f"{W}tab": "\t", f"{W}ptab": "\t", f"{W}cr": "\n", f"{W}noBreakHyphen": "-"}
+
+Origem = Union[bytes, str, os.PathLike, BinaryIO]
+
+
+@dataclass
+class ParagrafoDocx:
+    texto: str
+    estilo: str                     # Nome do estilo como aparece no Word (ex.: "List Paragraph")
+    numeracao: Optional[int] = None  # w:numId quando o parágrafo faz parte de uma lista numerada/marcada
+    nivel: Optional[int] = None      # w:ilvl (nível de recuo na lista)
+
+
+def _texto_run(run) -> str:
+    partes = []
+    for filho in run:
+        if filho.tag == f"{W}t":
+            partes.append(filho.text or "")
+        elif filho.tag == f"{W}br":
+            # Só a quebra de linha comum vira "\n"; quebras de página/coluna não têm texto
+            if filho.get(f"{W}type", "textWrapping") == "textWrapping":
+                partes.append("\n")
+        else:
+            partes.append(TEXTO_ELEMENTOS_RUN.get(filho.tag, ""))
+    return "".join(partes)
+
+
+def _texto_paragrafo(p) -> str:
+    partes = []
+    for filho in p:
+        if filho.tag == f"{W}r":
+            partes.append(_texto_run(filho))
+        elif filho.tag == f"{W}hyperlink":
+            partes.extend(_texto_run(r) for r in filho if r.tag == f"{W}r")
+    return "".join(partes)
+
+
+def _alvo_relacao(pacote: zipfile.ZipFile, caminho_rels: str, tipo: str, base: str) -> Optional[str]:
+    try:
+        raiz = ET.fromstring(pacote.read(caminho_rels))
+    except KeyError:
+        return None
+    for rel in raiz.iter(f"{REL}Relationship"):
+        if rel.get("Type") == tipo:
+            alvo = rel.get("Target")
+            # Alvo absoluto ("/word/styles.xml") é relativo à raiz do pacote
+            return alvo[1:] if alvo.startswith("/") else posixpath.normpath(posixpath.join(base, alvo))
+    return None
+
+
+def _numeracao(ppr) -> Tuple[Optional[int], Optional[int]]:
+    numpr = ppr.find(f"{W}numPr") if ppr is not None else None
+    if numpr is None:
+        return None, None
+    num_id = numpr.find(f"{W}numId")
+    ilvl = numpr.find(f"{W}ilvl")
+    return (int(num_id.get(f"{W}val")) if num_id is not None else None,
+            int(ilvl.get(f"{W}val")) if ilvl is not None else 0)
+
+
+def _carregar_estilos(pacote: zipfile.ZipFile, caminho_estilos: Optional[str]):
+    """Estilos de parágrafo por styleId (nome + numeração herdada) e o estilo padrão."""
+    nomes: Dict[str, Tuple[str, Optional[int], Optional[int]]] = {}
+    padrao = ("", None, None)
+    if not caminho_estilos:
+        return nomes, padrao
+    try:
+        raiz = ET.fromstring(pacote.read(caminho_estilos))
+    except KeyError:
+        return nomes, padrao
+    for estilo in raiz.iter(f"{W}style"):
+        if estilo.get(f"{W}type") != "paragraph":
+            continue
+        nome_el = estilo.find(f"{W}name")
+        nome = nome_el.get(f"{W}val") if nome_el is not None else ""
+        nome = APELIDOS_ESTILO.get(nome, nome)
+        nomes[estilo.get(f"{W}styleId")] = (nome, *_numeracao(estilo.find(f"{W}pPr")))
+        if estilo.get(f"{W}default") in ("1", "true", "on") and not padrao[0]:
+            padrao = nomes[estilo.get(f"{W}styleId")]
+    return nomes, padrao
+
+
+def _propriedades(p, estilos: Dict, estilo_padrao: Tuple) -> Tuple[str, Optional[int], Optional[int]]:
+    ppr = p.find(f"{W}pPr")
+    pstyle = ppr.find(f"{W}pStyle") if ppr is not None else None
+    # Como no python-docx: estilo ausente ou inexistente cai no estilo padrão do documento
+    estilo, numeracao, nivel = estilos.get(pstyle.get(f"{W}val"), estilo_padrao) if pstyle is not None else estilo_padrao
+    num_paragrafo, nivel_paragrafo = _numeracao(ppr)
+    if num_paragrafo is not None:
+        numeracao, nivel = num_paragrafo, nivel_paragrafo
+    return estilo, numeracao, nivel
+
+
+def iterar_paragrafos(origem: Origem) -> Iterator[ParagrafoDocx]:
+    """
+    Parágrafos do corpo do documento (os mesmos de `Document.paragraphs`), um de cada vez.
+
+    Cada parágrafo é descartado da árvore logo após ser lido, então a memória usada não cresce
+    com o tamanho do arquivo.
+    """
+    if isinstance(origem, (bytes, bytearray)):
+        origem = io.BytesIO(origem)
+    with zipfile.ZipFile(origem) as pacote:
+        caminho_doc = _alvo_relacao(pacote, "_rels/.rels", TIPO_DOCUMENTO, "") or "word/document.xml"
+        pasta, arquivo = posixpath.split(caminho_doc)
+        caminho_estilos = _alvo_relacao(pacote, posixpath.join(pasta, "_rels", f"{arquivo}.rels"), TIPO_ESTILOS, pasta)
+        estilos, estilo_padrao = _carregar_estilos(pacote, caminho_estilos)
+
+        with pacote.open(caminho_doc) as xml:
+            profundidade = 0
+            corpo = None
+            for evento, elem in ET.iterparse(xml, events=("start", "end")):
+                if evento == "start":
+                    profundidade += 1
+                    if profundidade == 2 and elem.tag == f"{W}body":
+                        corpo = elem
+                    continue
+                profundidade -= 1
+                # Só os filhos diretos de w:body (parágrafos dentro de tabelas ficam de fora, como no python-docx)
+                if corpo is None or profundidade != 2:
+                    continue
+                if elem.tag == f"{W}p":
+                    estilo, numeracao, nivel = _propriedades(elem, estilos, estilo_padrao)
+                    yield ParagrafoDocx(_texto_paragrafo(elem), estilo, numeracao, nivel)
+                corpo.remove(elem)
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import queue
+import bisect
+import logging
+import threading
+import logging.handlers
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+# Limites (em segundos) dos buckets do histograma de duração de cada etapa
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIXO_PROMETHEUS = "faq_sync"
+
+# Progresso: um log a cada 5% dos itens ou a cada 15 segundos, o que vier primeiro,
+# e nunca mais de um por segundo
+FRACAO_PROGRESSO = 0.05
+INTERVALO_PROGRESSO = 15.0
+INTERVALO_MINIMO_PROGRESSO = 1.0
+
+
+class Histograma:
+    """Duração de uma etapa: contagem, soma, mínimo, máximo e buckets cumulativos no estilo Prometheus."""
+
+    def __init__(self, limites: Tuple[float, ...] = BUCKETS_SEGUNDOS):
+        self.limites = limites
+        self.buckets = [0] * (len(limites) + 1)  # O último é o +Inf
+        self.contagem = 0
+        self.soma = 0.0
+        self.minimo: Optional[float] = None
+        self.maximo: Optional[float] = None
+
+    def observar(self, valor: float):
+        self.buckets[bisect.bisect_left(self.limites, valor)] += 1
+        self.contagem += 1
+        self.soma += valor
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def cumulativos(self) -> List[Tuple[str, int]]:
+        total = 0
+        pares = []
+        for limite, quantidade in zip([*map(str, self.limites), "+Inf"], self.buckets):
+            total += quantidade
+            pares.append((limite, total))
+        return pares
+
+    def para_dict(self) -> Dict:
+        return {
+            "execucoes": self.contagem,
+            "segundos_total": round(self.soma, 6),
+            "segundos_medio": round(self.soma / self.contagem, 6) if self.contagem else 0.0,
+            "segundos_min": round(self.minimo or 0.0, 6),
+            "segundos_max": round(self.maximo or 0.0, 6),
+            "buckets": dict(self.cumulativos()),
+        }
+
+
+class MetricasExecucao:
+    """
+    Métricas de uma execução: duração de cada etapa (histograma) e contadores (bytes, embeddings...).
+    Pode ser usada de várias threads ao mesmo tempo.
+    """
+
+    def __init__(self, nome: str = "enviar_dados"):
+        self.nome = nome
+        self.inicio = time.time()
+        self._inicio_relogio = time.perf_counter()
+        self.etapas: Dict[str, Histograma] = {}
+        self.contadores: Dict[str, float] = {}
+        self.sucesso = True
+        self.perfilador = None  # lib.perfilador.Perfilador, com --profile
+        self._lock = threading.Lock()
+
+    def observar(self, etapa: str, segundos: float):
+        with self._lock:
+            if etapa not in self.etapas:
+                self.etapas[etapa] = Histograma()
+            self.etapas[etapa].observar(segundos)
+
+    @contextmanager
+    def etapa(self, nome: str, rotulo: Optional[str] = None):
+        """
+        Mede o bloco como uma execução da etapa `nome` (também quando termina em erro).
+        Com um perfilador, o bloco também é perfilado; `rotulo` (o arquivo) separa os perfis por arquivo.
+        """
+        perfilado = self.perfilador.etapa(nome, rotulo) if self.perfilador is not None else nullcontext()
+        inicio = time.perf_counter()
+        try:
+            with perfilado:
+                yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio)
+
+    def contar(self, nome: str, quantidade: float = 1):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    @property
+    def duracao(self) -> float:
+        return time.perf_counter() - self._inicio_relogio
+
+    # ------------------------------------------------------------------
+    # Relatórios
+    # ------------------------------------------------------------------
+    def para_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "script": self.nome,
+                "inicio": datetime.fromtimestamp(self.inicio, timezone.utc).isoformat(),
+                "duracao_segundos": round(self.duracao, 3),
+                "sucesso": self.sucesso,
+                "etapas": {nome: h.para_dict() for nome, h in self.etapas.items()},
+                "contadores": dict(self.contadores),
+            }
+
+    def para_prometheus(self) -> str:
+        """Formato de texto do Prometheus, para o textfile collector do node_exporter."""
+        p = PREFIXO_PROMETHEUS
+        rotulo_script = f'script="{self.nome}"'
+        linhas = [
+            f"# HELP {p}_duracao_segundos Duração total da última execução.",
+            f"# TYPE {p}_duracao_segundos gauge",
+            f"{p}_duracao_segundos{{{rotulo_script}}} {self.duracao:.6f}",
+            f"# HELP {p}_ultima_execucao_timestamp_segundos Início da última execução (epoch).",
+            f"# TYPE {p}_ultima_execucao_timestamp_segundos gauge",
+            f"{p}_ultima_execucao_timestamp_segundos{{{rotulo_script}}} {self.inicio:.3f}",
+            f"# HELP {p}_sucesso 1 se a última execução terminou sem erro crítico.",
+            f"# TYPE {p}_sucesso gauge",
+            f"{p}_sucesso{{{rotulo_script}}} {int(self.sucesso)}",
+        ]
+        with self._lock:
+            if self.etapas:
+                linhas += [f"# HELP {p}_etapa_segundos Duração de cada execução de uma etapa na última execução.",
+                           f"# TYPE {p}_etapa_segundos histogram"]
+                for etapa, h in sorted(self.etapas.items()):
+                    rotulos = f'{rotulo_script},etapa="{etapa}"'
+                    for limite, total in h.cumulativos():
+                        linhas.append(f'{p}_etapa_segundos_bucket{{{rotulos},le="{limite}"}} {total}')
+                    linhas.append(f"{p}_etapa_segundos_sum{{{rotulos}}} {h.soma:.6f}")
+                    linhas.append(f"{p}_etapa_segundos_count{{{rotulos}}} {h.contagem}")
+            for nome, valor in sorted(self.contadores.items()):
+                linhas += [f"# TYPE {p}_{nome} gauge", f"{p}_{nome}{{{rotulo_script}}} {valor:g}"]
+        return "\n".join(linhas) + "\n"
+
+    def salvar(self, pasta: str) -> Tuple[str, str]:
+        """
+        Grava o relatório JSON da execução (um arquivo por execução) e o textfile do Prometheus
+        (sempre o mesmo arquivo, sobrescrito de forma atômica). Devolve os dois caminhos.
+        """
+        os.makedirs(pasta, exist_ok=True)
+        carimbo = datetime.fromtimestamp(self.inicio, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        caminho_json = os.path.join(pasta, f"{self.nome}_{carimbo}.json")
+        with open(caminho_json, "w", encoding="utf-8") as f:
+            json.dump(self.para_dict(), f, ensure_ascii=False, indent=2)
+
+        caminho_prom = os.path.join(pasta, f"{self.nome}.prom")
+        temporario = caminho_prom + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.para_prometheus())
+        os.replace(temporario, caminho_prom)  # O collector nunca lê um arquivo pela metade
+        return caminho_json, caminho_prom
+
+    def resumo(self) -> List[str]:
+        """Linhas legíveis com o tempo de cada etapa, para o relatório final no terminal."""
+        with self._lock:
+            return [f"{nome:<14} {h.contagem:>6}× {h.soma:>9.2f}s (média {h.soma / h.contagem * 1000:.1f} ms, "
+                    f"máx {h.maximo * 1000:.1f} ms)"
+                    for nome, h in self.etapas.items() if h.contagem]
+
+
+class ProgressoAmostrado:
+    """Loga o andamento de vez em quando (por fração concluída ou por tempo) em vez de uma linha por item."""
+
+    def __init__(self, total: int, rotulo: str = "arquivos", fracao: float = FRACAO_PROGRESSO,
+                 intervalo: float = INTERVALO_PROGRESSO):
+        self.total = total
+        self.rotulo = rotulo
+        self.passo = max(1, int(total * fracao))
+        self.intervalo = intervalo
+        self.feitos = 0
+        self._proximo = self.passo
+        self._ultimo_log = time.monotonic()
+        self._inicio = self._ultimo_log
+        self._lock = threading.Lock()
+
+    def avancar(self, quantidade: int = 1):
+        with self._lock:
+            self.feitos += quantidade
+            agora = time.monotonic()
+            desde_ultimo = agora - self._ultimo_log
+            passo_atingido = self.feitos >= self._proximo and desde_ultimo >= INTERVALO_MINIMO_PROGRESSO
+            if self.feitos < self.total and not passo_atingido and desde_ultimo < self.intervalo:
+                return
+            self._proximo = self.feitos + self.passo
+            self._ultimo_log = agora
+            taxa = self.feitos / max(agora - self._inicio, 1e-9)
+        logger.info(f"   ⏳ {self.feitos}/{self.total} {self.rotulo} ({taxa:.1f}/s)")
+
+
+class _HandlerFila(logging.handlers.QueueHandler):
+    """QueueHandler que, em processos filhos (fork do pool de parse), escreve direto nos handlers originais."""
+
+    def __init__(self, fila: queue.Queue, handlers: List[logging.Handler]):
+        super().__init__(fila)
+        self.pid = os.getpid()
+        self.handlers_originais = handlers
+
+    def emit(self, record: logging.LogRecord):
+        if os.getpid() == self.pid:
+            return super().emit(record)
+        # O filho herda a fila, mas não a thread que a esvazia
+        for handler in self.handlers_originais:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def iniciar_log_em_fila() -> logging.handlers.QueueListener:
+    """
+    Troca os handlers do logger raiz por um QueueHandler: quem loga só enfileira o registro, e uma
+    thread separada escreve no arquivo e no terminal. No fim, `parar_log_em_fila` esvazia a fila
+    e devolve os handlers originais.
+    """
+    raiz = logging.getLogger()
+    handlers = list(raiz.handlers)
+    fila: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    for handler in handlers:
+        raiz.removeHandler(handler)
+    raiz.addHandler(_HandlerFila(fila, handlers))
+    ouvinte = logging.handlers.QueueListener(fila, *handlers, respect_handler_level=True)
+    ouvinte.start()
+    return ouvinte
+
+
+def parar_log_em_fila(ouvinte: logging.handlers.QueueListener):
+    ouvinte.stop()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        if isinstance(handler, _HandlerFila):
+            raiz.removeHandler(handler)
+    for handler in ouvinte.handlers:
+        raiz.addHandler(handler)
@@ -0,0 +1,125 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from lib.perfil_embedding import (CAMPO_EMBEDDING, ID_PERFIL_ATIVO, INDEX_NAME, PerfilEmbedding, carregar_perfil,
+                                  dimensao_do_indice, salvar_perfil_ativo)
+from lib.vetores import FORMATO_FLOAT32, FORMATO_INT8, FORMATO_LISTA, dimensao_de, eh_int8
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# MIGRAÇÃO DE PERFIL DE EMBEDDING EM DOIS CAMPOS
+# O perfil novo é gravado em um segundo campo (com índice vetorial próprio) enquanto o campo e o
+# índice antigos continuam atendendo o chatbot; a troca do perfil ativo só acontece com 100% de cobertura.
+# ============================================================================
+ID_MIGRACAO = "migracao_embedding"   # Documento de sync_metadata com o progresso da migração
+SUFIXO_VERSAO = "_v2"
+
+ESTADO_EM_ANDAMENTO = "em_andamento"
+ESTADO_CONCLUIDA = "concluida"
+
+
+def _alternar(nome: str, padrao: str) -> str:
+    """embedding ↔ embedding_v2, vector_index ↔ vector_index_v2: migrações seguidas reaproveitam os dois nomes."""
+    return padrao if nome != padrao else padrao + SUFIXO_VERSAO
+
+
+def perfil_destino(origem: PerfilEmbedding, alvo: PerfilEmbedding) -> PerfilEmbedding:
+    """Modelo, dimensão e formato de `alvo`, gravados no campo e índice que a `origem` não usa."""
+    return PerfilEmbedding(modelo=alvo.modelo, dimensao=alvo.dimensao, formato=alvo.formato,
+                           similaridade=alvo.similaridade,
+                           campo=_alternar(origem.campo, CAMPO_EMBEDDING),
+                           indice=_alternar(origem.indice, INDEX_NAME))
+
+
+def mesmo_vetor(a: PerfilEmbedding, b: PerfilEmbedding) -> bool:
+    return (a.modelo, a.dimensao, a.formato, a.similaridade) == (b.modelo, b.dimensao, b.formato, b.similaridade)
+
+
+def perfil_em_uso(col_dados, col_meta) -> PerfilEmbedding:
+    """
+    Perfil dos vetores que estão no banco. Sem um perfil gravado por migração anterior, dimensão e
+    formato são deduzidos de um vetor das FAQs (o .env já pode estar apontando para o destino).
+    """
+    ativo = col_meta.find_one({"_id": ID_PERFIL_ATIVO})
+    if ativo:
+        return PerfilEmbedding.de_dict(ativo)
+    configurado = carregar_perfil()
+    doc = col_dados.find_one({CAMPO_EMBEDDING: {"$ne": None}}, {CAMPO_EMBEDDING: 1})
+    if not doc:
+        return configurado
+    vetor = doc[CAMPO_EMBEDDING]
+    formato = FORMATO_INT8 if eh_int8(vetor) else FORMATO_LISTA if isinstance(vetor, list) else FORMATO_FLOAT32
+    return PerfilEmbedding(modelo=configurado.modelo, dimensao=dimensao_de(vetor), formato=formato)
+
+
+def carregar_migracao(col_meta) -> Optional[Dict]:
+    """Migração em andamento (com os perfis de origem e destino), ou None."""
+    estado = col_meta.find_one({"_id": ID_MIGRACAO})
+    if not estado or estado.get("estado") != ESTADO_EM_ANDAMENTO:
+        return None
+    estado["origem"] = PerfilEmbedding.de_dict(estado["origem"])
+    estado["destino"] = PerfilEmbedding.de_dict(estado["destino"])
+    return estado
+
+
+def iniciar_migracao(col_meta, origem: PerfilEmbedding, destino: PerfilEmbedding) -> Dict:
+    """
+    Grava a migração em sync_metadata. O perfil de origem também é fixado como ativo: o .env já
+    aponta para o destino, mas o sincronizador e a busca continuam no campo antigo até a troca.
+    """
+    salvar_perfil_ativo(col_meta, origem)
+    agora = datetime.now(timezone.utc)
+    col_meta.replace_one({"_id": ID_MIGRACAO}, {
+        "_id": ID_MIGRACAO, "estado": ESTADO_EM_ANDAMENTO, "origem": origem.para_dict(), "destino": destino.para_dict(),
+        "ultimo_id": None, "total": 0, "migrados": 0, "cobertura": 0.0, "iniciada_em": agora, "updated_at": agora
+    }, upsert=True)
+    logger.info(f"🚚 Migração iniciada: '{origem.campo}' ({origem}) → '{destino.campo}' ({destino})")
+    return carregar_migracao(col_meta)
+
+
+def medir_cobertura(col_dados, destino: PerfilEmbedding) -> Dict:
+    """Quantas FAQs já têm o vetor do destino (inclui as gravadas pelo sincronizador depois do início)."""
+    total = col_dados.estimated_document_count()
+    faltantes = col_dados.count_documents({destino.campo: None})
+    migrados = max(0, total - faltantes)
+    return {"total": total, "migrados": migrados, "faltantes": faltantes,
+            "cobertura": round(100.0 * migrados / total, 2) if total else 100.0}
+
+
+def registrar_progresso(col_meta, ultimo_id):
+    """Último _id concluído (None no fim da coleção: a próxima rodada recomeça do início)."""
+    col_meta.update_one({"_id": ID_MIGRACAO}, {"$set": {"ultimo_id": ultimo_id, "updated_at": datetime.now(timezone.utc)}})
+
+
+def registrar_cobertura(col_meta, cobertura: Dict):
+    campos = {k: cobertura[k] for k in ("total", "migrados", "cobertura")}
+    col_meta.update_one({"_id": ID_MIGRACAO}, {"$set": {**campos, "updated_at": datetime.now(timezone.utc)}})
+
+
+def garantir_indice_destino(col_dados, destino: PerfilEmbedding):
+    """Cria o índice vetorial do campo novo já no início: o Atlas indexa os vetores conforme chegam."""
+    if dimensao_do_indice(col_dados.list_search_indexes(), destino.indice) is None:
+        col_dados.create_search_index(model=destino.modelo_indice())
+        logger.info(f"🧭 Índice vetorial '{destino.indice}' solicitado sobre '{destino.campo}' ({destino}).")
+
+
+def concluir_migracao(col_dados, col_meta, origem: PerfilEmbedding, destino: PerfilEmbedding,
+                      manter_antigo: bool = False):
+    """
+    Troca o perfil ativo para o destino (um único replace_one em sync_metadata: a partir daí a busca
+    e o sincronizador usam o campo e o índice novos). Sem `manter_antigo`, remove o campo e o índice antigos.
+    """
+    salvar_perfil_ativo(col_meta, destino)
+    col_meta.update_one({"_id": ID_MIGRACAO}, {"$set": {
+        "estado": ESTADO_CONCLUIDA, "cobertura": 100.0, "concluida_em": datetime.now(timezone.utc)
+    }})
+    logger.info(f"🔀 Perfil ativo agora é {destino} (campo '{destino.campo}', índice '{destino.indice}').")
+    if manter_antigo:
+        return
+    resultado = col_dados.update_many({origem.campo: {"$exists": True}}, {"$unset": {origem.campo: ""}})
+    logger.info(f"🗑️  Campo '{origem.campo}' removido de {resultado.modified_count} FAQs.")
+    if dimensao_do_indice(col_dados.list_search_indexes(), origem.indice) is not None:
+        col_dados.drop_search_index(origem.indice)
+        logger.info(f"🗑️  Índice '{origem.indice}' removido.")
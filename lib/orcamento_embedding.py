@@ -0,0 +1,264 @@
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from lib.parser_faq import categoria_do_nome, normalizar_para_busca
+
+# ============================================================================
+# CONFIGURAÇÕES (podem ser sobrescritas pelo .env: ORCAMENTO_POLITICA, ORCAMENTO_PRIORIDADES)
+# ============================================================================
+COL_BACKLOG = "embedding_backlog"
+
+POLITICA_JUSTA = "justa"            # Divide igualmente entre subpastas (ou categorias) e, dentro delas, entre arquivos
+POLITICA_RECENCIA = "recencia"      # Arquivos modificados mais recentemente recebem uma fatia maior
+POLITICA_PRIORIDADE = "prioridade"  # Como a justa, com peso extra para categorias/arquivos da lista
+POLITICAS = (POLITICA_JUSTA, POLITICA_RECENCIA, POLITICA_PRIORIDADE)
+
+PESO_PRIORITARIO = 4.0
+# Candidatos lidos do backlog por vetor a gerar (descarta entradas cujo conteúdo já mudou ou já tem vetor)
+CANDIDATOS_POR_VAGA = 3
+
+
+def _grupo(arquivo: Dict) -> str:
+    """Subpasta do Drive do arquivo; sem ela (Changes API), a categoria derivada do nome."""
+    return arquivo.get('pasta') or categoria_do_nome(arquivo.get('name', ''))
+
+
+def _normalizar_prioridades(prioridades: Iterable[str]) -> List[str]:
+    return [p for p in (normalizar_para_busca(p) for p in prioridades) if p]
+
+
+class AlocadorOrcamento:
+    """
+    Reparte o limite de embeddings da execução entre os arquivos antes do pipeline começar.
+
+    Cada arquivo recebe uma cota proporcional ao seu peso na política escolhida; o que passar da
+    cota vai para o backlog em vez de consumir a fatia dos arquivos listados depois. Cotas que
+    sobram (arquivos com poucos itens novos) e o resto da divisão ficam para drenar o backlog no
+    fim da execução, na ordem de prioridade.
+    """
+
+    def __init__(self, limite: int, politica: str = POLITICA_JUSTA, prioridades: Iterable[str] = (),
+                 compartilhado=None):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de orçamento desconhecida: {politica} (use {', '.join(POLITICAS)})")
+        self.limite = max(0, limite)
+        self.politica = politica
+        self.prioridades = _normalizar_prioridades(prioridades)
+        # lib.coordenacao.OrcamentoCompartilhado: com vários trabalhadores, o limite vale para a rodada inteira
+        self.compartilhado = compartilhado
+        self.usados = 0
+        self.cotas: Dict[str, int] = {}
+        self.pesos: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def prioritario(self, arquivo: Dict) -> bool:
+        nome = normalizar_para_busca(arquivo.get('name', ''))
+        categoria = normalizar_para_busca(categoria_do_nome(arquivo.get('name', '')))
+        return any(p == categoria or p in nome for p in self.prioridades)
+
+    def planejar(self, arquivos: List[Dict]):
+        """Calcula peso e cota de cada arquivo a processar (arquivos desconhecidos depois ficam sem cota)."""
+        if not arquivos:
+            return
+        if self.politica == POLITICA_RECENCIA:
+            ordem = sorted(arquivos, key=lambda a: a.get('modifiedTime', ''), reverse=True)
+            pesos = {a['id']: float(len(ordem) - posicao) for posicao, a in enumerate(ordem)}
+        else:
+            # Divisão em dois níveis: igual entre subpastas, depois igual entre os arquivos de cada uma
+            por_grupo: Dict[str, List[Dict]] = defaultdict(list)
+            for arq in arquivos:
+                por_grupo[_grupo(arq)].append(arq)
+            pesos = {arq['id']: 1.0 / (len(por_grupo) * len(grupo))
+                     for grupo in por_grupo.values() for arq in grupo}
+            if self.politica == POLITICA_PRIORIDADE:
+                for arq in arquivos:
+                    if self.prioritario(arq):
+                        pesos[arq['id']] *= PESO_PRIORITARIO
+
+        total = sum(pesos.values())
+        disponivel = self.restante
+        with self._lock:
+            # Peso médio 1.0: vira a prioridade do item no backlog
+            self.pesos = {fid: p * len(pesos) / total for fid, p in pesos.items()}
+            self.cotas = {fid: int(disponivel * p / total) for fid, p in pesos.items()}
+
+    @property
+    def restante(self) -> int:
+        restante = max(0, self.limite - self.usados)
+        if self.compartilhado is not None:
+            restante = min(restante, self.compartilhado.restante)
+        return restante
+
+    def reservar(self, file_id: str, quantidade: int = 1) -> int:
+        """Quantos dos `quantidade` embeddings do arquivo cabem na cota dele (e no limite da execução)."""
+        with self._lock:
+            concedidos = min(quantidade, self.cotas.get(file_id, 0), self.limite - self.usados)
+            concedidos = self._reservar_global(max(0, concedidos))
+            if concedidos:
+                self.cotas[file_id] -= concedidos
+                self.usados += concedidos
+            return concedidos
+
+    def consumir(self, quantidade: int) -> int:
+        """Reserva fora das cotas (drenagem do backlog): devolve quanto coube no limite."""
+        with self._lock:
+            concedidos = self._reservar_global(max(0, min(quantidade, self.limite - self.usados)))
+            self.usados += concedidos
+            return concedidos
+
+    def devolver(self, quantidade: int):
+        """Devolve ao limite da execução reservas que não viraram vetor (falha na API)."""
+        with self._lock:
+            devolvidos = min(quantidade, self.usados)
+            self.usados -= devolvidos
+            if self.compartilhado is not None:
+                self.compartilhado.devolver(devolvidos)
+
+    def _reservar_global(self, quantidade: int) -> int:
+        if self.compartilhado is None or not quantidade:
+            return quantidade
+        return self.compartilhado.reservar(quantidade)
+
+    def prioridade(self, file_id: str) -> float:
+        return round(self.pesos.get(file_id, 1.0), 4)
+
+
+def carregar_politica():
+    """Política e lista de prioridades configuradas no .env."""
+    politica = os.getenv("ORCAMENTO_POLITICA", POLITICA_JUSTA)
+    prioridades = [p for p in os.getenv("ORCAMENTO_PRIORIDADES", "").split(",") if p.strip()]
+    return politica, prioridades
+
+
+class BacklogEmbeddings:
+    """
+    Fila persistente (coleção `embedding_backlog`) dos textos que ficaram sem embedding por falta de orçamento.
+
+    Uma entrada por content_hash + modelo + dimensão, com prioridade; as execuções seguintes do
+    sincronizador e do gerar_embeddings.py drenam a fila antes de gastar o orçamento com o resto.
+    """
+
+    def __init__(self, collection, modelo: str, dimensao: int):
+        self.collection = collection
+        self.modelo = modelo
+        self.dimensao = dimensao
+
+    def chave(self, content_hash: str) -> str:
+        return f"{content_hash}|{self.modelo}|{self.dimensao}"
+
+    def _filtro_perfil(self) -> Dict:
+        return {"model": self.modelo, "dimensions": self.dimensao}
+
+    def garantir_indice(self):
+        from pymongo import ASCENDING, DESCENDING
+        self.collection.create_index([("model", ASCENDING), ("dimensions", ASCENDING),
+                                      ("priority", DESCENDING), ("created_at", ASCENDING)])
+
+    def tamanho(self) -> int:
+        return self.collection.count_documents(self._filtro_perfil())
+
+    def enfileirar(self, itens: List[Dict]):
+        """Itens: {"content_hash", "texto", "file_id", "category", "priority"}. Uma entrada já na fila fica com a maior prioridade."""
+        if not itens:
+            return
+        from pymongo.operations import UpdateOne
+        agora = datetime.now(timezone.utc)
+        self.collection.bulk_write([
+            UpdateOne(
+                {"_id": self.chave(item["content_hash"])},
+                {"$setOnInsert": {"content_hash": item["content_hash"], "text": item["texto"], **self._filtro_perfil(),
+                                  "created_at": agora},
+                 "$set": {"file_id": item.get("file_id"), "category": item.get("category", ""), "updated_at": agora},
+                 "$max": {"priority": item.get("priority", 1.0)}},
+                upsert=True
+            ) for item in itens
+        ], ordered=False)
+
+    def candidatos(self, quantidade: int) -> List[Dict]:
+        """
+        Próximas entradas a drenar: maior prioridade primeiro e, dentro da mesma prioridade,
+        alternando entre categorias (as mais antigas de cada uma primeiro).
+        """
+        from pymongo import ASCENDING, DESCENDING
+        docs = list(self.collection.find(self._filtro_perfil(), {"content_hash": 1, "text": 1, "category": 1, "priority": 1})
+                    .sort([("priority", DESCENDING), ("created_at", ASCENDING)]).limit(quantidade))
+        ordenados: List[Dict] = []
+        inicio = 0
+        while inicio < len(docs):
+            fim = inicio
+            while fim < len(docs) and docs[fim].get("priority") == docs[inicio].get("priority"):
+                fim += 1
+            por_categoria: Dict[str, List[Dict]] = defaultdict(list)
+            for doc in docs[inicio:fim]:
+                por_categoria[doc.get("category", "")].append(doc)
+            filas = list(por_categoria.values())
+            while filas:
+                for fila in filas:
+                    ordenados.append(fila.pop(0))
+                filas = [f for f in filas if f]
+            inicio = fim
+        return ordenados
+
+    def drenar(self, col_dados, agendador, repositorio, perfil, limite: int,
+               alocador: Optional[AlocadorOrcamento] = None) -> Dict[str, int]:
+        """
+        Gera os vetores das entradas mais prioritárias (até `limite` chamadas à API, e dentro do
+        `alocador` quando houver), grava no armazém e nas FAQs que ainda estão sem embedding e tira
+        as entradas da fila. Entradas cujo conteúdo não existe mais sem vetor são descartadas sem
+        chamar a API; vetores que já estão no armazém são aplicados sem custo.
+        """
+        resultado = {"gerados": 0, "reaproveitados": 0, "descartados": 0, "documentos": 0, "resolvidos": 0}
+        while not agendador.cota_esgotada:
+            vagas = limite - resultado["gerados"]
+            if alocador is not None:
+                vagas = min(vagas, alocador.restante)
+            if vagas <= 0:
+                break
+            rodada = self._drenar_rodada(col_dados, agendador, repositorio, perfil, vagas, alocador)
+            for chave, quantidade in rodada.items():
+                resultado[chave] += quantidade
+            if not rodada["resolvidos"]:
+                break
+        resultado.pop("resolvidos", None)
+        return resultado
+
+    def _drenar_rodada(self, col_dados, agendador, repositorio, perfil, vagas: int,
+                       alocador: Optional[AlocadorOrcamento]) -> Dict[str, int]:
+        from pymongo.operations import DeleteOne, UpdateMany
+        rodada = {"gerados": 0, "reaproveitados": 0, "descartados": 0, "documentos": 0, "resolvidos": 0}
+        candidatos = self.candidatos(vagas * CANDIDATOS_POR_VAGA)
+        if not candidatos:
+            return rodada
+        hashes = [c["content_hash"] for c in candidatos]
+        pendentes = set(col_dados.distinct("content_hash", {"content_hash": {"$in": hashes}, perfil.campo: None}))
+        conhecidos = repositorio.buscar(pendentes)
+
+        escolhidos = [c for c in candidatos if c["content_hash"] in pendentes and c["content_hash"] not in conhecidos]
+        escolhidos = escolhidos[:alocador.consumir(min(vagas, len(escolhidos))) if alocador else vagas]
+        vetores = dict(conhecidos)
+        if escolhidos:
+            novos = {c["content_hash"]: v for c, v in zip(escolhidos, agendador.gerar([c["text"] for c in escolhidos]))
+                     if v is not None}
+            if alocador is not None and len(novos) < len(escolhidos):
+                alocador.devolver(len(escolhidos) - len(novos))
+            repositorio.salvar(novos)
+            vetores.update(novos)
+            rodada["gerados"] = len(novos)
+        rodada["reaproveitados"] = len(conhecidos)
+
+        if vetores:
+            escritas = col_dados.bulk_write([
+                UpdateMany({"content_hash": h, perfil.campo: None}, {"$set": {perfil.campo: perfil.codificar(v)}})
+                for h, v in vetores.items()
+            ], ordered=False)
+            rodada["documentos"] = escritas.modified_count
+
+        resolvidos = [c for c in candidatos if c["content_hash"] not in pendentes or c["content_hash"] in vetores]
+        rodada["descartados"] = sum(1 for c in resolvidos if c["content_hash"] not in pendentes)
+        rodada["resolvidos"] = len(resolvidos)
+        if resolvidos:
+            self.collection.bulk_write([DeleteOne({"_id": c["_id"]}) for c in resolvidos], ordered=False)
+        return rodada
@@ -0,0 +1,292 @@
+# ============================================================================
+# PARSER DAS FAQs (.docx) — compartilhado por enviar_dados.py e test_enviar_dados.py
+#
+# Formatos reconhecidos:
+#   P: pergunta? R: resposta. TAGS: a, b. FONTE: referência.   (mesma linha)
+#   P: pergunta?  /  R: resposta.  /  TAGS: ...  FONTE: ...     (linhas separadas)
+#   [ASSUNTO: Nova categoria]                                   (troca de categoria)
+#
+# Funciona sem o Drive:  python -m lib.parser_faq "FAQ MEDICAMENTOS.docx"
+# ============================================================================
+import io
+import os
+import re
+import sys
+import json
+import logging
+import unicodedata
+from dataclasses import dataclass, field, asdict
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from lib.leitor_docx import iterar_paragrafos
+
+logger = logging.getLogger(__name__)
+
+LEITOR_RAPIDO = "rapido"
+LEITOR_PYTHON_DOCX = "python-docx"
+
+# Padrões compilados uma única vez (o parse roda para cada parágrafo de cada arquivo)
+RE_ASSUNTO = re.compile(r'\[ASSUNTO:\s*(.+?)\]', re.IGNORECASE)
+RE_SO_ASSUNTO = re.compile(r'(\d+\.\s*)?\[ASSUNTO:.*?\]', re.IGNORECASE)
+RE_P = re.compile(r'\b(P|PERGUNTA):\s*', re.IGNORECASE)
+RE_R = re.compile(r'\b(R|RESPOSTA):\s*', re.IGNORECASE)
+RE_DIVIDE_R = re.compile(r'\s*\b(R|RESPOSTA):\s*', re.IGNORECASE)
+RE_PREFIXO_P = re.compile(r'(\d+\.\s*)?\b(P|PERGUNTA):\s*', re.IGNORECASE)
+RE_INICIO_P = re.compile(r'^(\d+\.\s*)?\b(P|PERGUNTA):\s*', re.IGNORECASE)
+RE_INICIO_R = re.compile(r'^\b(R|RESPOSTA):\s*', re.IGNORECASE)
+RE_METADADOS = re.compile(r'tags:|fonte:|ref:|\(ref:', re.IGNORECASE)
+RE_FONTE = re.compile(r'(?:FONTE:|Ref:|\(Ref:)\s*([^)\n\t]+)', re.IGNORECASE)
+RE_TAGS = re.compile(r'TAGS:\s*(.+?)(?=\s*P:|\s*PERGUNTA:|\s*FONTE:|\s*\(?Ref:|$|\n)', re.IGNORECASE)
+RE_SEPARADOR_TAGS = re.compile(r'[,\s]+')
+RE_MARCADOR_LISTA = re.compile(r'^[•\-*➢]\s*')
+RE_NAO_PALAVRA = re.compile(r'[^\w\s]')
+RE_ESPACOS = re.compile(r'\s+')
+
+MARCADORES_LISTA = ('•', '-', '*', '➢')
+# Rótulos que às vezes escapam para dentro da lista de tags
+NAO_SAO_TAGS = {"p:", "r:", "pergunta:", "resposta:", "fonte:", "ref:"}
+
+
+@dataclass
+class RegistroFAQ:
+    pergunta: str
+    resposta: str
+    categoria: str
+    tags: List[str]
+    fonte: str
+    linha: int  # Número do parágrafo (não vazio) no Word, começando em 1
+
+
+@dataclass
+class Aviso:
+    linha: int
+    mensagem: str
+
+
+@dataclass
+class ResultadoParse:
+    faqs: List[RegistroFAQ] = field(default_factory=list)
+    avisos: List[Aviso] = field(default_factory=list)
+    paragrafos: int = 0
+
+
+# ============================================================================
+# LEITURA DO .DOCX
+# ============================================================================
+
+def formatar_paragrafo(texto: str, estilo: str) -> str:
+    """Preserva a formatação de listas do Word para o Chatbot."""
+    texto = texto.strip()
+    if estilo.startswith('List') or texto.startswith(MARCADORES_LISTA):
+        texto_limpo = RE_MARCADOR_LISTA.sub('', texto)
+        return f"- {texto_limpo}"
+    return texto
+
+
+def converter_para_markdown(p) -> str:
+    """Versão para parágrafos do python-docx."""
+    return formatar_paragrafo(p.text, p.style.name)
+
+
+def _paragrafos_python_docx(origem) -> List[str]:
+    from docx import Document
+
+    doc = Document(origem)
+    return [converter_para_markdown(p) for p in doc.paragraphs if p.text.strip()]
+
+
+def ler_paragrafos_docx(origem: Union[bytes, str, os.PathLike, BinaryIO],
+                        leitor: Optional[str] = None) -> List[str]:
+    """
+    Parágrafos não vazios do documento (bytes, caminho ou arquivo aberto), já em markdown.
+
+    Por padrão usa o leitor rápido (lib/leitor_docx.py); com leitor="python-docx" (ou LEITOR_DOCX no .env)
+    usa o python-docx, que também é o plano B se o leitor rápido não entender o arquivo.
+    """
+    leitor = leitor or os.getenv("LEITOR_DOCX", LEITOR_RAPIDO)
+    if isinstance(origem, (bytes, bytearray)):
+        origem = io.BytesIO(origem)
+    if leitor == LEITOR_PYTHON_DOCX:
+        return _paragrafos_python_docx(origem)
+
+    try:
+        return [formatar_paragrafo(p.texto, p.estilo) for p in iterar_paragrafos(origem) if p.texto.strip()]
+    except Exception as erro:
+        logger.warning(f"⚠️ Leitor rápido falhou ({erro}); usando python-docx.")
+        if hasattr(origem, 'seek'):
+            origem.seek(0)
+        return _paragrafos_python_docx(origem)
+
+
+def _normalizar_unicode(texto: str) -> str:
+    """Caminho completo (NFKD + regex), para textos com caracteres fora da tabela pré-calculada."""
+    nksel = unicodedata.normalize('NFKD', texto)
+    sem_acentos = "".join([c for c in nksel if not unicodedata.combining(c)])
+    limpo = RE_NAO_PALAVRA.sub('', sem_acentos)
+    return RE_ESPACOS.sub(' ', limpo).strip().lower()
+
+
+def _tabela_busca() -> dict:
+    """Para cada caractere das faixas cobertas, o resultado do caminho completo sem juntar espaços: "á" → "a", "?" → "", "¨" → " "."""
+    tabela = {}
+    for inicio, fim in FAIXAS_TABELA_BUSCA:
+        for codigo in range(inicio, fim):
+            nksel = unicodedata.normalize('NFKD', chr(codigo))
+            sem_acentos = "".join([c for c in nksel if not unicodedata.combining(c)])
+            tabela[codigo] = RE_ESPACOS.sub(' ', RE_NAO_PALAVRA.sub('', sem_acentos)).lower()
+    return str.maketrans(tabela)
+
+
+# Latin-1 e Latin Extended-A/B cobrem o português; a General Punctuation traz o que o Word insere
+# sozinho (aspas curvas, apóstrofo ’, travessões, reticências). O resto vai pelo caminho completo.
+LIMITE_TABELA_BUSCA = 0x250
+FAIXAS_TABELA_BUSCA = ((0, LIMITE_TABELA_BUSCA), (0x2000, 0x2070))
+TABELA_BUSCA = _tabela_busca()
+RE_FORA_DA_TABELA = re.compile(r'[^\u0000-\u024f\u2000-\u206f]')  # Mesmas faixas, para uma busca em C
+
+
+def normalizar_para_busca(texto: str) -> str:
+    """Padroniza o texto para que o chatbot encontre respostas sem erro de acento."""
+    if not texto: return ""
+    if max(texto) < chr(LIMITE_TABELA_BUSCA) or not RE_FORA_DA_TABELA.search(texto):
+        # Um único translate em C, sem NFKD nem regex por chamada
+        return " ".join(texto.translate(TABELA_BUSCA).split())
+    return _normalizar_unicode(texto)
+
+
+def categoria_do_nome(nome_arquivo: str) -> str:
+    """Categoria inicial do documento, derivada do nome do arquivo ("FAQ VACINAS.docx" → "vacinas")."""
+    return nome_arquivo.replace("FAQ", "").replace(".docx", "").strip().lower()
+
+
+# ============================================================================
+# METADADOS (TAGS / FONTE)
+# ============================================================================
+
+def _metadados_linha(linha: str) -> Tuple[Optional[List[str]], Optional[str]]:
+    """TAGS e FONTE de um único parágrafo (None quando o parágrafo não tem o campo)."""
+    fonte = None
+    f_match = RE_FONTE.search(linha)
+    if f_match:
+        fonte = f_match.group(1).strip().rstrip('.)')
+
+    tags = None
+    t_match = RE_TAGS.search(linha)
+    if t_match:
+        brutas = RE_SEPARADOR_TAGS.split(t_match.group(1).replace('#', ''))
+        tags = [t for t in (b.strip().lower() for b in brutas) if t and t not in NAO_SAO_TAGS]
+    return tags, fonte
+
+
+def _metadados_janela(metadados: List[Tuple], i: int) -> Tuple[List[str], str]:
+    """Primeira ocorrência de TAGS e de FONTE no parágrafo anterior, no atual ou no seguinte."""
+    tags, fonte = None, None
+    for tags_linha, fonte_linha in metadados[max(0, i - 1):i + 2]:
+        if tags is None:
+            tags = tags_linha
+        if fonte is None:
+            fonte = fonte_linha
+    return tags or [], fonte or ""
+
+
+def extrair_tags_e_fonte(paragrafos: List[str], i: int) -> Tuple[List[str], str]:
+    """Busca metadados ao redor da pergunta/resposta encontrada."""
+    janela = [_metadados_linha(p) for p in paragrafos[max(0, i - 1):i + 2]]
+    return _metadados_janela(janela, min(i, 1))
+
+
+# ============================================================================
+# MÁQUINA DE ESTADOS P: / R:
+# ============================================================================
+
+def _limpar_resposta(texto: str) -> str:
+    """Remove TAGS/FONTE que vierem depois da resposta na mesma linha."""
+    return RE_METADADOS.split(texto, maxsplit=1)[0].strip()
+
+
+def extrair_faqs(paragrafos: List[str], categoria_inicial: str = "") -> ResultadoParse:
+    """Percorre os parágrafos uma única vez e devolve os pares P/R com seus metadados."""
+    resultado = ResultadoParse(paragrafos=len(paragrafos))
+    # Metadados de cada parágrafo calculados uma vez (em vez de reprocessar a janela a cada item)
+    metadados = [_metadados_linha(p) for p in paragrafos]
+    categoria = categoria_inicial
+
+    # Variáveis de controle para rastreamento de perguntas multi-linha
+    pergunta_pendente = ""
+    linha_inicio_pergunta = 0
+
+    for i, linha in enumerate(paragrafos):
+        num_linha = i + 1  # Para facilitar a localização manual no Word (que não começa em 0)
+        try:
+            # 1. Troca de Assunto/Categoria (a linha só é descartada se contiver apenas o marcador)
+            assunto_m = RE_ASSUNTO.search(linha)
+            if assunto_m:
+                categoria = assunto_m.group(1).strip().lower()
+                if RE_SO_ASSUNTO.fullmatch(linha):
+                    continue
+                linha = RE_ASSUNTO.sub('', linha).strip()
+
+            pergunta, resposta = None, None
+
+            # 2. Pergunta e Resposta na MESMA LINHA
+            if RE_P.search(linha) and RE_R.search(linha):
+                partes = RE_DIVIDE_R.split(linha)
+                pergunta = RE_PREFIXO_P.sub('', partes[0]).strip()
+                resposta = _limpar_resposta(partes[2])
+
+            # 3. Apenas o início de uma PERGUNTA (P:)
+            elif RE_INICIO_P.search(linha):
+                pergunta_pendente = RE_INICIO_P.sub('', linha).strip()
+                linha_inicio_pergunta = num_linha
+                continue
+
+            # 4. RESPOSTA (R:) para uma pergunta detectada anteriormente
+            elif RE_INICIO_R.search(linha):
+                if pergunta_pendente:
+                    pergunta = pergunta_pendente
+                    resposta = _limpar_resposta(RE_INICIO_R.sub('', linha))
+                    pergunta_pendente = ""
+                else:
+                    resultado.avisos.append(Aviso(num_linha, "Resposta sem pergunta correspondente"))
+
+            if pergunta and resposta:
+                tags, fonte = _metadados_janela(metadados, i)
+                resultado.faqs.append(RegistroFAQ(pergunta, resposta, categoria, tags, fonte, num_linha))
+
+        except Exception as erro:
+            # RASTREABILIDADE: registra o erro sem parar o processamento do resto do arquivo
+            resultado.avisos.append(Aviso(num_linha, f"Erro ao processar parágrafo: {erro}"))
+
+    # Sobrou pergunta sem resposta no final do arquivo?
+    if pergunta_pendente:
+        resultado.avisos.append(Aviso(linha_inicio_pergunta, "Pergunta ficou sem resposta (R:)"))
+
+    return resultado
+
+
+def extrair_faqs_docx(origem: Union[bytes, str, os.PathLike, BinaryIO],
+                      nome_arquivo: Optional[str] = None) -> ResultadoParse:
+    """Lê um .docx (bytes, caminho ou arquivo aberto) e extrai as FAQs."""
+    if nome_arquivo is None:
+        nome_arquivo = os.path.basename(origem) if isinstance(origem, (str, os.PathLike)) else ""
+    return extrair_faqs(ler_paragrafos_docx(origem), categoria_do_nome(str(nome_arquivo)))
+
+
+def main(argv=None):
+    caminhos = argv if argv is not None else sys.argv[1:]
+    if not caminhos:
+        print("Uso: python -m lib.parser_faq ARQUIVO.docx [...]")
+        return 1
+    for caminho in caminhos:
+        resultado = extrair_faqs_docx(caminho)
+        print(json.dumps({
+            "arquivo": str(caminho),
+            "paragrafos": resultado.paragrafos,
+            "faqs": [asdict(f) for f in resultado.faqs],
+            "avisos": [asdict(a) for a in resultado.avisos],
+        }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
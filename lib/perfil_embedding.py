@@ -0,0 +1,112 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from lib.gemini_embendding import DIMENSAO_EMBEDDING, MODELO_EMBEDDING
+from lib.vetores import FORMATO_FLOAT32, FORMATO_INT8, FORMATO_LISTA, FORMATOS, Vetor, ajustar_dimensao, codificar
+
+# ============================================================================
+# PERFIL DE EMBEDDING (pode ser sobrescrito pelo .env: EMBEDDING_DIMENSAO, EMBEDDING_FORMATO)
+# Um único lugar define modelo, dimensão e formato dos vetores; o índice do Atlas, o
+# sincronizador, o gerar_embeddings.py e o limpar_banco.py derivam tudo daqui.
+# Depois de uma migração (gerar_embeddings.py --migrar), o perfil ativo fica gravado em sync_metadata
+# e vale mais que o .env, porque o campo e o índice dos vetores mudam.
+# ============================================================================
+INDEX_NAME = "vector_index"
+CAMPO_EMBEDDING = "embedding"
+ID_PERFIL_ATIVO = "perfil_embedding_ativo"  # Documento de sync_metadata com o perfil em uso
+SIMILARIDADE = "cosine"
+CAMPOS_FILTRO = ("isActive", "category")
+
+# Faixa aceita pelo output_dimensionality do gemini-embedding-001 (768, 1536 e 3072 são os recomendados)
+DIMENSAO_MINIMA = 128
+
+
+@dataclass(frozen=True)
+class PerfilEmbedding:
+    modelo: str = MODELO_EMBEDDING
+    dimensao: int = DIMENSAO_EMBEDDING
+    formato: str = FORMATO_FLOAT32
+    similaridade: str = SIMILARIDADE
+    campo: str = CAMPO_EMBEDDING   # Campo das FAQs onde o vetor é gravado
+    indice: str = INDEX_NAME       # Índice vetorial do Atlas sobre esse campo
+
+    def __post_init__(self):
+        if not DIMENSAO_MINIMA <= self.dimensao <= DIMENSAO_EMBEDDING:
+            raise ValueError(f"Dimensão {self.dimensao} fora da faixa {DIMENSAO_MINIMA}–{DIMENSAO_EMBEDDING}")
+        if self.formato not in FORMATOS:
+            raise ValueError(f"Formato de vetor desconhecido: {self.formato} (use {', '.join(FORMATOS)})")
+
+    def __str__(self):
+        return f"{self.modelo} / {self.dimensao} dimensões / {self.formato}"
+
+    def ajustar(self, vetor: List[float]) -> List[float]:
+        """Trunca (se vier maior) e renormaliza um vetor para a dimensão do perfil."""
+        return ajustar_dimensao(vetor, self.dimensao)
+
+    def codificar(self, vetor: Vetor) -> Vetor:
+        """Valor gravado no campo `embedding` das FAQs."""
+        return codificar(vetor, self.formato)
+
+    def vetor_consulta(self, vetor: Vetor) -> Vetor:
+        """queryVector do $vectorSearch: floats para índices float, binData int8 para vetores quantizados."""
+        return codificar(vetor, FORMATO_INT8 if self.formato == FORMATO_INT8 else FORMATO_LISTA)
+
+    def definicao_indice(self) -> Dict:
+        return {
+            "fields": [
+                {
+                    "type": "vector",
+                    "path": self.campo,
+                    "numDimensions": self.dimensao,
+                    "similarity": self.similaridade
+                },
+                *({"type": "filter", "path": campo} for campo in CAMPOS_FILTRO)
+            ]
+        }
+
+    def modelo_indice(self, nome: Optional[str] = None):
+        """SearchIndexModel do índice vetorial do perfil."""
+        from pymongo.operations import SearchIndexModel
+        return SearchIndexModel(definition=self.definicao_indice(), name=nome or self.indice, type="vectorSearch")
+
+    def para_dict(self) -> Dict:
+        return {"modelo": self.modelo, "dimensao": self.dimensao, "formato": self.formato,
+                "similaridade": self.similaridade, "campo": self.campo, "indice": self.indice}
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> "PerfilEmbedding":
+        return cls(**{k: dados[k] for k in ("modelo", "dimensao", "formato", "similaridade", "campo", "indice")
+                      if k in dados})
+
+
+def carregar_perfil(col_meta=None) -> PerfilEmbedding:
+    """
+    Perfil em uso: o gravado em sync_metadata por uma migração, se `col_meta` for informada e ele
+    existir; senão o configurado no .env (ou o padrão: 3072 dimensões em float32).
+    """
+    if col_meta is not None:
+        ativo = col_meta.find_one({"_id": ID_PERFIL_ATIVO})
+        if ativo:
+            return PerfilEmbedding.de_dict(ativo)
+    return PerfilEmbedding(
+        dimensao=int(os.getenv("EMBEDDING_DIMENSAO", DIMENSAO_EMBEDDING)),
+        formato=os.getenv("EMBEDDING_FORMATO", FORMATO_FLOAT32),
+    )
+
+
+def salvar_perfil_ativo(col_meta, perfil: PerfilEmbedding):
+    col_meta.replace_one({"_id": ID_PERFIL_ATIVO}, {"_id": ID_PERFIL_ATIVO, **perfil.para_dict()}, upsert=True)
+
+
+def dimensao_do_indice(indices: Iterable[Dict], nome: str = INDEX_NAME) -> Optional[int]:
+    """numDimensions do índice vetorial `nome` (resultado de list_search_indexes), ou None se não existir."""
+    for idx in indices:
+        if idx.get("name") != nome:
+            continue
+        definicao = idx.get("latestDefinition") or idx.get("definition") or {}
+        for campo in definicao.get("fields", []):
+            if campo.get("type") == "vector":
+                return campo.get("numDimensions")
+        return 0
+    return None
@@ -0,0 +1,247 @@
+import io
+import os
+import json
+import re
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# PERFILAMENTO DA EXECUÇÃO (--profile)
+# Cada execução de etapa medida por lib.metricas (download, parse, embedding, gravação, embedding_api...)
+# ganha um cProfile próprio; uma thread amostra as pilhas de todas as etapas ativas para o flamegraph.
+# Saída em <pasta>/<script>_<carimbo>_<pid>/:
+#   execucao.prof / execucao.folded     a execução inteira (todas as etapas e threads)
+#   etapa_<nome>.prof                   cada etapa, somando todas as suas execuções
+#   arquivos/<arquivo>.prof / .folded   cada arquivo do Drive (download + parse)
+#   resumo.txt                          funções mais caras de cada etapa (pstats)
+#   memoria.json                        pico de memória de cada lote de embedding (--profile-memoria)
+# ============================================================================
+PASTA_PERFIS = os.getenv("PERFIS_DIR", ".perfis")
+ETAPA_EXECUCAO = "execucao"          # O que roda na thread principal fora de qualquer etapa
+INTERVALO_AMOSTRA = 0.005            # Segundos entre duas amostras de pilha
+QUADROS_TRACEMALLOC = 10
+FUNCOES_NO_RESUMO = 15
+# Python 3.12+: um único cProfile ativo por processo. Perfilando, os scripts rodam as etapas em série
+# (--serial e agendador sem pool) para que cada etapa e cada arquivo ganhe o seu .prof
+UM_PERFIL_POR_PROCESSO = sys.version_info >= (3, 12)
+
+RE_NOME_ARQUIVO = re.compile(r'[^\w.-]+')
+
+
+def _quadro(codigo) -> str:
+    """Nome do quadro no formato colapsado (sem ';', que separa os quadros)."""
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})".replace(";", ",")
+
+
+def _nome_seguro(rotulo: str) -> str:
+    return RE_NOME_ARQUIVO.sub("_", rotulo).strip("_") or "sem_nome"
+
+
+class Perfilador:
+    """
+    cProfile por execução de etapa, pilhas amostradas e, opcionalmente, o pico de memória dos lotes.
+
+    Na mesma thread, uma etapa dentro de outra (embedding → embedding_api) pausa o profiler de fora
+    e o retoma ao sair: o tempo de cada função fica em uma única etapa, e a soma de todas é a execução.
+    No Python 3.12+ só um cProfile pode estar ativo por vez no processo: os scripts perfilam em série
+    (UM_PERFIL_POR_PROCESSO); uma etapa que ainda encontre outro ativo em outra thread fica só nas pilhas.
+    """
+
+    def __init__(self, pasta: str, script: str, memoria: bool = False, etapas_memoria: Iterable[str] = ("embedding",),
+                 intervalo_amostra: float = INTERVALO_AMOSTRA):
+        carimbo = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.pasta = os.path.join(pasta, f"{script}_{carimbo}_{os.getpid()}")  # Trabalhadores em paralelo não colidem
+        self.memoria = memoria
+        self.etapas_memoria = set(etapas_memoria)
+        self.intervalo_amostra = intervalo_amostra
+        self.por_etapa: Dict[str, pstats.Stats] = {}
+        self.por_arquivo: Dict[str, pstats.Stats] = {}
+        self.pilhas: Counter = Counter()
+        self.pilhas_por_arquivo: Dict[str, Counter] = defaultdict(Counter)
+        self.lotes_memoria: List[Dict] = []
+        self.sem_perfil = 0
+        self._ativas: Dict[int, List[Tuple[str, Optional[str]]]] = {}  # Etapas abertas em cada thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._amostrador: Optional[threading.Thread] = None
+        self._principal: Optional[cProfile.Profile] = None
+
+    # ------------------------------------------------------------------
+    # cProfile por etapa
+    # ------------------------------------------------------------------
+    def _pilha_local(self) -> List[Optional[cProfile.Profile]]:
+        if not hasattr(self._local, "perfis"):
+            self._local.perfis = []
+        return self._local.perfis
+
+    def _ligar(self) -> Optional[cProfile.Profile]:
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Python 3.12+: outro cProfile já está ativo em outra thread
+            with self._lock:
+                self.sem_perfil += 1
+            return None
+        return perfil
+
+    def _acumular(self, destino: Dict[str, pstats.Stats], chave: str, perfil: cProfile.Profile):
+        with self._lock:
+            if chave in destino:
+                destino[chave].add(perfil)
+            else:
+                destino[chave] = pstats.Stats(perfil)
+
+    @contextmanager
+    def etapa(self, nome: str, rotulo: Optional[str] = None):
+        """Perfila o bloco como uma execução da etapa `nome`; `rotulo` é o arquivo do Drive, quando há um."""
+        perfis = self._pilha_local()
+        externo = perfis[-1] if perfis else None
+        if externo is not None:
+            externo.disable()
+        ident = threading.get_ident()
+        with self._lock:
+            self._ativas.setdefault(ident, []).append((nome, rotulo))
+        medir_memoria = self.memoria and nome in self.etapas_memoria
+        if medir_memoria:
+            antes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            inicio = time.perf_counter()
+        perfil = self._ligar()
+        perfis.append(perfil)
+        try:
+            yield
+        finally:
+            perfis.pop()
+            if perfil is not None:
+                perfil.disable()
+            if medir_memoria:
+                atual, pico = tracemalloc.get_traced_memory()
+                with self._lock:
+                    self.lotes_memoria.append({"etapa": nome, "lote": len(self.lotes_memoria) + 1,
+                                               "pico_bytes": max(0, pico - antes), "retido_bytes": atual - antes,
+                                               "segundos": round(time.perf_counter() - inicio, 6)})
+            with self._lock:
+                abertas = self._ativas[ident]
+                abertas.pop()
+                if not abertas:
+                    del self._ativas[ident]
+            if externo is not None:
+                externo.enable()
+            if perfil is not None:
+                self._acumular(self.por_etapa, nome, perfil)
+                if rotulo:
+                    self._acumular(self.por_arquivo, rotulo, perfil)
+
+    # ------------------------------------------------------------------
+    # Pilhas amostradas (formato colapsado do flamegraph.pl / speedscope)
+    # ------------------------------------------------------------------
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo_amostra):
+            quadros = sys._current_frames()
+            with self._lock:
+                ativas = {ident: list(etapas) for ident, etapas in self._ativas.items()}
+            for ident, etapas in ativas.items():
+                quadro = quadros.get(ident)
+                if quadro is None:
+                    continue
+                nomes = []
+                while quadro is not None:
+                    nomes.append(_quadro(quadro.f_code))
+                    quadro = quadro.f_back
+                nomes.reverse()
+                pilha = ";".join([etapas[-1][0], *nomes])
+                rotulo = next((r for _, r in reversed(etapas) if r), None)
+                with self._lock:
+                    self.pilhas[pilha] += 1
+                    if rotulo:
+                        self.pilhas_por_arquivo[rotulo][pilha] += 1
+
+    # ------------------------------------------------------------------
+    # Execução inteira
+    # ------------------------------------------------------------------
+    def __enter__(self):
+        if self.memoria:
+            tracemalloc.start(QUADROS_TRACEMALLOC)
+        with self._lock:
+            self._ativas[threading.get_ident()] = [(ETAPA_EXECUCAO, None)]
+        self._amostrador = threading.Thread(target=self._amostrar, daemon=True)
+        self._amostrador.start()
+        self._principal = self._ligar()
+        self._pilha_local().append(self._principal)
+        return self
+
+    def __exit__(self, *exc):
+        self._pilha_local().clear()
+        if self._principal is not None:
+            self._principal.disable()
+            self._acumular(self.por_etapa, ETAPA_EXECUCAO, self._principal)
+        self._parar.set()
+        self._amostrador.join()
+        with self._lock:
+            self._ativas.pop(threading.get_ident(), None)
+        if self.memoria:
+            tracemalloc.stop()
+        try:
+            self.salvar()
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível salvar os perfis: {e}")
+
+    # ------------------------------------------------------------------
+    # Relatórios
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _gravar_pilhas(caminho: str, pilhas: Counter):
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, amostras in pilhas.most_common():
+                f.write(f"{pilha} {amostras}\n")
+
+    def resumo_memoria(self) -> Optional[Dict]:
+        if not self.lotes_memoria:
+            return None
+        picos = [lote["pico_bytes"] for lote in self.lotes_memoria]
+        return {"lotes": len(picos), "pico_max_bytes": max(picos), "pico_medio_bytes": int(sum(picos) / len(picos)),
+                "por_lote": self.lotes_memoria}
+
+    def salvar(self):
+        os.makedirs(os.path.join(self.pasta, "arquivos"), exist_ok=True)
+        execucao = pstats.Stats()
+        resumo = io.StringIO()
+        for nome, stats in sorted(self.por_etapa.items()):
+            stats.dump_stats(os.path.join(self.pasta, f"etapa_{_nome_seguro(nome)}.prof"))
+            execucao.add(stats)
+            resumo.write(f"\n{'=' * 30} {nome} {'=' * 30}\n")
+            stats.stream = resumo
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(FUNCOES_NO_RESUMO)
+        execucao.dump_stats(os.path.join(self.pasta, "execucao.prof"))
+        for rotulo, stats in self.por_arquivo.items():
+            stats.dump_stats(os.path.join(self.pasta, "arquivos", f"{_nome_seguro(rotulo)}.prof"))
+        self._gravar_pilhas(os.path.join(self.pasta, "execucao.folded"), self.pilhas)
+        for rotulo, pilhas in self.pilhas_por_arquivo.items():
+            self._gravar_pilhas(os.path.join(self.pasta, "arquivos", f"{_nome_seguro(rotulo)}.folded"), pilhas)
+        with open(os.path.join(self.pasta, "resumo.txt"), "w", encoding="utf-8") as f:
+            f.write(resumo.getvalue())
+
+        memoria = self.resumo_memoria()
+        if memoria:
+            with open(os.path.join(self.pasta, "memoria.json"), "w", encoding="utf-8") as f:
+                json.dump(memoria, f, ensure_ascii=False, indent=2)
+            logger.info(f"🧠 Memória dos lotes de embedding: pico de {memoria['pico_max_bytes'] / 1024 / 1024:.1f} MB "
+                        f"(média {memoria['pico_medio_bytes'] / 1024 / 1024:.1f} MB em {memoria['lotes']} lotes).")
+        if self.sem_perfil:
+            logger.warning(f"⚠️ {self.sem_perfil} execução(ões) de etapa sem cProfile (outro já ativo); "
+                           f"elas aparecem só nas pilhas amostradas.")
+        logger.info(f"🔬 Perfis salvos em {self.pasta} ({len(self.por_etapa)} etapas, {len(self.por_arquivo)} arquivos, "
+                    f"{sum(self.pilhas.values())} amostras de pilha).")
@@ -0,0 +1,221 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURAÇÃO DO PIPELINE
+# ============================================================================
+DOWNLOADS_PARALELOS = 4
+PARSERS_PARALELOS = max(1, (os.cpu_count() or 2) - 1)
+TAMANHO_FILA = 8                # Máximo de arquivos aguardando entre duas etapas
+ITENS_POR_LOTE_EMBEDDING = 200  # Itens acumulados (de vários arquivos) antes de chamar a API
+ARQUIVOS_POR_LOTE_GRAVACAO = 5  # Arquivos gravados no Mongo em um único bulk_write
+
+_FIM = object()  # Sentinela que indica o fim de uma fila
+
+
+class ConfigPipeline:
+    """Concorrência de cada etapa. `modo_serial=True` processa um arquivo por vez, sem threads."""
+
+    def __init__(self, downloads_paralelos: int = DOWNLOADS_PARALELOS, parsers_paralelos: int = PARSERS_PARALELOS,
+                 tamanho_fila: int = TAMANHO_FILA, itens_por_lote_embedding: int = ITENS_POR_LOTE_EMBEDDING,
+                 arquivos_por_lote_gravacao: int = ARQUIVOS_POR_LOTE_GRAVACAO, parser_em_processos: bool = True,
+                 modo_serial: bool = False):
+        self.downloads_paralelos = max(1, downloads_paralelos)
+        self.parsers_paralelos = max(1, parsers_paralelos)
+        self.tamanho_fila = max(1, tamanho_fila)
+        self.itens_por_lote_embedding = max(1, itens_por_lote_embedding)
+        self.arquivos_por_lote_gravacao = max(1, arquivos_por_lote_gravacao)
+        self.parser_em_processos = parser_em_processos
+        self.modo_serial = modo_serial
+
+
+class PipelineSync:
+    """
+    Encadeia as etapas da sincronização com filas limitadas, para que rede, CPU e banco
+    trabalhem ao mesmo tempo:
+
+        download (threads) → parse (processos) → embedding (em lote) → gravação (em lote)
+
+    Cada trabalho é um dicionário com ao menos a chave "arquivo" (metadados do Drive).
+    - baixar(trabalho) preenche "conteudo";
+    - extrair(trabalho) devolve o trabalho com "itens" (precisa ser picklable para rodar em processos);
+    - embutir(trabalhos) e gravar(trabalhos) recebem listas de trabalhos.
+    Falhas em um arquivo são registradas e o arquivo é descartado, sem parar os demais. Uma falha
+    ao percorrer `trabalhos` (o iterável de executar) é relançada por executar no fim.
+    Com `metricas` (lib.metricas.MetricasExecucao), cada chamada de etapa tem a duração registrada
+    como "download", "parse", "embedding" e "gravacao".
+    """
+
+    def __init__(self, baixar: Callable[[Dict], Dict], extrair: Callable[[Dict], Dict],
+                 embutir: Callable[[List[Dict]], None], gravar: Callable[[List[Dict]], None],
+                 config: Optional[ConfigPipeline] = None, metricas=None):
+        self.metricas = metricas
+        self.baixar = self._medido("download", baixar)
+        self.extrair = extrair  # Medido no processo principal (a função vai por pickle para o pool)
+        self.embutir = self._medido("embedding", embutir)
+        self.gravar = self._medido("gravacao", gravar)
+        self.config = config or ConfigPipeline()
+        self.falhas: List[str] = []  # Nomes dos arquivos descartados por erro
+
+    def _medido(self, etapa: str, funcao: Callable):
+        if self.metricas is None:
+            return funcao
+
+        def medida(argumento):
+            # Etapas de um arquivo só (download, parse) levam o nome dele, para o perfil por arquivo
+            rotulo = self._nome(argumento) if isinstance(argumento, dict) else None
+            with self.metricas.etapa(etapa, rotulo):
+                return funcao(argumento)
+        return medida
+
+    # ------------------------------------------------------------------------
+    # Modo serial (depuração)
+    # ------------------------------------------------------------------------
+    def _executar_serial(self, trabalhos: Iterable[Dict]):
+        extrair = self._medido("parse", self.extrair)
+        for trabalho in trabalhos:
+            trabalho = self._seguro(self.baixar, trabalho)
+            trabalho = trabalho and self._seguro(extrair, trabalho)
+            if trabalho is None:
+                continue
+            if self._seguro_lote(self.embutir, [trabalho]):
+                self._seguro_lote(self.gravar, [trabalho])
+
+    # ------------------------------------------------------------------------
+    # Modo paralelo
+    # ------------------------------------------------------------------------
+    def executar(self, trabalhos: Iterable[Dict]):
+        if self.config.modo_serial:
+            return self._executar_serial(trabalhos)
+
+        cfg = self.config
+        fila_download = queue.Queue(maxsize=cfg.tamanho_fila)
+        fila_parse = queue.Queue(maxsize=cfg.tamanho_fila)
+        fila_embedding = queue.Queue(maxsize=cfg.tamanho_fila)
+        fila_gravacao = queue.Queue(maxsize=cfg.tamanho_fila)
+
+        if cfg.parser_em_processos:
+            pool_parse = ProcessPoolExecutor(max_workers=cfg.parsers_paralelos)
+            # Sobe os processos de parse antes de criar qualquer thread (fork com threads ativas é inseguro)
+            pool_parse.submit(int).result()
+
+            def extrair_no_pool(trabalho):
+                return pool_parse.submit(self.extrair, trabalho).result()
+        else:
+            # Em threads, o parse roda na própria thread da etapa (e aparece no perfil do arquivo)
+            pool_parse = None
+            extrair_no_pool = self.extrair
+
+        erros_alimentacao: List[BaseException] = []
+        threads = [threading.Thread(target=self._alimentar, args=(trabalhos, fila_download, erros_alimentacao),
+                                    daemon=True)]
+        threads += self._trabalhadores(cfg.downloads_paralelos, fila_download, fila_parse, self.baixar)
+        threads += self._trabalhadores(cfg.parsers_paralelos, fila_parse, fila_embedding,
+                                      self._medido("parse", extrair_no_pool))
+        threads.append(threading.Thread(
+            target=self._agrupar, daemon=True,
+            args=(fila_embedding, fila_gravacao, self.embutir,
+                  lambda lote: sum(len(t.get("itens", [])) for t in lote) >= cfg.itens_por_lote_embedding)))
+        threads.append(threading.Thread(
+            target=self._agrupar, daemon=True,
+            args=(fila_gravacao, None, self.gravar, lambda lote: len(lote) >= cfg.arquivos_por_lote_gravacao)))
+
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            if pool_parse is not None:
+                pool_parse.shutdown()
+        if erros_alimentacao:
+            # Os trabalhos já enfileirados foram até o fim; a execução, não (como no modo serial)
+            raise erros_alimentacao[0]
+
+    def _alimentar(self, trabalhos: Iterable[Dict], saida: queue.Queue, erros: List[BaseException]):
+        """Enfileira os trabalhos; se o iterável falhar, a sentinela sai mesmo assim e o erro fica em `erros`."""
+        try:
+            for trabalho in trabalhos:
+                saida.put(trabalho)
+        except BaseException as e:
+            logger.error(f"   ❌ Falha ao obter os arquivos a processar: {e}")
+            erros.append(e)
+        finally:
+            saida.put(_FIM)
+
+    def _trabalhadores(self, quantidade: int, entrada: queue.Queue, saida: queue.Queue,
+                       funcao: Callable[[Dict], Dict]) -> List[threading.Thread]:
+        """Cria `quantidade` threads que aplicam `funcao` a cada trabalho; a última a terminar fecha a saída."""
+        restantes = [quantidade]
+        lock = threading.Lock()
+
+        def laco():
+            while True:
+                trabalho = entrada.get()
+                if trabalho is _FIM:
+                    entrada.put(_FIM)  # Repassa a sentinela para as outras threads da etapa
+                    break
+                resultado = self._seguro(funcao, trabalho)
+                if resultado is not None:
+                    saida.put(resultado)
+            with lock:
+                restantes[0] -= 1
+                if restantes[0] == 0:
+                    saida.put(_FIM)
+
+        return [threading.Thread(target=laco, daemon=True) for _ in range(quantidade)]
+
+    def _agrupar(self, entrada: queue.Queue, saida: Optional[queue.Queue],
+                 funcao: Callable[[List[Dict]], None], lote_cheio: Callable[[List[Dict]], bool]):
+        """Acumula trabalhos até o lote encher (ou a fila esvaziar) e aplica `funcao` ao lote inteiro."""
+        lote: List[Dict] = []
+        fim = False
+        while not fim:
+            trabalho = entrada.get() if not lote else self._pegar_sem_esperar(entrada)
+            if trabalho is _FIM:
+                fim = True
+            elif trabalho is not None:
+                lote.append(trabalho)
+                if not lote_cheio(lote):
+                    continue
+            if lote and self._seguro_lote(funcao, lote) and saida is not None:
+                for t in lote:
+                    saida.put(t)
+            lote = []
+        if saida is not None:
+            saida.put(_FIM)
+
+    @staticmethod
+    def _pegar_sem_esperar(entrada: queue.Queue):
+        try:
+            return entrada.get_nowait()
+        except queue.Empty:
+            return None
+
+    @staticmethod
+    def _nome(trabalho: Dict) -> str:
+        return trabalho.get("arquivo", {}).get("name", "?")
+
+    def _seguro(self, funcao: Callable[[Dict], Dict], trabalho: Dict) -> Optional[Dict]:
+        try:
+            return funcao(trabalho)
+        except Exception as e:
+            logger.error(f"   ❌ Falha crítica ao processar o arquivo {self._nome(trabalho)}: {e}")
+            self.falhas.append(self._nome(trabalho))
+            return None
+
+    def _seguro_lote(self, funcao: Callable[[List[Dict]], None], lote: List[Dict]) -> bool:
+        try:
+            funcao(lote)
+            return True
+        except Exception as e:
+            nomes = ", ".join(self._nome(t) for t in lote)
+            logger.error(f"   ❌ Falha crítica ao processar os arquivos {nomes}: {e}")
+            self.falhas.extend(self._nome(t) for t in lote)
+            return False
@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, List, Optional
+
+from lib.gemini_embendding import dividir_em_lotes, estimar_tokens
+from lib.repositorio_embeddings import texto_para_embedding
+
+# Preço de referência do gemini-embedding-001 (USD por milhão de tokens de entrada)
+PRECO_POR_MILHAO_TOKENS = 0.15
+
+
+def carregar_metadados(col_meta, file_ids: Optional[Iterable[str]] = None,
+                       checksums: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """
+    Metadados de sincronização em uma única consulta, indexados por file_id: todos, ou só os dos
+    arquivos informados e os de arquivos com algum dos checksums (para achar cópias já sincronizadas).
+    """
+    filtro: Dict = {"file_id": {"$exists": True}}
+    if file_ids is not None or checksums is not None:
+        filtro = {"$or": [{"file_id": {"$in": list(file_ids or [])}},
+                          {"md5_checksum": {"$in": [c for c in checksums or [] if c]}}]}
+    docs = col_meta.find(filtro, {"_id": 0, "file_id": 1, "last_modified": 1, "md5_checksum": 1, "file_name": 1})
+    return {doc["file_id"]: doc for doc in docs}
+
+
+def montar_plano(arquivos: List[Dict], metadados: Dict[str, Dict]) -> Dict[str, List[Dict]]:
+    """
+    Separa os arquivos listados em:
+
+    - pular: nada mudou;
+    - tocar: o conteúdo é o mesmo (md5Checksum igual), mas a data, o nome ou o checksum guardado mudou;
+      só os metadados são atualizados, sem baixar nem ler o arquivo;
+    - duplicados: cópia byte a byte de outro arquivo ({"arquivo", "origem"}); as FAQs são copiadas
+      da origem depois que ela estiver gravada, sem baixar nem ler o arquivo;
+    - reprocessar: o resto.
+    """
+    plano = {"pular": [], "tocar": [], "reprocessar": [], "duplicados": [], "remover": []}
+    # Origens possíveis para cópias: arquivos já sincronizados (se não mudarem nesta execução) ...
+    por_checksum = {meta['md5_checksum']: fid for fid, meta in metadados.items() if meta.get('md5_checksum')}
+    # ... e os arquivos que serão processados nesta execução
+    principais: Dict[str, str] = {}
+    alterados = set()
+    candidatos = []
+
+    for arq in arquivos:
+        meta = metadados.get(arq['id'])
+        md5 = arq.get('md5Checksum')
+        if meta and (meta.get('last_modified') == arq['modifiedTime'] or (md5 and meta.get('md5_checksum') == md5)):
+            mudou_metadado = (meta.get('last_modified') != arq['modifiedTime'] or meta.get('file_name') != arq['name']
+                              or (md5 and meta.get('md5_checksum') != md5))
+            plano["tocar" if mudou_metadado else "pular"].append(arq)
+            continue
+        alterados.add(arq['id'])
+        if md5 and md5 in principais:
+            plano["duplicados"].append({"arquivo": arq, "origem": principais[md5]})
+        elif md5 and por_checksum.get(md5, arq['id']) != arq['id']:
+            candidatos.append(arq)
+        else:
+            plano["reprocessar"].append(arq)
+            if md5:
+                principais[md5] = arq['id']
+
+    # Uma origem já sincronizada que também mudou nesta execução não tem mais aquele conteúdo
+    for arq in candidatos:
+        md5 = arq['md5Checksum']
+        origem = principais.get(md5) or (por_checksum[md5] if por_checksum[md5] not in alterados else None)
+        if origem:
+            plano["duplicados"].append({"arquivo": arq, "origem": origem})
+        else:
+            plano["reprocessar"].append(arq)
+            principais[md5] = arq['id']
+    return plano
+
+
+def estimar_embeddings(itens: List[Dict], cache: Dict[str, List[float]]) -> Dict:
+    """Quantos embeddings seriam reaproveitados/gerados para os itens extraídos e o custo estimado na API."""
+    novos = {}
+    for item in itens:
+        if item['content_hash'] not in cache:
+            novos[item['content_hash']] = texto_para_embedding(item['question'], item['answer'])
+    textos = list(novos.values())
+    tokens = sum(estimar_tokens(t) for t in textos)
+    return {
+        "itens": len(itens),
+        "reutilizados": sum(1 for item in itens if item['content_hash'] in cache),
+        "novos": len(textos),
+        "requisicoes": len(dividir_em_lotes(textos)),
+        "tokens": tokens,
+        "custo_usd": tokens / 1_000_000 * PRECO_POR_MILHAO_TOKENS,
+    }
+
+
+def imprimir_plano(plano: Dict[str, List[Dict]], estimativa: Dict = None, limite: int = None):
+    print("\n" + "🗺️  PLANO DE SINCRONIZAÇÃO")
+    print("─"*60)
+    print(f"⏭️  Arquivos a pular (sem alteração): {len(plano['pular'])}")
+    if plano.get('tocar'):
+        print(f"🏷️  Mesmo conteúdo (só metadados):    {len(plano['tocar'])}")
+    print(f"🔄 Arquivos a reprocessar:           {len(plano['reprocessar'])}")
+    for arq in plano['reprocessar']:
+        print(f"     • {arq['name']}")
+    if plano.get('duplicados'):
+        print(f"👯 Cópias idênticas (sem parse):     {len(plano['duplicados'])}")
+        for dup in plano['duplicados']:
+            print(f"     • {dup['arquivo']['name']}")
+    if plano.get('remover'):
+        print(f"🚫 Arquivos removidos da pasta:      {len(plano['remover'])}")
+    if estimativa is not None:
+        print(f"📄 FAQs nos arquivos reprocessados:  {estimativa['itens']}")
+        print(f"💰 Embeddings reutilizáveis:         {estimativa['reutilizados']}")
+        print(f"🆕 Embeddings novos previstos:       {estimativa['novos']}"
+              + (f" (limite da execução: {limite})" if limite is not None else ""))
+        print(f"📡 Requisições à API Gemini:         {estimativa['requisicoes']}")
+        print(f"🔢 Tokens estimados:                 {estimativa['tokens']}")
+        print(f"💵 Custo estimado:                   US$ {estimativa['custo_usd']:.4f}")
+    print("─"*60)
@@ -0,0 +1,138 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from lib.perfil_embedding import CAMPO_EMBEDDING
+
+logger = logging.getLogger(__name__)
+
+# Campos que podem mudar sem alterar o conteúdo P/R (item movido, reclassificado ou retagueado)
+CAMPOS_POSICAO = ("line_reference", "category", "tags", "source", "file_origin", "isActive")
+
+
+def projecao_existentes(campo_embedding: str = CAMPO_EMBEDDING) -> Dict:
+    """Projeção dos itens já gravados: tudo que a comparação usa, sem trazer o vetor de embedding."""
+    return {
+        "file_id": 1, "content_hash": 1, **{campo: 1 for campo in CAMPOS_POSICAO},
+        "tem_embedding": {"$in": [{"$type": f"${campo_embedding}"}, ["array", "binData"]]},
+    }
+
+
+# Código do MongoDB para "transações exigem replica set/mongos" (ex.: servidor local standalone)
+CODIGO_SEM_TRANSACAO = 20
+
+
+def diferenca_arquivo(existentes: List[Dict], itens: List[Dict],
+                      campo_embedding: str = CAMPO_EMBEDDING) -> Tuple[List, Dict[str, int]]:
+    """
+    Compara os itens já gravados de um arquivo com os recém-extraídos, pareando por content_hash.
+
+    Retorna as operações mínimas (inserir novos, atualizar só os campos de posição dos que mudaram
+    de lugar, apagar os que sumiram) e a contagem de cada tipo.
+    """
+    from pymongo.operations import DeleteOne, InsertOne, UpdateOne
+    por_hash: Dict[str, List[Dict]] = defaultdict(list)
+    for doc in existentes:
+        por_hash[doc.get("content_hash")].append(doc)
+
+    agora = datetime.now(timezone.utc)
+    operacoes = []
+    contagem = {"inseridos": 0, "atualizados": 0, "removidos": 0, "inalterados": 0}
+
+    for item in itens:
+        candidatos = por_hash.get(item["content_hash"])
+        if not candidatos:
+            operacoes.append(InsertOne(item))
+            contagem["inseridos"] += 1
+            continue
+
+        doc = candidatos.pop(0)
+        mudancas = {campo: item[campo] for campo in CAMPOS_POSICAO if doc.get(campo) != item[campo]}
+        if not doc.get("tem_embedding") and item.get(campo_embedding) is not None:
+            mudancas[campo_embedding] = item[campo_embedding]
+        if mudancas:
+            mudancas["updatedAt"] = agora
+            operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": mudancas}))
+            contagem["atualizados"] += 1
+        else:
+            contagem["inalterados"] += 1
+
+    for sobras in por_hash.values():
+        for doc in sobras:
+            operacoes.append(DeleteOne({"_id": doc["_id"]}))
+            contagem["removidos"] += 1
+
+    return operacoes, contagem
+
+
+def operacao_metadados(arquivo: Dict):
+    """Grava em sync_metadata a versão do arquivo que está no banco (data, nome e checksum do Drive)."""
+    from pymongo.operations import UpdateOne
+    campos = {"last_modified": arquivo['modifiedTime'], "file_name": arquivo.get('name'),
+              "updated_at": datetime.now(timezone.utc)}
+    if arquivo.get('md5Checksum'):
+        campos["md5_checksum"] = arquivo['md5Checksum']
+    return UpdateOne({"file_id": arquivo['id']}, {"$set": campos}, upsert=True)
+
+
+class Reconciliador:
+    """Grava lotes de arquivos aplicando só a diferença, dentro de uma transação quando o servidor permite."""
+
+    def __init__(self, col_dados, col_meta, campo_embedding: str = CAMPO_EMBEDDING, usar_transacao: bool = True):
+        self.col_dados = col_dados
+        self.col_meta = col_meta
+        self.campo_embedding = campo_embedding  # Campo do vetor no perfil ativo
+        self.usar_transacao = usar_transacao
+
+    def _aplicar(self, trabalhos: List[Dict], session=None) -> Dict[str, Dict[str, int]]:
+        file_ids = [t['arquivo']['id'] for t in trabalhos]
+        existentes: Dict[str, List[Dict]] = defaultdict(list)
+        for doc in self.col_dados.find({"file_id": {"$in": file_ids}}, projecao_existentes(self.campo_embedding),
+                                       session=session):
+            existentes[doc["file_id"]].append(doc)
+
+        operacoes = []
+        contagens = {}
+        for trabalho in trabalhos:
+            ops, contagem = diferenca_arquivo(existentes.get(trabalho['arquivo']['id'], []), trabalho['itens'],
+                                              self.campo_embedding)
+            operacoes.extend(ops)
+            contagens[trabalho['arquivo']['id']] = contagem
+
+        if operacoes:
+            self.col_dados.bulk_write(operacoes, ordered=False, session=session)
+
+        self.col_meta.bulk_write([operacao_metadados(t['arquivo']) for t in trabalhos], ordered=False, session=session)
+        return contagens
+
+    def tocar(self, arquivos: List[Dict]):
+        """
+        Arquivos com o mesmo conteúdo (md5Checksum) e data ou nome diferentes: atualiza só os metadados,
+        e o file_origin das FAQs quando o arquivo foi renomeado.
+        """
+        if not arquivos:
+            return
+        from pymongo.operations import UpdateMany
+        metadados = {doc["file_id"]: doc for doc in self.col_meta.find(
+            {"file_id": {"$in": [a['id'] for a in arquivos]}}, {"_id": 0, "file_id": 1, "file_name": 1})}
+        agora = datetime.now(timezone.utc)
+        renomeados = [UpdateMany({"file_id": a['id']}, {"$set": {"file_origin": a['name'], "updatedAt": agora}})
+                      for a in arquivos if metadados.get(a['id'], {}).get("file_name") not in (None, a['name'])]
+        if renomeados:
+            self.col_dados.bulk_write(renomeados, ordered=False)
+        self.col_meta.bulk_write([operacao_metadados(a) for a in arquivos], ordered=False)
+
+    def gravar(self, trabalhos: List[Dict]) -> Dict[str, Dict[str, int]]:
+        """Aplica a diferença de todos os arquivos do lote; devolve a contagem de operações por file_id."""
+        from pymongo.errors import OperationFailure
+        if self.usar_transacao:
+            try:
+                with self.col_dados.database.client.start_session() as session:
+                    return session.with_transaction(lambda s: self._aplicar(trabalhos, s))
+            except OperationFailure as e:
+                if e.code != CODIGO_SEM_TRANSACAO:
+                    raise
+                logger.warning("⚠️ Servidor MongoDB sem suporte a transações; gravando sem transação.")
+                self.usar_transacao = False
+        return self._aplicar(trabalhos)
@@ -0,0 +1,206 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from lib.parser_faq import normalizar_para_busca
+from lib.perfil_embedding import PerfilEmbedding
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+CONSULTAS_EM_CACHE = 2048
+TTL_CONSULTA_SEGUNDOS = 6 * 60 * 60
+# Candidatos avaliados pelo $vectorSearch para cada resultado devolvido (recomendação do Atlas: 10–20×)
+CANDIDATOS_POR_RESULTADO = 15
+# Constante da Reciprocal Rank Fusion: quanto maior, menos peso para o topo de cada lista
+CONSTANTE_RRF = 60
+
+INDICE_TEXTO = "busca_lexical"
+PROJECAO_RESULTADO = {"question": 1, "answer": 1, "category": 1, "tags": 1, "source": 1,
+                      "file_origin": 1, "line_reference": 1}
+
+
+class CacheConsultas:
+    """LRU com validade (TTL) para os vetores das perguntas, indexado pelo texto normalizado."""
+
+    def __init__(self, capacidade: int = CONSULTAS_EM_CACHE, ttl_segundos: float = TTL_CONSULTA_SEGUNDOS):
+        self.capacidade = capacidade
+        self.ttl = ttl_segundos
+        self._itens: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave: str) -> Optional[List[float]]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                if item is not None:
+                    del self._itens[chave]
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave: str, vetor: List[float]):
+        with self._lock:
+            self._itens[chave] = (time.monotonic(), vetor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class ClienteEmbeddingConsultas:
+    """
+    Gera o vetor da pergunta do usuário passando antes pelo cache em memória e, se informado,
+    pelo cache local em disco: perguntas repetidas ("dengue sintomas") não chamam o Gemini.
+    """
+
+    def __init__(self, servico, cache: Optional[CacheConsultas] = None, cache_local=None):
+        self.servico = servico
+        self.cache = cache or CacheConsultas()
+        self.cache_local = cache_local
+        self.chamadas_api = 0
+
+    def embutir(self, pergunta: str) -> List[float]:
+        chave = normalizar_para_busca(pergunta)
+        if not chave:
+            raise ValueError("Pergunta vazia")
+        vetor = self.cache.obter(chave)
+        if vetor is not None:
+            return vetor
+        if self.cache_local is not None:
+            vetor = self.cache_local.buscar([chave]).get(chave)
+        if vetor is None:
+            vetor = self.servico.gerar(pergunta)
+            self.chamadas_api += 1
+            if self.cache_local is not None:
+                self.cache_local.salvar({chave: vetor})
+        self.cache.guardar(chave, vetor)
+        return vetor
+
+
+@dataclass
+class ResultadoRecuperacao:
+    id: str
+    pergunta: str
+    resposta: str
+    categoria: str
+    score: float                       # Score combinado (Reciprocal Rank Fusion)
+    origens: List[str] = field(default_factory=list)  # "vetorial" e/ou "lexical"
+    score_vetorial: Optional[float] = None
+    score_lexical: Optional[float] = None
+    tags: List[str] = field(default_factory=list)
+    fonte: str = ""
+    arquivo: str = ""
+    linha: Optional[int] = None
+
+
+def garantir_indice_texto(collection):
+    """Índice de texto sobre question_normalized e tags (já sem acentos, por isso sem stemming de idioma)."""
+    from pymongo import TEXT
+    collection.create_index(
+        [("question_normalized", TEXT), ("tags", TEXT)],
+        name=INDICE_TEXTO, default_language="none", weights={"question_normalized": 3, "tags": 1}
+    )
+
+
+def fundir_rrf(listas: Dict[str, List[Tuple[Dict, float]]], k: int) -> List[ResultadoRecuperacao]:
+    """Combina listas ranqueadas (origem → [(doc, score)]) por Reciprocal Rank Fusion."""
+    combinados: Dict[str, ResultadoRecuperacao] = {}
+    for origem, docs in listas.items():
+        for posicao, (doc, score) in enumerate(docs, start=1):
+            id_doc = str(doc["_id"])
+            r = combinados.get(id_doc)
+            if r is None:
+                r = combinados[id_doc] = ResultadoRecuperacao(
+                    id=id_doc, pergunta=doc.get("question", ""), resposta=doc.get("answer", ""),
+                    categoria=doc.get("category", ""), score=0.0, tags=doc.get("tags") or [],
+                    fonte=doc.get("source", ""), arquivo=doc.get("file_origin", ""), linha=doc.get("line_reference")
+                )
+            r.score += 1 / (CONSTANTE_RRF + posicao)
+            r.origens.append(origem)
+            setattr(r, f"score_{origem}", score)
+    return sorted(combinados.values(), key=lambda r: r.score, reverse=True)[:k]
+
+
+class Recuperador:
+    """
+    Caminho de leitura para o chatbot: busca vetorial (Atlas $vectorSearch ou índice local) +
+    busca lexical em question_normalized, fundidas em um único ranking.
+
+    FAQs gravadas sem embedding continuam encontráveis pelo caminho lexical, e se o Gemini
+    estiver indisponível a busca segue só com ele. Com `indice_lexical` (lib/indice_lexical.py),
+    o ranking lexical é feito em memória por BM25 e o banco só devolve os documentos.
+    """
+
+    def __init__(self, col_dados, cliente: ClienteEmbeddingConsultas, perfil: PerfilEmbedding,
+                 indice_local=None, indice_lexical=None):
+        self.col_dados = col_dados
+        self.cliente = cliente
+        self.perfil = perfil
+        self.indice_local = indice_local  # lib.busca_local.IndiceLocal, para rodar sem Atlas
+        self.indice_lexical = indice_lexical  # lib.indice_lexical.IndiceLexical, em vez do índice $text
+
+    def _filtro(self, categoria: Optional[str]) -> Dict:
+        filtro = {"isActive": True}
+        if categoria:
+            filtro["category"] = categoria.strip().lower()
+        return filtro
+
+    def busca_vetorial(self, vetor: List[float], k: int, categoria: Optional[str] = None) -> List[Tuple[Dict, float]]:
+        if self.indice_local is not None:
+            return [({"_id": r.id, "question": r.pergunta, "answer": r.resposta, "category": r.categoria,
+                      "file_origin": r.arquivo, "line_reference": r.linha}, r.score)
+                    for r in self.indice_local.buscar(vetor, k, categoria=categoria)]
+
+        pipeline = [
+            {"$vectorSearch": {
+                "index": self.perfil.indice,
+                "path": self.perfil.campo,
+                "queryVector": self.perfil.vetor_consulta(vetor),
+                "numCandidates": k * CANDIDATOS_POR_RESULTADO,
+                "limit": k,
+                "filter": self._filtro(categoria),
+            }},
+            {"$project": {**PROJECAO_RESULTADO, "score": {"$meta": "vectorSearchScore"}}},
+        ]
+        return [(doc, doc.pop("score")) for doc in self.col_dados.aggregate(pipeline)]
+
+    def busca_lexical(self, pergunta: str, k: int, categoria: Optional[str] = None) -> List[Tuple[Dict, float]]:
+        if self.indice_lexical is not None:
+            ranking = self.indice_lexical.buscar(pergunta, k, categoria)
+            if not ranking:
+                return []
+            # O índice pode estar um pouco atrás do banco: o filtro isActive descarta FAQs já desativadas
+            docs = {doc["_id"]: doc for doc in self.col_dados.find(
+                {"_id": {"$in": [id_doc for id_doc, _ in ranking]}, "isActive": True}, PROJECAO_RESULTADO)}
+            return [(docs[id_doc], score) for id_doc, score in ranking if id_doc in docs]
+
+        termos = normalizar_para_busca(pergunta)
+        if not termos:
+            return []
+        docs = self.col_dados.find(
+            {"$text": {"$search": termos}, **self._filtro(categoria)},
+            {**PROJECAO_RESULTADO, "score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"})]).limit(k)
+        return [(doc, doc.pop("score")) for doc in docs]
+
+    def buscar(self, pergunta: str, k: int = 5, categoria: Optional[str] = None) -> List[ResultadoRecuperacao]:
+        """As k FAQs mais relevantes para a pergunta, combinando busca vetorial e lexical."""
+        listas: Dict[str, List[Tuple[Dict, float]]] = {}
+        try:
+            listas["vetorial"] = self.busca_vetorial(self.cliente.embutir(pergunta), k, categoria)
+        except Exception as e:
+            logger.warning(f"⚠️ Busca vetorial indisponível ({e}); usando só a busca lexical.")
+        listas["lexical"] = self.busca_lexical(pergunta, k, categoria)
+        return fundir_rrf(listas, k)
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+
+from lib.vetores import FORMATO_FLOAT32, Vetor, ajustar_dimensao, codificar, decodificar, dimensao_de, eh_int8
+
+logger = logging.getLogger(__name__)
+
+COL_EMBEDDINGS = "embedding_store"
+
+
+def gerar_hash_conteudo(pergunta: str, resposta: str) -> str:
+    """Gera hash MD5 do conteúdo para detectar mudanças."""
+    conteudo = f"{pergunta}|{resposta}"
+    return hashlib.md5(conteudo.encode('utf-8')).hexdigest()
+
+
+def texto_para_embedding(pergunta: str, resposta: str) -> str:
+    """Texto enviado à API para um item de FAQ (o mesmo em todos os scripts)."""
+    return f"{pergunta} {resposta}"
+
+
+class RepositorioEmbeddings:
+    """
+    Armazém de vetores endereçado por conteúdo, compartilhado entre arquivos e scripts.
+
+    A chave é content_hash + modelo + dimensão: o mesmo P/R em outro arquivo, movido entre
+    documentos ou reenviado com outro ID reaproveita o vetor em vez de pagar outra chamada à API.
+    Os vetores ficam sempre em binData float32 (precisão total), qualquer que seja o formato das FAQs.
+    """
+
+    def __init__(self, collection, modelo: str, dimensao: int):
+        self.collection = collection
+        self.modelo = modelo
+        self.dimensao = dimensao
+
+    def chave(self, content_hash: str) -> str:
+        return f"{content_hash}|{self.modelo}|{self.dimensao}"
+
+    def _filtro_perfil(self) -> Dict:
+        return {"model": self.modelo, "dimensions": self.dimensao}
+
+    def garantir_indice(self):
+        self.collection.create_index([("model", 1), ("dimensions", 1)])
+
+    def buscar(self, content_hashes: Iterable[str]) -> Dict[str, Vetor]:
+        """Vetores já conhecidos para os hashes informados (uma única consulta)."""
+        chaves = [self.chave(h) for h in set(content_hashes)]
+        if not chaves:
+            return {}
+        docs = self.collection.find({"_id": {"$in": chaves}}, {"_id": 0, "content_hash": 1, "embedding": 1})
+        return {doc["content_hash"]: doc["embedding"] for doc in docs}
+
+    def carregar_todos(self) -> Dict[str, Vetor]:
+        """Todos os vetores do modelo/dimensão atuais, indexados por content_hash."""
+        docs = self.collection.find(self._filtro_perfil(), {"_id": 0, "content_hash": 1, "embedding": 1})
+        return {doc["content_hash"]: doc["embedding"] for doc in docs}
+
+    def salvar(self, vetores: Dict[str, Vetor]):
+        """Grava vetores novos; chaves que já existem não são sobrescritas."""
+        if not vetores:
+            return
+        from pymongo.operations import UpdateOne
+        agora = datetime.now(timezone.utc)
+        self.collection.bulk_write([
+            UpdateOne(
+                {"_id": self.chave(content_hash)},
+                {"$setOnInsert": {"content_hash": content_hash, **self._filtro_perfil(),
+                                  "embedding": codificar(vetor, FORMATO_FLOAT32), "created_at": agora}},
+                upsert=True
+            ) for content_hash, vetor in vetores.items()
+        ], ordered=False)
+
+    def semear_de(self, col_dados, campo: str = "embedding") -> int:
+        """
+        Preenche o armazém de um perfil novo (migração única, quando ainda está vazio) com vetores que já existem:
+        os do mesmo modelo em uma dimensão maior, truncados e renormalizados, e os já gravados no `campo` das FAQs.
+        """
+        if self.collection.find_one(self._filtro_perfil(), {"_id": 1}):
+            return 0
+        vetores: Dict[str, List[float]] = {}
+        maiores = self.collection.find(
+            {"model": self.modelo, "dimensions": {"$gt": self.dimensao}},
+            {"_id": 0, "content_hash": 1, "embedding": 1}
+        )
+        for doc in maiores:
+            if doc["content_hash"] not in vetores:
+                vetores[doc["content_hash"]] = ajustar_dimensao(decodificar(doc["embedding"]), self.dimensao)
+
+        docs = col_dados.find(
+            {"content_hash": {"$exists": True}, campo: {"$ne": None}},
+            {"_id": 0, "content_hash": 1, campo: 1}
+        )
+        for doc in docs:
+            vetor = doc[campo]
+            # Vetores int8 já perderam precisão; só aproveita os compatíveis com a dimensão configurada
+            if doc["content_hash"] in vetores or eh_int8(vetor) or dimensao_de(vetor) < self.dimensao:
+                continue
+            vetor = decodificar(vetor)
+            vetores[doc["content_hash"]] = vetor if len(vetor) == self.dimensao else ajustar_dimensao(vetor, self.dimensao)
+        self.salvar(vetores)
+        if vetores:
+            logger.info(f"📦 Armazém de embeddings semeado com {len(vetores)} vetores existentes.")
+        return len(vetores)
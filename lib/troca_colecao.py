@@ -0,0 +1,137 @@
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from lib.perfil_embedding import INDEX_NAME, PerfilEmbedding
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# TROCA BLUE/GREEN DA COLEÇÃO DE FAQS
+# A coleção nova (sombra) é preenchida e indexada enquanto a atual continua atendendo o chatbot;
+# só quando o índice vetorial da sombra responde a consultas ela passa a ser a coleção ativa.
+# ============================================================================
+ID_ALIAS = "colecao_ativa"   # Documento de sync_metadata que aponta para a coleção física ativa
+SUFIXO_SOMBRA = "_sombra"
+
+TROCA_RENOMEAR = "renomear"  # renameCollection sobre o nome fixo (leitores externos não mudam nada)
+TROCA_ALIAS = "alias"        # Coleções com carimbo de data; os scripts resolvem a ativa pelo alias
+TROCAS = (TROCA_ALIAS, TROCA_RENOMEAR)
+
+INTERVALO_CONSULTA_INDICE = 5.0   # Segundos entre duas consultas a list_search_indexes
+TIMEOUT_INDICE = 900.0            # Tempo máximo esperando o Atlas construir (ou remover) o índice
+
+
+def colecao_ativa(col_meta, padrao: str) -> str:
+    """Nome da coleção física que o chatbot deve ler: a do alias, se houver, senão `padrao`."""
+    alias = col_meta.find_one({"_id": ID_ALIAS}, {"colecao": 1})
+    return alias["colecao"] if alias and alias.get("colecao") else padrao
+
+
+def nome_sombra(base: str, troca: str) -> str:
+    if troca == TROCA_ALIAS:
+        return f"{base}_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    return base + SUFIXO_SOMBRA
+
+
+def _estado_indice(collection, nome: str) -> Optional[Dict]:
+    for idx in collection.list_search_indexes(nome):
+        return idx
+    return None
+
+
+def indice_pronto(collection, nome: str = INDEX_NAME) -> bool:
+    """Uma consulta só, sem esperar: o índice `nome` está READY e aceitando consultas?"""
+    idx = _estado_indice(collection, nome)
+    return bool(idx and idx.get("queryable") and idx.get("status") == "READY")
+
+
+def aguardar_indice(collection, nome: str = INDEX_NAME, timeout: float = TIMEOUT_INDICE,
+                    intervalo: float = INTERVALO_CONSULTA_INDICE):
+    """
+    Consulta list_search_indexes até o índice `nome` estar READY e aceitando consultas
+    (`queryable`). Falha se o Atlas marcar o índice como FAILED ou se o tempo esgotar.
+    """
+    limite = time.monotonic() + timeout
+    ultimo_status = None
+    while True:
+        idx = _estado_indice(collection, nome)
+        status = idx.get("status") if idx else "DOES_NOT_EXIST"
+        if status != ultimo_status:
+            logger.info(f"   ⏳ Índice '{nome}' em '{collection.name}': {status}")
+            ultimo_status = status
+        if idx and idx.get("queryable") and status == "READY":
+            return
+        if status == "FAILED":
+            raise RuntimeError(f"O Atlas não conseguiu construir o índice '{nome}' em '{collection.name}'")
+        if time.monotonic() >= limite:
+            raise TimeoutError(f"Índice '{nome}' em '{collection.name}' não ficou pronto em {timeout:.0f}s "
+                               f"(último status: {status})")
+        time.sleep(intervalo)
+
+
+def aguardar_remocao_indice(collection, nome: str = INDEX_NAME, timeout: float = TIMEOUT_INDICE,
+                            intervalo: float = INTERVALO_CONSULTA_INDICE):
+    """Consulta list_search_indexes até o índice `nome` sumir (o drop no Atlas é assíncrono)."""
+    limite = time.monotonic() + timeout
+    while _estado_indice(collection, nome) is not None:
+        if time.monotonic() >= limite:
+            raise TimeoutError(f"Índice '{nome}' em '{collection.name}' não foi removido em {timeout:.0f}s")
+        time.sleep(intervalo)
+
+
+def criar_indice_vetorial_e_aguardar(collection, perfil: PerfilEmbedding, timeout: float = TIMEOUT_INDICE):
+    collection.create_search_index(model=perfil.modelo_indice())
+    logger.info(f"   🧭 Índice vetorial '{perfil.indice}' solicitado em '{collection.name}' ({perfil}).")
+    aguardar_indice(collection, perfil.indice, timeout)
+
+
+def trocar_por_renomeacao(db, sombra: str, destino: str, perfil: PerfilEmbedding, timeout: float = TIMEOUT_INDICE):
+    """
+    renameCollection com dropTarget: a troca é atômica para os leitores (o nome `destino` sempre
+    existe). Se o índice vetorial não acompanhar a coleção renomeada, ele é recriado e a busca
+    lexical atende até ficar pronto.
+    """
+    db.client.admin.command("renameCollection", f"{db.name}.{sombra}", to=f"{db.name}.{destino}", dropTarget=True)
+    logger.info(f"   🔀 '{sombra}' renomeada para '{destino}'.")
+    if _estado_indice(db[destino], perfil.indice) is None:
+        logger.warning(f"⚠️ O índice vetorial não acompanhou a renomeação; recriando em '{destino}' "
+                       f"(só a busca lexical atende até ele ficar pronto; --troca alias evita isso).")
+        criar_indice_vetorial_e_aguardar(db[destino], perfil, timeout)
+
+
+def trocar_por_alias(db, col_meta, sombra: str, padrao: str) -> str:
+    """
+    Aponta o alias para `sombra` (um único update_one) e devolve o nome da coleção anterior, que
+    fica no banco: leitores que já a abriram (ou que usam o nome fixo `padrao`) continuam atendidos.
+    Só a geração de antes dela, que ninguém mais lê desde a troca passada, é removida aqui.
+    """
+    alias = col_meta.find_one({"_id": ID_ALIAS}) or {}
+    anterior = alias.get("colecao") or padrao
+    col_meta.update_one(
+        {"_id": ID_ALIAS},
+        {"$set": {"colecao": sombra, "anterior": anterior, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    logger.info(f"   🔀 Alias '{ID_ALIAS}' agora aponta para '{sombra}' (antes: '{anterior}', mantida).")
+    antiga = alias.get("anterior")
+    if antiga and antiga not in (padrao, anterior, sombra):
+        db.drop_collection(antiga)
+        logger.info(f"   🗑️  Coleção '{antiga}', de duas trocas atrás, removida.")
+    return anterior
+
+
+def remover_anterior(db, col_meta) -> Optional[str]:
+    """
+    Remove a coleção que o alias guardou como anterior (inclusive o nome fixo, se era ele) e
+    esquece a referência. Devolve o nome removido, ou None se não havia nada para remover.
+    """
+    alias = col_meta.find_one({"_id": ID_ALIAS}) or {}
+    anterior = alias.get("anterior")
+    if not anterior or anterior == alias.get("colecao"):
+        return None
+    db.drop_collection(anterior)
+    col_meta.update_one({"_id": ID_ALIAS}, {"$unset": {"anterior": ""}})
+    logger.info(f"   🗑️  Coleção anterior '{anterior}' removida.")
+    return anterior
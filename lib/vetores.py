@@ -0,0 +1,76 @@
+import math
+from typing import List, Union
+
+from bson.binary import Binary, BinaryVectorDtype, VECTOR_SUBTYPE
+
+# Formatos de armazenamento do vetor no MongoDB
+FORMATO_FLOAT32 = "float32"  # BSON binData vector float32: 4 bytes por dimensão
+FORMATO_INT8 = "int8"        # BSON binData vector int8 (quantização escalar): 1 byte por dimensão
+FORMATO_LISTA = "lista"      # Array de doubles (formato antigo): ~14 bytes por dimensão em BSON
+FORMATOS = (FORMATO_FLOAT32, FORMATO_INT8, FORMATO_LISTA)
+
+Vetor = Union[List[float], Binary]
+
+
+def normalizar(vetor: List[float]) -> List[float]:
+    """Vetor com norma 1 (a similaridade de cosseno não muda; o produto escalar passa a ser o cosseno)."""
+    norma = math.sqrt(math.fsum(v * v for v in vetor))
+    if norma == 0:
+        return list(vetor)
+    return [v / norma for v in vetor]
+
+
+def ajustar_dimensao(vetor: List[float], dimensao: int) -> List[float]:
+    """
+    Trunca o vetor para `dimensao` e renormaliza.
+
+    O gemini-embedding-001 é treinado com Matryoshka: as primeiras N posições de um vetor maior
+    equivalem ao vetor gerado direto com output_dimensionality=N, depois de renormalizadas.
+    """
+    if len(vetor) < dimensao:
+        raise ValueError(f"Vetor com {len(vetor)} dimensões não pode ser ampliado para {dimensao}")
+    return normalizar(vetor[:dimensao])
+
+
+def eh_int8(valor) -> bool:
+    # O primeiro byte do binData vector identifica o tipo; evita decodificar o vetor inteiro
+    return (isinstance(valor, Binary) and valor.subtype == VECTOR_SUBTYPE
+            and valor[:1] == BinaryVectorDtype.INT8.value)
+
+
+def decodificar(valor: Vetor) -> List[float]:
+    """Lista de floats a partir de qualquer formato gravado (array, binData float32 ou int8)."""
+    if isinstance(valor, Binary):
+        vetor = valor.as_vector()
+        if vetor.dtype == BinaryVectorDtype.INT8:
+            return normalizar([v / 127 for v in vetor.data])
+        return list(vetor.data)
+    return list(valor)
+
+
+def dimensao_de(valor: Vetor) -> int:
+    if isinstance(valor, Binary):
+        # 2 bytes de cabeçalho (tipo + padding) e 1 ou 4 bytes por dimensão
+        return (len(valor) - 2) // (1 if eh_int8(valor) else 4)
+    return len(valor)
+
+
+def quantizar_int8(vetor: List[float]) -> List[int]:
+    """Quantização escalar por vetor: o maior componente em módulo vira ±127 (o cosseno é preservado)."""
+    maximo = max((abs(v) for v in vetor), default=0) or 1.0
+    return [max(-127, min(127, round(v * 127 / maximo))) for v in vetor]
+
+
+def codificar(vetor: Vetor, formato: str) -> Vetor:
+    """Converte o vetor para o formato de armazenamento pedido (reaproveita o binData se já estiver nele)."""
+    if formato == FORMATO_FLOAT32:
+        if isinstance(vetor, Binary) and not eh_int8(vetor):
+            return vetor
+        return Binary.from_vector(decodificar(vetor), BinaryVectorDtype.FLOAT32)
+    if formato == FORMATO_INT8:
+        if eh_int8(vetor):
+            return vetor
+        return Binary.from_vector(quantizar_int8(decodificar(vetor)), BinaryVectorDtype.INT8)
+    if formato == FORMATO_LISTA:
+        return decodificar(vetor)
+    raise ValueError(f"Formato de vetor desconhecido: {formato} (use {', '.join(FORMATOS)})")
@@ -1,14 +1,34 @@
 """
 Script para limpar todos os dados do banco MongoDB e
-recriar o índice vetorial configurado para embeddings de 768 dimensões.
+recriar o índice vetorial conforme o perfil de embedding configurado (lib/perfil_embedding.py).
+
+Com --reconstruir, não apaga nada: copia as FAQs para uma coleção nova (sombra) já no perfil
+configurado, cria os índices dela, espera o índice vetorial aceitar consultas e só então troca
+a coleção ativa (alias ou renameCollection). O chatbot não fica sem dados em nenhum momento.
+
+A limpeza e a reconstrução seguram um lease exclusivo em sync_metadata (lib/coordenacao.py):
+sincronizações e backfills novos recusam começar, e os que já estão rodando terminam antes.
 """
 
 import os
-import time
+import argparse
 import logging
+from typing import Dict
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from pymongo.operations import SearchIndexModel
+
+from lib.coordenacao import CHAVE_MANUTENCAO, PREFIXO_LEASE, manutencao_exclusiva
+from lib.perfil_embedding import ID_PERFIL_ATIVO, PerfilEmbedding, carregar_perfil, dimensao_do_indice
+from lib.migracao_embedding import ID_MIGRACAO
+from lib.recuperacao import garantir_indice_texto
+from lib.indice_lexical import COL_INDICE_LEXICAL
+from lib.orcamento_embedding import COL_BACKLOG, BacklogEmbeddings
+from lib.repositorio_embeddings import (COL_EMBEDDINGS, RepositorioEmbeddings, gerar_hash_conteudo,
+                                       texto_para_embedding)
+from lib.troca_colecao import (ID_ALIAS, TIMEOUT_INDICE, TROCA_ALIAS, TROCAS, aguardar_remocao_indice,
+                               colecao_ativa, criar_indice_vetorial_e_aguardar, nome_sombra, remover_anterior,
+                               trocar_por_alias, trocar_por_renomeacao)
+from lib.vetores import decodificar, dimensao_de, eh_int8
 
 # ============================================================================
 # CONFIGURAÇÕES
@@ -29,98 +49,207 @@ if not URI_MONGO:
 DB_NAME = "ministerio_saude"
 COL_DADOS = "faq_medicamentos"
 COL_META = "sync_metadata"
+DOCS_POR_LOTE_COPIA = 1000
 
-INDEX_NAME = "vector_index"
-EMBEDDING_DIMENSION = 768
 
+def ler_argumentos(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Limpa o banco ou reconstrói a coleção de FAQs sem indisponibilidade.")
+    parser.add_argument("--reconstruir", action="store_true",
+                        help="Blue/green: copia as FAQs para uma coleção nova no perfil atual, indexa e troca a ativa")
+    parser.add_argument("--troca", choices=TROCAS, default=TROCA_ALIAS,
+                        help="Como trocar a coleção ativa: alias (documento em sync_metadata que os scripts consultam, "
+                             "padrão: o índice vetorial já pronto vai junto) ou renomear (renameCollection sobre o nome "
+                             "fixo; se o Atlas não levar o índice vetorial, a busca semântica para até ele ser recriado)")
+    parser.add_argument("--remover-anterior", action="store_true",
+                        help="Remove a coleção que ficou de reserva na última troca por alias (faça depois que "
+                             "os leitores do nome antigo tiverem migrado)")
+    parser.add_argument("--timeout-indice", type=float, default=TIMEOUT_INDICE,
+                        help=f"Segundos esperando o Atlas construir ou remover o índice vetorial (padrão: {TIMEOUT_INDICE:.0f})")
+    return parser.parse_args(argv)
 
-def limpar_dados(db):
-    """Remove todos os documentos das coleções de dados e metadados."""
-    col_dados = db[COL_DADOS]
+
+def limpar_dados(db, nome_dados: str):
+    """
+    Remove todos os documentos das coleções de dados e metadados, menos o alias da coleção ativa
+    e o lease desta limpeza. O perfil gravado por uma migração também sai: depois da limpeza, vale
+    o perfil do .env. O índice lexical e o backlog de embeddings (que apontariam para FAQs que não
+    existem mais) são esvaziados junto; a próxima sincronização os preenche de novo.
+    """
+    col_dados = db[nome_dados]
     col_meta = db[COL_META]
 
     resultado_dados = col_dados.delete_many({})
-    resultado_meta = col_meta.delete_many({})
+    resultado_meta = col_meta.delete_many({"_id": {"$nin": [ID_ALIAS, PREFIXO_LEASE + CHAVE_MANUTENCAO]}})
+    db[COL_INDICE_LEXICAL].delete_many({})
+    db[COL_BACKLOG].delete_many({})
 
-    logger.info(f"🗑️  Documentos removidos de '{COL_DADOS}': {resultado_dados.deleted_count}")
+    logger.info(f"🗑️  Documentos removidos de '{nome_dados}': {resultado_dados.deleted_count}")
     logger.info(f"🗑️  Documentos removidos de '{COL_META}': {resultado_meta.deleted_count}")
 
 
-def recriar_indice_vetorial(collection):
-    """Remove o índice vetorial existente e recria com 768 dimensões."""
+def recriar_indice_vetorial(collection, perfil: PerfilEmbedding, timeout: float = TIMEOUT_INDICE):
+    """Remove o índice vetorial existente e recria com a dimensão do perfil de embedding."""
 
     # 1. Verificar e remover índice existente
-    existing_indexes = list(collection.list_search_indexes())
-    for idx in existing_indexes:
-        nome = idx.get("name")
-        if nome == INDEX_NAME:
-            # Checar dimensão atual
-            fields = idx.get("latestDefinition", {}).get("fields", [])
-            dim_atual = None
-            for f in fields:
-                if f.get("path") == "embedding" and f.get("type") == "vector":
-                    dim_atual = f.get("numDimensions")
-
-            if dim_atual == EMBEDDING_DIMENSION:
-                logger.info(f"✅ Índice '{INDEX_NAME}' já existe com {EMBEDDING_DIMENSION} dimensões. Nada a fazer.")
-                return
-            else:
-                logger.info(f"⚠️  Índice '{INDEX_NAME}' encontrado com {dim_atual} dimensões. Removendo...")
-                collection.drop_search_index(INDEX_NAME)
-                logger.info(f"🗑️  Índice '{INDEX_NAME}' removido.")
-                # Aguardar o Atlas processar a remoção
-                logger.info("⏳ Aguardando Atlas processar a remoção do índice...")
-                time.sleep(10)
-                break
-
-    # 2. Criar novo índice com 768 dimensões
-    search_index_model = SearchIndexModel(
-        definition={
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "embedding",
-                    "numDimensions": EMBEDDING_DIMENSION,
-                    "similarity": "cosine"
-                },
-                {
-                    "type": "filter",
-                    "path": "isActive"
-                },
-                {
-                    "type": "filter",
-                    "path": "category"
-                }
-            ]
-        },
-        name=INDEX_NAME,
-        type="vectorSearch"
-    )
+    dim_atual = dimensao_do_indice(collection.list_search_indexes(), perfil.indice)
+    if dim_atual is not None:
+        if dim_atual == perfil.dimensao:
+            logger.info(f"✅ Índice '{perfil.indice}' já existe com {perfil.dimensao} dimensões. Nada a fazer.")
+            return
+        else:
+            logger.info(f"⚠️  Índice '{perfil.indice}' encontrado com {dim_atual} dimensões. Removendo...")
+            collection.drop_search_index(perfil.indice)
+            logger.info(f"🗑️  Índice '{perfil.indice}' removido.")
+            # A remoção no Atlas é assíncrona: consulta até o índice sumir
+            logger.info("⏳ Aguardando Atlas processar a remoção do índice...")
+            aguardar_remocao_indice(collection, perfil.indice, timeout)
 
+    # 2. Criar novo índice com a definição gerada pelo perfil
     try:
-        collection.create_search_index(model=search_index_model)
-        logger.info(f"✅ Índice vetorial '{INDEX_NAME}' criado com {EMBEDDING_DIMENSION} dimensões (cosine).")
+        collection.create_search_index(model=perfil.modelo_indice())
+        logger.info(f"✅ Índice vetorial '{perfil.indice}' criado ({perfil}, {perfil.similaridade}).")
     except Exception as e:
         logger.error(f"❌ Falha ao criar índice vetorial: {e}")
 
 
-def main():
+# ============================================================================
+# RECONSTRUÇÃO BLUE/GREEN
+# ============================================================================
+
+def vetor_no_perfil(valor, perfil: PerfilEmbedding):
+    """Vetor gravado em outra dimensão/formato convertido para o perfil, quando dá para aproveitar."""
+    if valor is None:
+        return None
+    dimensao = dimensao_de(valor)
+    if dimensao == perfil.dimensao:
+        return perfil.codificar(valor)
+    if dimensao > perfil.dimensao and not eh_int8(valor):
+        return perfil.codificar(perfil.ajustar(decodificar(valor)))
+    return None
+
+
+def copiar_para_sombra(origem, sombra, vetores: Dict, perfil: PerfilEmbedding, backlog: BacklogEmbeddings,
+                       campo_origem: str) -> Dict[str, int]:
+    """
+    Copia as FAQs (com os mesmos _id) gravando o embedding no perfil atual: do armazém de vetores,
+    ou convertido do que estava em `campo_origem`. As que ficam sem vetor entram no backlog de embeddings.
+    """
+    estatisticas = {"copiados": 0, "com_embedding": 0, "para_backlog": 0}
+    lote, pendentes = [], []
+
+    def gravar():
+        if lote:
+            sombra.insert_many(lote, ordered=False)
+            estatisticas["copiados"] += len(lote)
+        backlog.enfileirar(pendentes)
+        estatisticas["para_backlog"] += len(pendentes)
+        lote.clear()
+        pendentes.clear()
+
+    for doc in origem.find({}).sort("_id", 1):
+        content_hash = doc.get("content_hash") or gerar_hash_conteudo(doc["question"], doc["answer"])
+        doc["content_hash"] = content_hash
+        vetor = vetores.get(content_hash)
+        antigo = doc.pop(campo_origem, None)
+        doc[perfil.campo] = perfil.codificar(vetor) if vetor is not None else vetor_no_perfil(antigo, perfil)
+        if doc[perfil.campo] is not None:
+            estatisticas["com_embedding"] += 1
+        elif doc.get("isActive", True):
+            pendentes.append({"content_hash": content_hash, "texto": texto_para_embedding(doc["question"], doc["answer"]),
+                              "file_id": doc.get("file_id"), "category": doc.get("category", "")})
+        lote.append(doc)
+        if len(lote) >= DOCS_POR_LOTE_COPIA:
+            gravar()
+    gravar()
+    return estatisticas
+
+
+def reconstruir(db, perfil: PerfilEmbedding, troca: str, timeout: float):
+    """Reconstrói a coleção ativa no `perfil` (o do .env) e troca sem indisponibilidade."""
+    col_meta = db[COL_META]
+    ativa = colecao_ativa(col_meta, COL_DADOS)
+    perfil_atual = carregar_perfil(col_meta)
+    nome = nome_sombra(COL_DADOS, troca)
+    db.drop_collection(nome)  # Sobra de uma reconstrução interrompida
+    db.create_collection(nome)
+    sombra = db[nome]
+
+    logger.info(f"Etapa 1/4 — Preparando os vetores do perfil {perfil}...")
+    repositorio = RepositorioEmbeddings(db[COL_EMBEDDINGS], perfil.modelo, perfil.dimensao)
+    repositorio.garantir_indice()
+    repositorio.semear_de(db[ativa], perfil_atual.campo)
+    vetores = repositorio.carregar_todos()
+
+    logger.info(f"Etapa 2/4 — Copiando '{ativa}' para '{nome}'...")
+    backlog = BacklogEmbeddings(db[COL_BACKLOG], perfil.modelo, perfil.dimensao)
+    backlog.garantir_indice()
+    estatisticas = copiar_para_sombra(db[ativa], sombra, vetores, perfil, backlog, perfil_atual.campo)
+    logger.info(f"   📦 {estatisticas['copiados']} FAQs copiadas, {estatisticas['com_embedding']} com embedding, "
+                f"{estatisticas['para_backlog']} no backlog de embeddings.")
+
+    logger.info("Etapa 3/4 — Criando os índices da nova coleção e aguardando o Atlas...")
+    garantir_indice_texto(sombra)
+    criar_indice_vetorial_e_aguardar(sombra, perfil, timeout)
+
+    logger.info(f"Etapa 4/4 — Trocando a coleção ativa ({troca})...")
+    if troca == TROCA_ALIAS:
+        trocar_por_alias(db, col_meta, nome, COL_DADOS)
+    else:
+        trocar_por_renomeacao(db, nome, COL_DADOS, perfil, timeout)
+    # A coleção nova segue o perfil do .env, e não o gravado (ou em andamento) por uma migração
+    col_meta.delete_many({"_id": {"$in": [ID_PERFIL_ATIVO, ID_MIGRACAO]}})
+    if troca != TROCA_ALIAS and ativa != COL_DADOS:
+        # Vinha do modo alias: o nome fixo volta a ser a coleção ativa
+        alias = col_meta.find_one_and_delete({"_id": ID_ALIAS}) or {}
+        for nome_antigo in {ativa, alias.get("anterior")} - {None, COL_DADOS}:
+            db.drop_collection(nome_antigo)
+
+
+def main(argv=None):
+    args = ler_argumentos(argv)
     client = MongoClient(URI_MONGO)
     try:
         db = client[DB_NAME]
-        col_dados = db[COL_DADOS]
+        perfil = carregar_perfil()
+
+        if args.remover_anterior and not args.reconstruir:
+            with manutencao_exclusiva(db[COL_META]):
+                if remover_anterior(db, db[COL_META]) is None:
+                    logger.info("ℹ️  Nenhuma coleção anterior guardada pelo alias; nada a remover.")
+            return
+
+        if args.reconstruir:
+            print("\n" + "═" * 60)
+            print("🔁 RECONSTRUÇÃO BLUE/GREEN DA COLEÇÃO DE FAQS")
+            print("═" * 60)
+            with manutencao_exclusiva(db[COL_META]):
+                if args.remover_anterior:
+                    remover_anterior(db, db[COL_META])
+                reconstruir(db, perfil, args.troca, args.timeout_indice)
+            print("═" * 60)
+            logger.info("✅ Reconstrução concluída; a nova coleção já está ativa.")
+            print("═" * 60 + "\n")
+            return
 
         print("\n" + "═" * 60)
         print("🧹 LIMPEZA DO BANCO E RECONFIGURAÇÃO DO ÍNDICE VETORIAL")
         print("═" * 60)
 
-        # Passo 1: Limpar dados
-        logger.info("Etapa 1/2 — Limpando dados...")
-        limpar_dados(db)
+        with manutencao_exclusiva(db[COL_META]):
+            col_dados = db[colecao_ativa(db[COL_META], COL_DADOS)]
+            perfil_atual = carregar_perfil(db[COL_META])
+
+            # Passo 1: Limpar dados
+            logger.info("Etapa 1/2 — Limpando dados...")
+            limpar_dados(db, col_dados.name)
+            if (perfil_atual.indice != perfil.indice
+                    and dimensao_do_indice(col_dados.list_search_indexes(), perfil_atual.indice) is not None):
+                # Índice de uma migração anterior (outro campo): o perfil do .env usa o índice padrão
+                col_dados.drop_search_index(perfil_atual.indice)
 
-        # Passo 2: Recriar índice vetorial (768 dims)
-        logger.info("Etapa 2/2 — Verificando/recriando índice vetorial...")
-        recriar_indice_vetorial(col_dados)
+            # Passo 2: Recriar índice vetorial (dimensão do perfil de embedding)
+            logger.info("Etapa 2/2 — Verificando/recriando índice vetorial...")
+            recriar_indice_vetorial(col_dados, perfil, args.timeout_indice)
 
         print("═" * 60)
         logger.info("✅ Limpeza concluída com sucesso!")
@@ -2,21 +2,26 @@ import os
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+from lib.perfil_embedding import carregar_perfil
+from lib.troca_colecao import colecao_ativa
+
 load_dotenv()
 
 URI_MONGO = os.getenv("MONGODB_URI")
 DB_NAME = "ministerio_saude"
 COL_DADOS = "faq_medicamentos"
+COL_META = "sync_metadata"
 
 def main():
     client = MongoClient(URI_MONGO)
     
     try:
         db = client[DB_NAME]
-        col_dados = db[COL_DADOS]
+        col_dados = db[colecao_ativa(db[COL_META], COL_DADOS)]
+        campo = carregar_perfil(db[COL_META]).campo
         
         total_docs = col_dados.count_documents({})
-        docs_com_embedding = col_dados.count_documents({"embedding": {"$ne": None}})
+        docs_com_embedding = col_dados.count_documents({campo: {"$ne": None}})
         
         print("\n" + "═"*60)
         print("🧹 LIMPEZA DE EMBEDDINGS")
@@ -36,7 +41,7 @@ def main():
         
         resultado = col_dados.update_many(
             {},
-            {"$unset": {"embedding": ""}}
+            {"$unset": {campo: ""}}
         )
         
         print(f"\n✅ {resultado.modified_count} embeddings removidos com sucesso!")
@@ -1,16 +1,16 @@
 import os
-import re
 import io
 import json
-from datetime import datetime, timezone
 from dotenv import load_dotenv
-from docx import Document
 
 # Bibliotecas do Google API
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 
+from lib.drive_listagem import listar_pasta_recursiva
+from lib.parser_faq import extrair_faqs_docx
+
 load_dotenv()
 
 # ============================================================================
@@ -29,30 +29,11 @@ def get_drive_service():
         FILE_CREDENTIALS, scopes=SCOPES)
     return build('drive', 'v3', credentials=creds)
 
-def extrair_metadados(texto_bloco):
-    tags = []
-    fonte = ""
-    
-    fonte_match = re.search(r'(?:FONTE:|Ref:|\(Ref:)\s*([^)\n\t]+)', texto_bloco, re.IGNORECASE)
-    if fonte_match:
-        fonte = fonte_match.group(1).strip().rstrip('.)').lower()
-
-    tags_match = re.search(r'TAGS:\s*(.+?)(?=\s*P:|\s*PERGUNTA:|$|\n)', texto_bloco, re.IGNORECASE)
-    if tags_match:
-        conteudo_tags = tags_match.group(1).strip().lower()
-        conteudo_tags = conteudo_tags.replace('#', ' ')
-        lista_bruta = [t.strip() for t in re.split(r'[,\s\t]+', conteudo_tags) if t.strip()]
-        tags = [t for t in lista_bruta if t not in ["p:", "r:", "pergunta:", "resposta:", "fonte:", "ref:"]]
-    
-    return tags, fonte
-
 def processar_faqs_drive():
     service = get_drive_service()
     total_geral = 0
 
-    query = f"'{ID_PASTA_DRIVE}' in parents and name contains '.docx' and mimeType = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'"
-    results = service.files().list(q=query, fields="files(id, name)").execute()
-    arquivos = results.get('files', [])
+    arquivos = listar_pasta_recursiva(get_drive_service, ID_PASTA_DRIVE)['arquivos']
 
     if not arquivos:
         print("⚠️ Nenhum arquivo encontrado na pasta do Drive.")
@@ -73,58 +54,26 @@ def processar_faqs_drive():
         while not done:
             status, done = downloader.next_chunk()
 
-        fh.seek(0)
-        doc = Document(fh)
-        
-        itens_no_documento = 0
-        categoria_atual = nome_arquivo.replace("FAQ", "").replace(".docx", "").strip().lower()
-        paragrafos = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-        pergunta_pendente = ""
-        
-        for i, linha in enumerate(paragrafos):
-            assunto_match = re.search(r'\[ASSUNTO:\s*(.+?)\]', linha, re.IGNORECASE)
-            if assunto_match: 
-                categoria_atual = assunto_match.group(1).strip().lower()
-                if re.fullmatch(r'(\d+\.\s*)?\[ASSUNTO:.*?\]', linha, re.IGNORECASE):
-                    continue
-
-            pergunta, resposta = None, None
-
-            # Caso A: P e R na mesma linha
-            if re.search(r'\b(P|PERGUNTA):\s*', linha, re.IGNORECASE) and re.search(r'\b(R|RESPOSTA):\s*', linha, re.IGNORECASE):
-                partes = re.split(r'\s*\b(R|RESPOSTA):\s*', linha, flags=re.IGNORECASE)
-                pergunta = re.sub(r'(\d+\.\s*)?\b(P|PERGUNTA):\s*', '', partes[0], flags=re.IGNORECASE).strip().lower()
-                resposta_bruta = partes[2].strip().lower()
-                resposta = re.split(r'tags:|fonte:|ref:|\(ref:', resposta_bruta, flags=re.IGNORECASE)[0].strip()
-
-            # Caso B: Linhas separadas
-            elif re.search(r'^(\d+\.\s*)?\b(P|PERGUNTA):\s*', linha, re.IGNORECASE):
-                pergunta_pendente = re.sub(r'^(\d+\.\s*)?\b(P|PERGUNTA):\s*', '', linha, flags=re.IGNORECASE).strip().lower()
-                continue
-
-            elif re.search(r'^\b(R|RESPOSTA):\s*', linha, re.IGNORECASE) and pergunta_pendente:
-                pergunta = pergunta_pendente
-                resposta_bruta = re.sub(r'^\b(R|RESPOSTA):\s*', '', linha, flags=re.IGNORECASE).strip().lower()
-                resposta = re.split(r'tags:|fonte:|ref:|\(ref:', resposta_bruta, flags=re.IGNORECASE)[0].strip()
-                pergunta_pendente = ""
-
-            if pergunta and resposta:
-                bloco_contexto = " ".join(paragrafos[max(0, i-1):min(len(paragrafos), i+2)])
-                tags, fonte = extrair_metadados(bloco_contexto)
-
-                # --- MODO TESTE: APENAS PRINT ---
-                documento_simulado = {
-                    "question": pergunta,
-                    "answer": resposta,
-                    "tags": tags,
-                    "source": fonte,
-                    "category": categoria_atual
-                }
-                print(f"  ✅ Item extraído: {json.dumps(documento_simulado, ensure_ascii=False)}")
-                
-                itens_no_documento += 1
-                total_geral += 1
-        
+        # Mesmo parser usado pelo enviar_dados.py: o que aparece aqui é exatamente o que seria enviado
+        resultado = extrair_faqs_docx(fh.getvalue(), nome_arquivo)
+
+        for faq in resultado.faqs:
+            # --- MODO TESTE: APENAS PRINT ---
+            documento_simulado = {
+                "question": faq.pergunta,
+                "answer": faq.resposta,
+                "tags": faq.tags,
+                "source": faq.fonte,
+                "category": faq.categoria,
+                "line_reference": faq.linha
+            }
+            print(f"  ✅ Item extraído: {json.dumps(documento_simulado, ensure_ascii=False)}")
+
+        for aviso in resultado.avisos:
+            print(f"  ⚠️ Linha {aviso.linha}: {aviso.mensagem}")
+
+        itens_no_documento = len(resultado.faqs)
+        total_geral += itens_no_documento
         print(f"  🏁 Fim do arquivo. Total processado aqui: {itens_no_documento}")
                 
     return total_geral
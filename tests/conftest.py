@@ -0,0 +1,5 @@
+import os
+
+# Os scripts da raiz validam o .env ao serem importados; os testes não abrem conexões
+os.environ.setdefault("MONGODB_URI", "mongodb://testes.invalid")
+os.environ.setdefault("ID_PASTA_DRIVE", "pasta-de-teste")
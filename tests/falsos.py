@@ -0,0 +1,77 @@
+"""Coleções de teste: mongomock com as poucas expressões do servidor que ele não implementa."""
+
+from datetime import datetime, timedelta
+
+import mongomock
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    """bulk_write do mongomock não aceita as operações do pymongo 4.9+ (argumento `sort`): aplica uma a uma."""
+    contagem = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": []}
+    for op in requests:
+        if isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+            contagem["nInserted"] += 1
+            continue
+        if isinstance(op, (DeleteOne, DeleteMany)):
+            apagar = self.delete_one if isinstance(op, DeleteOne) else self.delete_many
+            contagem["nRemoved"] += apagar(op._filter).deleted_count
+            continue
+        if isinstance(op, ReplaceOne):
+            resultado = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+        elif isinstance(op, UpdateOne):
+            resultado = self.update_one(op._filter, op._doc, upsert=op._upsert)
+        elif isinstance(op, UpdateMany):
+            resultado = self.update_many(op._filter, op._doc, upsert=op._upsert)
+        else:
+            raise TypeError(f"Operação não suportada nos testes: {op!r}")
+        contagem["nMatched"] += resultado.matched_count
+        contagem["nModified"] += resultado.modified_count
+        if resultado.upserted_id is not None:
+            contagem["nUpserted"] += 1
+    return BulkWriteResult(contagem, True)
+
+
+mongomock.collection.Collection.bulk_write = _bulk_write
+
+
+def _resolver(valor, agora: datetime):
+    """Troca $$NOW pelo relógio do teste e calcula {"$add": [data, ms]} (o mongomock só soma números)."""
+    if valor == "$$NOW":
+        return agora
+    if isinstance(valor, list):
+        return [_resolver(v, agora) for v in valor]
+    if isinstance(valor, dict):
+        resolvido = {k: _resolver(v, agora) for k, v in valor.items()}
+        if list(resolvido) == ["$add"] and isinstance(resolvido["$add"][0], datetime):
+            data, *somas = resolvido["$add"]
+            return data + timedelta(milliseconds=sum(somas))
+        return resolvido
+    return valor
+
+
+class ColecaoComRelogio:
+    """Coleção mongomock em que $$NOW é `agora` (avance o relógio para testar expiração de leases)."""
+
+    def __init__(self, colecao=None, agora: datetime = datetime(2026, 1, 1)):
+        self.colecao = colecao if colecao is not None else mongomock.MongoClient().db.sync_metadata
+        self.agora = agora
+
+    def avancar(self, segundos: float):
+        self.agora += timedelta(seconds=segundos)
+
+    def __getattr__(self, nome):
+        metodo = getattr(self.colecao, nome)
+        if not callable(metodo):
+            return metodo
+
+        def chamada(*args, **kwargs):
+            return metodo(*_resolver(list(args), self.agora), **_resolver(kwargs, self.agora))
+        return chamada
+
+
+def banco():
+    return mongomock.MongoClient().ministerio_saude
+
@@ -0,0 +1,89 @@
+from types import SimpleNamespace as NS
+
+import pytest
+
+errors = pytest.importorskip("google.genai.errors")
+
+import lib.agendador_embedding as agendador_embedding
+from lib.agendador_embedding import AgendadorEmbedding, BaldeTokens, eh_retentavel
+from tests.test_embedding import servico_falso
+
+
+def erro_api(codigo):
+    return errors.APIError(codigo, {"error": {"message": "falso", "status": "X"}})
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(agendador_embedding.time, "monotonic", relogio.monotonic)
+    monkeypatch.setattr(agendador_embedding.time, "sleep", relogio.sleep)
+    monkeypatch.setattr(agendador_embedding, "calcular_backoff", lambda tentativa: 0.5)
+    return relogio
+
+
+def servico_com_falhas(*falhas):
+    """Serviço que levanta cada erro de `falhas` em sequência e depois responde normalmente."""
+    servico = servico_falso(768)
+    pendentes = list(falhas)
+    original = servico.embed_content
+
+    def embed_content(textos):
+        servico.chamadas = getattr(servico, "chamadas", 0) + 1
+        if pendentes:
+            raise pendentes.pop(0)
+        return original(textos)
+
+    servico.embed_content = embed_content
+    return servico
+
+
+def test_balde_libera_a_capacidade_de_um_minuto_e_depois_espera(relogio):
+    balde = BaldeTokens(60)
+    for _ in range(60):
+        balde.consumir(1)
+    assert relogio.esperas == []
+    balde.consumir(2)
+    assert relogio.esperas == [pytest.approx(2.0)]
+
+
+def test_codigos_retentaveis():
+    assert eh_retentavel(erro_api(429)) and eh_retentavel(erro_api(503))
+    assert not eh_retentavel(erro_api(400)) and not eh_retentavel(ValueError())
+
+
+def test_nova_tentativa_apos_erro_transitorio(relogio):
+    servico = servico_com_falhas(erro_api(503), erro_api(500))
+    agendador = AgendadorEmbedding(servico, rpm=6000, tpm=10 ** 6, concorrencia=1)
+    assert agendador.gerar(["a"]) == [pytest.approx([0.6, 0.8])]
+    assert servico.chamadas == 3
+    assert relogio.esperas.count(0.5) == 2
+
+
+def test_erro_definitivo_nao_repete_e_deixa_o_lote_vazio(relogio):
+    servico = servico_com_falhas(erro_api(400))
+    agendador = AgendadorEmbedding(servico, rpm=6000, tpm=10 ** 6, concorrencia=1)
+    assert agendador.gerar(["a", "b"]) == [None, None]
+    assert servico.chamadas == 1 and not agendador.cota_esgotada
+
+
+def test_cota_esgotada_interrompe_as_proximas_requisicoes(relogio):
+    servico = servico_com_falhas(*[erro_api(429)] * 3)
+    agendador = AgendadorEmbedding(servico, rpm=6000, tpm=10 ** 6, concorrencia=1, max_tentativas=3)
+    assert agendador.gerar(["a"]) == [None]
+    assert agendador.cota_esgotada
+    assert agendador.gerar(["b"]) == [None]
+    assert servico.chamadas == 3
@@ -0,0 +1,78 @@
+from gerar_embeddings import Backfill, percorrer
+from lib.perfil_embedding import PerfilEmbedding
+from lib.repositorio_embeddings import RepositorioEmbeddings, gerar_hash_conteudo
+from lib.vetores import FORMATO_LISTA
+from tests.falsos import banco
+
+PERFIL = PerfilEmbedding(formato=FORMATO_LISTA)
+
+
+class AgendadorFalso:
+    def __init__(self):
+        self.cota_esgotada = False
+        self.gerados = []
+
+    def buscar_cache_local(self, textos):
+        return {}
+
+    def gerar(self, textos):
+        self.gerados.extend(textos)
+        return [[1.0, 0.0] for _ in textos]
+
+
+def preparar(n_docs: int, em_cache):
+    """`n_docs` FAQs sem vetor; as de índice em `em_cache` já têm o vetor no armazém."""
+    db = banco()
+    col = db["faq_medicamentos"]
+    col.insert_many([{"_id": i, "question": f"P{i}", "answer": f"R{i}", PERFIL.campo: None} for i in range(n_docs)])
+    repositorio = RepositorioEmbeddings(db["embedding_store"], PERFIL.modelo, PERFIL.dimensao)
+    repositorio.salvar({gerar_hash_conteudo(f"P{i}", f"R{i}"): [0.0, 1.0] for i in em_cache})
+    return col, repositorio
+
+
+def com_vetor(col):
+    return sorted(d["_id"] for d in col.find({PERFIL.campo: {"$ne": None}}))
+
+
+def test_limite_zero_so_reaproveita_os_caches():
+    col, repositorio = preparar(10, em_cache={2, 5, 9})
+    agendador = AgendadorFalso()
+    checkpoints = []
+    situacao = percorrer(Backfill(col, repositorio, agendador, PERFIL, limite=0), None, 4, checkpoints.append)
+
+    assert com_vetor(col) == [2, 5, 9]
+    assert agendador.gerados == []
+    assert checkpoints == []  # O documento 0 nunca foi concluído
+    assert situacao is not None
+
+
+def test_checkpoint_para_no_primeiro_sem_orcamento_e_os_do_cache_sao_gravados():
+    col, repositorio = preparar(6, em_cache={4})
+    backfill = Backfill(col, repositorio, AgendadorFalso(), PERFIL, limite=2)
+    docs = backfill.ler_lote(None, 10)
+
+    assert backfill.processar(docs) == 1
+    assert com_vetor(col) == [0, 1, 4]
+
+
+def test_varredura_completa_zera_o_checkpoint():
+    col, repositorio = preparar(5, em_cache=set())
+    checkpoints = []
+    situacao = percorrer(Backfill(col, repositorio, AgendadorFalso(), PERFIL, limite=100), None, 2,
+                         checkpoints.append)
+
+    assert situacao is None
+    assert checkpoints == [1, 3, 4, None]
+    assert com_vetor(col) == [0, 1, 2, 3, 4]
+
+
+def test_retoma_do_checkpoint_sem_repetir_chamadas():
+    col, repositorio = preparar(6, em_cache=set())
+    agendador = AgendadorFalso()
+    checkpoints = []
+    percorrer(Backfill(col, repositorio, agendador, PERFIL, limite=3), None, 2, checkpoints.append)
+    assert checkpoints == [1, 2]
+    percorrer(Backfill(col, repositorio, agendador, PERFIL, limite=3), checkpoints[-1], 2, checkpoints.append)
+
+    assert com_vetor(col) == list(range(6))
+    assert sorted(agendador.gerados) == sorted(f"P{i} R{i}" for i in range(6))
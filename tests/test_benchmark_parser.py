@@ -0,0 +1,49 @@
+import os
+import argparse
+import json
+
+import pytest
+
+pytest.importorskip("docx")
+
+import benchmark_parser
+from benchmark_parser import CAMINHO_BASELINE, MIX_PADRAO, comparar, gerar_docx, gerar_paragrafos, ler_mix
+from lib.parser_faq import extrair_faqs_docx
+
+
+def test_corpus_sintetico_e_deterministico_e_bate_com_a_baseline():
+    assert gerar_paragrafos(300, MIX_PADRAO, 7) == gerar_paragrafos(300, MIX_PADRAO, 7)
+    with open(os.path.join(os.path.dirname(benchmark_parser.__file__), CAMINHO_BASELINE), encoding="utf-8") as f:
+        baseline = json.load(f)
+    esperado = baseline["resultados"]["1000"]
+    resultado = extrair_faqs_docx(gerar_docx(1000, baseline["mix"]), "FAQ SINTETICO.docx")
+    assert (resultado.paragrafos, len(resultado.faqs)) == (esperado["paragrafos"], esperado["faqs"])
+
+
+def test_compara_velocidade_e_memoria_com_tolerancia():
+    base = {"1000": {"etapas": {"extrair_faqs": {"paragrafos_s": 1000.0, "pico_mb": 2.0}}}}
+
+    def atual(paragrafos_s, pico_mb):
+        return {"1000": {"etapas": {"extrair_faqs": {"paragrafos_s": paragrafos_s, "pico_mb": pico_mb}}}}
+
+    assert comparar(atual(800.0, 2.9), base, 0.25) == []
+    assert len(comparar(atual(700.0, 3.1), base, 0.25)) == 2
+    assert comparar(atual(1.0, 99.0), {}, 0.25) == []
+
+
+def test_mix_aceita_so_tipos_conhecidos():
+    assert ler_mix("mesma_linha=3, lista=1") == {"mesma_linha": 3, "lista": 1}
+    with pytest.raises(argparse.ArgumentTypeError):
+        ler_mix("tabela=1")
+
+
+def test_main_falha_quando_regride(tmp_path):
+    base = tmp_path / "baseline.json"
+    argumentos = ["--paragrafos", "200", "--repeticoes", "1", "--sem-python-docx", "--baseline", str(base)]
+    assert benchmark_parser.main(argumentos + ["--salvar-baseline"]) == 0
+    dados = json.loads(base.read_text(encoding="utf-8"))
+    for medida in dados["resultados"]["200"]["etapas"].values():
+        medida["paragrafos_s"] *= 1000
+    base.write_text(json.dumps(dados), encoding="utf-8")
+    assert benchmark_parser.main(argumentos) == 0
+    assert benchmark_parser.main(argumentos + ["--falhar-em-regressao"]) == 1
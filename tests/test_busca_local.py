@@ -0,0 +1,82 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lib.busca_local import IndiceLocal
+from lib.vetores import FORMATO_FLOAT32, FORMATO_INT8, codificar
+from tests.falsos import banco
+
+
+def metadados(n, categorias=("vacinas", "medicamentos")):
+    return [{"_id": str(i), "question": f"P{i}", "answer": f"R{i}", "category": categorias[i % len(categorias)],
+             "isActive": i % 5 != 0, "file_origin": "FAQ.docx", "line_reference": i} for i in range(n)]
+
+
+def agrupados(n, dimensao, grupos, semente=0):
+    """Vetores em torno de `grupos` centros, como FAQs de poucos assuntos."""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(grupos, dimensao))
+    return (centros[rng.integers(grupos, size=n)] + 0.3 * rng.normal(size=(n, dimensao))).astype(np.float32)
+
+
+def exato(matriz, consulta, k, mascara=None):
+    normalizada = matriz / np.linalg.norm(matriz, axis=1, keepdims=True)
+    scores = normalizada @ (consulta / np.linalg.norm(consulta))
+    if mascara is not None:
+        scores[~mascara] = -np.inf
+    return [str(i) for i in np.argsort(-scores, kind="stable")[:k]]
+
+
+def test_top_k_exato_igual_a_forca_bruta_com_e_sem_filtros():
+    matriz = agrupados(500, 32, 10)
+    indice = IndiceLocal(matriz.copy(), metadados(500))
+    consulta = matriz[7] + 0.1
+    assert [r.id for r in indice.buscar(consulta, k=10, somente_ativos=False)] == exato(matriz, consulta, 10)
+
+    ativos = np.array([i % 5 != 0 for i in range(500)])
+    vacinas = np.array([i % 2 == 0 for i in range(500)])
+    assert [r.id for r in indice.buscar(consulta, k=10)] == exato(matriz, consulta, 10, ativos)
+    assert [r.id for r in indice.buscar(consulta, k=10, categoria=" Vacinas ")] == \
+        exato(matriz, consulta, 10, ativos & vacinas)
+    # Filtro seletivo (caminho que copia só as linhas aprovadas) e k maior que o que sobra
+    raros = IndiceLocal(matriz.copy(), metadados(500, categorias=("rara",) + ("comum",) * 9))
+    rara = np.array([i % 10 == 0 for i in range(500)])
+    assert [r.id for r in raros.buscar(consulta, k=100, categoria="rara", somente_ativos=False)] == \
+        exato(matriz, consulta, 50, rara)
+
+
+def test_ivf_recupera_quase_tudo_que_a_busca_exata_encontra():
+    matriz = agrupados(4000, 64, 40, semente=1)
+    indice = IndiceLocal(matriz, metadados(4000))
+    indice.construir_ivf()
+    rng = np.random.default_rng(2)
+    acertos = total = 0
+    for posicao in rng.choice(4000, 50, replace=False):
+        consulta = matriz[posicao] + 0.05 * rng.normal(size=64).astype(np.float32)
+        esperados = {r.id for r in indice.buscar(consulta, k=10, somente_ativos=False)}
+        aproximados = {r.id for r in indice.buscar(consulta, k=10, somente_ativos=False, aproximado=True, n_sondas=8)}
+        acertos += len(esperados & aproximados)
+        total += len(esperados)
+    assert acertos / total >= 0.9
+    assert sum(len(lista) for lista in indice.ivf.listas) == 4000
+
+
+def test_carrega_do_mongo_em_qualquer_formato_e_salva_snapshot(tmp_path):
+    col = banco().faqs
+    col.insert_many([
+        {"question": "lista", "category": "a", "isActive": True, "embedding": [1.0, 0.0, 0.0]},
+        {"question": "float32", "category": "a", "isActive": True, "embedding": codificar([0.0, 1.0, 0.0], FORMATO_FLOAT32)},
+        {"question": "int8", "category": "a", "isActive": True, "embedding": codificar([0.0, 0.0, 1.0], FORMATO_INT8)},
+        {"question": "outra dimensão", "category": "a", "isActive": True, "embedding": [1.0, 0.0]},
+        {"question": "sem vetor", "category": "a", "isActive": True, "embedding": None},
+    ])
+    indice = IndiceLocal.do_mongo(col, 3)
+    assert len(indice) == 3
+    assert indice.buscar([0.0, 0.0, 2.0], k=1)[0].pergunta == "int8"
+
+    caminho = str(tmp_path / "faqs.npz")
+    indice.salvar_snapshot(caminho)
+    copia = IndiceLocal.do_snapshot(caminho)
+    assert [r.pergunta for r in copia.buscar([0.0, 1.0, 0.0], k=3)] == ["float32", "lista", "int8"]
+    with pytest.raises(ValueError):
+        copia.buscar([1.0, 0.0], k=1)
@@ -0,0 +1,62 @@
+import itertools
+
+import pytest
+
+import lib.cache_local as cache_local
+from lib.agendador_embedding import AgendadorEmbedding
+from lib.cache_local import CacheLocalEmbeddings
+from tests.falsos import banco
+from tests.test_embedding import servico_falso
+
+
+@pytest.fixture
+def caminho(tmp_path, monkeypatch):
+    relogio = itertools.count(1)
+    monkeypatch.setattr(cache_local.time, "time", lambda: float(next(relogio)))
+    return str(tmp_path / "cache" / "embeddings.sqlite")
+
+
+def test_vetores_persistem_por_modelo_e_dimensao(caminho):
+    cache = CacheLocalEmbeddings("modelo", 3, caminho)
+    cache.salvar({"dipirona": [0.5, 0.25, 0.125]})
+    cache.fechar()
+
+    assert CacheLocalEmbeddings("modelo", 3, caminho).buscar(["dipirona", "outro"]) == {"dipirona": [0.5, 0.25, 0.125]}
+    assert CacheLocalEmbeddings("modelo", 2, caminho).buscar(["dipirona"]) == {}
+    assert CacheLocalEmbeddings("outro-modelo", 3, caminho).buscar(["dipirona"]) == {}
+
+
+def test_remove_os_menos_usados_ao_passar_do_limite(caminho):
+    cache = CacheLocalEmbeddings("modelo", 3, caminho)
+    cache.tamanho_maximo = 30  # Dois vetores de 12 bytes cabem, três não
+    cache.salvar({"a": [1.0, 0.0, 0.0]})
+    cache.salvar({"b": [0.0, 1.0, 0.0]})
+    cache.buscar(["a"])  # "a" passa a ser o mais recente
+    cache.salvar({"c": [0.0, 0.0, 1.0]})
+    assert set(cache.buscar(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_aquecer_com_o_que_ja_esta_no_mongo(caminho):
+    db = banco()
+    db.embedding_store.insert_one({"content_hash": "h1", "model": "modelo", "dimensions": 2, "embedding": [0.6, 0.8]})
+    db.faqs.insert_many([
+        {"question": "P1", "answer": "R1", "content_hash": "h1", "embedding": [9.0, 9.0]},
+        {"question": "P2", "answer": "R2", "content_hash": "h2", "embedding": [3.0, 4.0, 12.0]},
+        {"question": "P3", "answer": "R3", "content_hash": "h3", "embedding": [1.0]},
+    ])
+    cache = CacheLocalEmbeddings("modelo", 2, caminho)
+    assert cache.aquecer(db.faqs, db.embedding_store) == 2
+    vetores = cache.buscar(["P1 R1", "P2 R2", "P3 R3"])
+    assert vetores == {"P1 R1": pytest.approx([0.6, 0.8]), "P2 R2": pytest.approx([0.6, 0.8])}
+
+
+def test_agendador_so_chama_a_api_para_o_que_falta(caminho):
+    cache = CacheLocalEmbeddings("modelo", 768, caminho)
+    cache.salvar({"conhecido": [1.0, 0.0]})
+    servico = servico_falso(768)
+    agendador = AgendadorEmbedding(servico, rpm=6000, tpm=10 ** 6, concorrencia=1, cache_local=cache)
+
+    assert agendador.gerar(["conhecido", "novo"]) == [[1.0, 0.0], pytest.approx([0.6, 0.8])]
+    assert servico._client.models.chamadas == 1
+    assert agendador.gerar(["novo"]) == [pytest.approx([0.6, 0.8])]
+    assert servico._client.models.chamadas == 1
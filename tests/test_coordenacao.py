@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+from lib.coordenacao import PREFIXO_ORCAMENTO, LeasesArquivos, OrcamentoCompartilhado
+from lib.orcamento_embedding import AlocadorOrcamento
+from tests.falsos import ColecaoComRelogio, banco
+
+
+def arquivo(file_id, modificado):
+    return {"id": file_id, "modifiedTime": modificado}
+
+
+def test_um_arquivo_por_trabalhador_ate_o_lease_expirar():
+    meta = ColecaoComRelogio()
+    a = LeasesArquivos(meta, "host-a:1", duracao=60)
+    b = LeasesArquivos(meta, "host-b:1", duracao=60)
+
+    assert a.reivindicar("f1")
+    assert a.reivindicar("f1")  # O próprio dono renova
+    assert not b.reivindicar("f1")
+    meta.avancar(59)
+    assert not b.reivindicar("f1")
+    meta.avancar(2)
+    assert b.reivindicar("f1")  # "a" morreu sem renovar
+    assert a.renovar() == 0 and b.renovar() == 1
+
+
+def test_renovacao_mantem_o_lease_de_quem_esta_vivo():
+    meta = ColecaoComRelogio()
+    a = LeasesArquivos(meta, "a", duracao=60)
+    b = LeasesArquivos(meta, "b", duracao=60)
+    assert a.reivindicar("f1")
+    for _ in range(3):
+        meta.avancar(40)
+        assert a.renovar() == 1
+        assert not b.reivindicar("f1")
+
+
+def test_versao_concluida_nao_e_reprocessada():
+    meta = ColecaoComRelogio()
+    a = LeasesArquivos(meta, "a")
+    b = LeasesArquivos(meta, "b")
+    assert a.reivindicar("f1", versao="v1") and a.reivindicar("f2", versao="v1")
+    a.liberar("f1", versao="v1")
+    a.liberar_todos()  # f2 falhou: volta para a fila sem marcar versão
+
+    assert not b.reivindicar("f1", versao="v1")
+    assert b.reivindicar("f2", versao="v1")
+    assert b.reivindicar("f1", versao="v2")  # O arquivo mudou depois
+    assert a.pendentes([arquivo("f1", "v1"), arquivo("f2", "v1"), arquivo("f3", "v1")]) == ["f2", "f3"]
+
+
+def test_sair_do_contexto_solta_os_leases():
+    meta = ColecaoComRelogio()
+    with LeasesArquivos(meta, "a", duracao=60) as a:
+        assert a.reivindicar("f1")
+    assert a.ativos == set()
+    assert LeasesArquivos(meta, "b").reivindicar("f1")
+
+
+def test_orcamento_da_rodada_nunca_passa_do_limite():
+    meta = banco().sync_metadata
+    a = OrcamentoCompartilhado(meta, "2026-01-01T03", 10)
+    b = OrcamentoCompartilhado(meta, "2026-01-01T03", 999)  # O primeiro trabalhador fixa o limite
+
+    assert a.reservar(6) == 6
+    assert b.reservar(6) == 4
+    assert a.reservar(1) == 0 and b.restante == 0
+    b.devolver(3)
+    assert a.restante == 3 and a.reservar(5) == 3
+    assert OrcamentoCompartilhado(meta, "2026-01-01T04", 10).restante == 10
+
+
+def test_contadores_antigos_sao_apagados():
+    meta = banco().sync_metadata
+    OrcamentoCompartilhado(meta, "atual", 10).reservar(1)
+    meta.insert_one({"_id": PREFIXO_ORCAMENTO + "velha", "usados": 5, "limite": 10,
+                     "criado_em": datetime.now(timezone.utc) - timedelta(days=30)})
+    OrcamentoCompartilhado(meta, "atual", 10).limpar_antigos()
+    assert [d["_id"] for d in meta.find()] == [PREFIXO_ORCAMENTO + "atual"]
+
+
+def test_alocador_de_cada_trabalhador_respeita_o_orcamento_da_rodada():
+    meta = banco().sync_metadata
+    alocadores = [AlocadorOrcamento(10, compartilhado=OrcamentoCompartilhado(meta, "r", 12)) for _ in range(2)]
+    for alocador in alocadores:
+        alocador.planejar([{"id": "f", "name": "FAQ.docx"}])
+    assert alocadores[0].reservar("f", 10) == 10
+    assert alocadores[1].restante == 2 and alocadores[1].reservar("f", 10) == 2
+    alocadores[0].devolver(4)
+    assert alocadores[1].consumir(10) == 4
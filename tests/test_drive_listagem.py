@@ -0,0 +1,75 @@
+import re
+import threading
+
+from lib.drive_listagem import MIME_DOCX, MIME_PASTA, eh_docx, listar_pasta_recursiva
+
+RE_PASTA = re.compile(r"'([^']+)' in parents")
+
+
+class _Execucao:
+    def __init__(self, resposta):
+        self.resposta = resposta
+
+    def execute(self):
+        return self.resposta
+
+
+class DriveFalso:
+    """files().list() sobre uma árvore em memória, com páginas de `por_pagina` itens."""
+
+    def __init__(self, arvore, por_pagina=2):
+        self.arvore = arvore
+        self.por_pagina = por_pagina
+        self.chamadas = []
+
+    def files(self):
+        return self
+
+    def list(self, q, pageSize, pageToken, fields):
+        id_pasta = RE_PASTA.search(q).group(1)
+        self.chamadas.append((id_pasta, pageToken))
+        inicio = int(pageToken or 0)
+        filhos = self.arvore.get(id_pasta, [])
+        resposta = {"files": [dict(f) for f in filhos[inicio:inicio + self.por_pagina]]}
+        if inicio + self.por_pagina < len(filhos):
+            resposta["nextPageToken"] = str(inicio + self.por_pagina)
+        return _Execucao(resposta)
+
+
+def pasta(file_id):
+    return {"id": file_id, "name": f"Pasta {file_id}", "mimeType": MIME_PASTA}
+
+
+def docx(file_id, nome=None):
+    return {"id": file_id, "name": nome or f"FAQ {file_id}.docx", "mimeType": MIME_DOCX,
+            "modifiedTime": "2026-01-01T00:00:00Z", "md5Checksum": file_id}
+
+
+ARVORE = {
+    "raiz": [docx("a"), docx("b"), pasta("sub"), docx("temp", "~$FAQ a.docx"), docx("c"), pasta("vazia")],
+    "sub": [docx("d"), pasta("neta"), {"id": "pdf", "name": "manual.pdf", "mimeType": "application/pdf"}],
+    "neta": [docx("e"), pasta("sub")],  # Atalho circular não é listado de novo
+}
+
+
+def test_percorre_todas_as_paginas_e_subpastas():
+    servicos = []
+    drive = DriveFalso(ARVORE)
+
+    def criar_servico():
+        servicos.append(threading.get_ident())
+        return drive
+
+    manifesto = listar_pasta_recursiva(criar_servico, "raiz", paralelos=3)
+
+    assert sorted((a["id"], a["pasta"]) for a in manifesto["arquivos"]) == [
+        ("a", "raiz"), ("b", "raiz"), ("c", "raiz"), ("d", "sub"), ("e", "neta")]
+    assert manifesto["pastas"] == {"raiz": "", "sub": "Pasta sub", "vazia": "Pasta vazia", "neta": "Pasta neta"}
+    assert sorted(p for p, _ in drive.chamadas) == ["neta", "raiz", "raiz", "raiz", "sub", "sub", "vazia"]
+    assert len(servicos) == len(set(servicos))  # Um serviço por thread
+
+
+def test_so_docx_de_verdade():
+    assert eh_docx(docx("a"))
+    assert not eh_docx({**docx("a"), "name": "FAQ.doc"})
+    assert not eh_docx({**docx("a"), "mimeType": MIME_PASTA})
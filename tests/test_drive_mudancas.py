@@ -0,0 +1,64 @@
+from lib.drive_listagem import MIME_PASTA
+from lib.drive_mudancas import desativar_arquivos_removidos, filtrar_conhecidos, listar_mudancas
+from tests.falsos import banco
+
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class _Execucao:
+    def __init__(self, resposta):
+        self.resposta = resposta
+
+    def execute(self):
+        return self.resposta
+
+
+class DriveFalso:
+    """changes().list() devolve as páginas na ordem; a última traz o newStartPageToken."""
+
+    def __init__(self, *paginas):
+        self.paginas = list(paginas)
+
+    def changes(self):
+        return self
+
+    def list(self, pageToken, **kwargs):
+        return _Execucao(self.paginas.pop(0))
+
+
+def docx(file_id, pai, **extra):
+    return {"fileId": file_id, "file": {"id": file_id, "name": f"{file_id}.docx", "mimeType": MIME_DOCX,
+                                        "modifiedTime": "2026-01-01T00:00:00Z", "parents": [pai], **extra}}
+
+
+def test_alterados_levam_a_pasta_e_a_ultima_mudanca_prevalece():
+    drive = DriveFalso({"changes": [docx("a", "sub"), docx("b", "raiz")], "nextPageToken": "2"},
+                       {"changes": [docx("a", "fora")], "newStartPageToken": "3"})
+    alterados, removidos, token, estrutura = listar_mudancas(drive, "1", "raiz", {"raiz", "sub"})
+
+    assert [(a["id"], a["pasta"]) for a in alterados] == [("b", "raiz")]
+    assert removidos == ["a"]
+    assert (token, estrutura) == ("3", False)
+
+
+def test_subpasta_que_entra_ou_sai_pede_listagem_completa():
+    pasta_nova = {"fileId": "p2", "file": {"id": "p2", "mimeType": MIME_PASTA, "parents": ["raiz"]}}
+    drive = DriveFalso({"changes": [pasta_nova], "newStartPageToken": "2"})
+    assert listar_mudancas(drive, "1", "raiz", {"raiz"})[3] is True
+
+    drive = DriveFalso({"changes": [{"fileId": "sub", "removed": True}], "newStartPageToken": "2"})
+    assert listar_mudancas(drive, "1", "raiz", {"raiz", "sub"})[3] is True
+
+
+def test_so_arquivos_ja_sincronizados_sao_desativados():
+    db = banco()
+    db["sync_metadata"].insert_many([{"file_id": "a"}, {"_id": "lease:b", "dono": "x"}])
+    db["faq"].insert_many([{"file_id": "a", "isActive": True}, {"file_id": "b", "isActive": True}])
+    drive = DriveFalso({"changes": [docx("a", "fora"), docx("b", "fora"), docx("qualquer", "outra"),
+                                    {"fileId": "apagado", "removed": True}], "newStartPageToken": "2"})
+    _, removidos, _, _ = listar_mudancas(drive, "1", "raiz", {"raiz"})
+
+    assert filtrar_conhecidos(db["sync_metadata"], removidos) == ["a"]
+    assert desativar_arquivos_removidos(db["faq"], db["sync_metadata"], ["a"]) == 1
+    assert db["faq"].count_documents({"isActive": True}) == 1
+    assert db["sync_metadata"].count_documents({"file_id": "a"}) == 0
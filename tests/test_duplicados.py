@@ -0,0 +1,58 @@
+import pytest
+
+import tests.falsos  # noqa: F401  (bulk_write com as operações do pymongo atual)
+import lib.reconciliacao as reconciliacao
+from enviar_dados import copiar_duplicados
+from lib.planejador import montar_plano
+from lib.reconciliacao import Reconciliador
+from tests.falsos import banco
+from tests.test_planejador import arquivo, ids, meta
+
+
+def test_copias_da_mesma_execucao_e_de_arquivos_ja_sincronizados():
+    metadados = {m["file_id"]: m for m in [meta("sinc", modificado="2026-01-02", md5="x"),
+                                           meta("muda", md5="y")]}
+    plano = montar_plano([
+        arquivo("sinc", md5="x"),
+        arquivo("novo1", md5="n"), arquivo("novo2", md5="n"),  # Duas cópias novas: a primeira vira a origem
+        arquivo("copia_sinc", md5="x"),                        # Cópia de um arquivo que não mudou
+        arquivo("muda", md5="y2"), arquivo("copia_muda", md5="y"),  # A origem mudou nesta execução
+    ], metadados)
+
+    assert ids(plano["pular"]) == ["sinc"]
+    assert sorted(ids(plano["reprocessar"])) == ["copia_muda", "muda", "novo1"]
+    assert sorted((d["arquivo"]["id"], d["origem"]) for d in plano["duplicados"]) == [
+        ("copia_sinc", "sinc"), ("novo2", "novo1")]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # O mongomock não avalia expressões ($in/$type) em projeções; a cópia vai para um file_id sem itens
+    monkeypatch.setattr(reconciliacao, "projecao_existentes",
+                        lambda campo: {"file_id": 1, "content_hash": 1, **{c: 1 for c in reconciliacao.CAMPOS_POSICAO}})
+    db = banco()
+    db.sync_metadata.insert_many([{"file_id": "origem", "md5_checksum": "m1"},
+                                  {"file_id": "mudou", "md5_checksum": "outro"}])
+    db.faqs.insert_many([
+        {"file_id": "origem", "file_origin": "FAQ.docx", "content_hash": f"h{i}", "question": f"P{i}",
+         "answer": f"R{i}", "line_reference": i, "category": "vacinas", "tags": [], "source": "",
+         "isActive": True, "embedding": [0.6, 0.8]}
+        for i in range(3)
+    ])
+    return db
+
+
+def test_copia_as_faqs_gravadas_da_origem_sem_parse(db):
+    reconciliador = Reconciliador(db.faqs, db.sync_metadata, usar_transacao=False)
+    copia = {"id": "copia", "name": "FAQ cópia.docx", "modifiedTime": "2026-01-05", "md5Checksum": "m1"}
+    desatualizada = {"id": "outra", "name": "FAQ outra.docx", "modifiedTime": "2026-01-05", "md5Checksum": "m2"}
+
+    gravados, sem_origem = copiar_duplicados(db.faqs, db.sync_metadata, reconciliador, [
+        {"arquivo": copia, "origem": "origem"}, {"arquivo": desatualizada, "origem": "mudou"}])
+
+    assert (gravados, sem_origem) == (3, [desatualizada])
+    copiados = list(db.faqs.find({"file_id": "copia"}))
+    assert sorted(d["content_hash"] for d in copiados) == ["h0", "h1", "h2"]
+    assert all(d["file_origin"] == "FAQ cópia.docx" and d["embedding"] == [0.6, 0.8] for d in copiados)
+    assert db.faqs.count_documents({"file_id": "origem"}) == 3
+    assert db.sync_metadata.find_one({"file_id": "copia"})["md5_checksum"] == "m1"
@@ -0,0 +1,74 @@
+import math
+from types import SimpleNamespace as NS
+
+import pytest
+
+from lib.agendador_embedding import AgendadorEmbedding
+from lib.gemini_embendding import DIMENSAO_EMBEDDING, ServicoEmbedding, dividir_em_lotes
+
+
+class ModelosFalsos:
+    """Devolve sempre [3, 4] por texto, como um vetor truncado pelo output_dimensionality."""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def embed_content(self, model, contents, config):
+        self.chamadas += 1
+        textos = contents if isinstance(contents, list) else [contents]
+        return NS(embeddings=[NS(values=[3.0, 4.0]) for _ in textos])
+
+
+def servico_falso(dimensao):
+    servico = ServicoEmbedding(api_key="x", dimensao=dimensao)
+    servico._client = NS(models=ModelosFalsos(), close=lambda: None)
+    servico._configuracao = object()
+    return servico
+
+
+def test_servico_renormaliza_vetor_truncado():
+    assert servico_falso(768).gerar("dipirona") == pytest.approx([0.6, 0.8])
+
+
+def test_servico_mantem_vetor_completo():
+    assert servico_falso(DIMENSAO_EMBEDDING).gerar("dipirona") == [3.0, 4.0]
+
+
+def test_agendador_renormaliza_como_o_servico():
+    agendador = AgendadorEmbedding(servico_falso(768), rpm=6000, tpm=10 ** 6, concorrencia=2)
+    vetores = agendador.gerar(["a", "b", "c"])
+    assert all(v == pytest.approx([0.6, 0.8]) for v in vetores)
+    assert all(math.isclose(math.hypot(*v), 1.0) for v in vetores)
+
+
+def test_agendador_rejeita_texto_vazio():
+    agendador = AgendadorEmbedding(servico_falso(768), rpm=6000, tpm=10 ** 6)
+    with pytest.raises(ValueError):
+        agendador.gerar(["ok", "  "])
+
+
+def test_dividir_em_lotes_respeita_itens_e_tokens():
+    textos = ["x" * 40] * 5  # 10 tokens estimados cada
+    assert dividir_em_lotes(textos, max_itens=2, max_tokens=1000) == [[0, 1], [2, 3], [4]]
+    assert dividir_em_lotes(textos, max_itens=100, max_tokens=25) == [[0, 1], [2, 3], [4]]
+    assert dividir_em_lotes(["x" * 400], max_itens=10, max_tokens=5) == [[0]]
+
+
+def test_gerar_lote_agrupa_requisicoes_e_mantem_a_ordem():
+    servico = servico_falso(768)
+    servico.max_itens_por_lote = 2
+    enviados = []
+    original = servico.embed_content
+    servico.embed_content = lambda textos: enviados.append(textos) or original(textos)
+
+    assert len(servico.gerar_lote(["a", "b", "c", "d", "e"])) == 5
+    assert enviados == [["a", "b"], ["c", "d"], ["e"]]
+    assert servico._client.models.chamadas == 3  # Sempre o mesmo cliente
+
+
+def test_servico_fecha_o_cliente_ao_sair():
+    fechados = []
+    with servico_falso(768) as servico:
+        servico._client.close = lambda: fechados.append(True)
+        servico.gerar("dipirona")
+    assert fechados == [True] and servico._client is None
@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+import tests.falsos  # noqa: F401  (bulk_write com as operações do pymongo atual)
+from lib.indice_lexical import (B, K1, IndiceLexical, atualizar_arquivos, construir_indice, remover_arquivos,
+                                termos_ponderados, tokenizar)
+from tests.falsos import banco
+
+FAQS = [
+    {"_id": 1, "file_id": "f1", "question": "Quais os sintomas da dengue?", "tags": ["dengue"], "category": "Doenças"},
+    {"_id": 2, "file_id": "f1", "question": "Como tomar dipirona para febre?", "tags": ["febre", "dor"],
+     "category": "medicamentos"},
+    {"_id": 3, "file_id": "f2", "question": "A vacina da dengue é gratuita?", "tags": ["vacina"], "category": "vacinas"},
+    {"_id": 4, "file_id": "f2", "question": "Criança pode tomar a vacina da gripe?", "tags": [], "category": "vacinas"},
+]
+
+
+def indice(faqs=FAQS):
+    return IndiceLexical([{"faqs": [{"id": d["_id"], "c": d["category"].lower(), "t": termos_ponderados(d)}
+                                    for d in faqs]}])
+
+
+def bm25_ingenuo(faqs, consulta):
+    """BM25 direto da fórmula, sem listas invertidas, para conferir o índice."""
+    docs = {d["_id"]: termos_ponderados(d) for d in faqs}
+    media = sum(sum(t.values()) for t in docs.values()) / len(docs)
+    scores = {}
+    for id_doc, termos in docs.items():
+        score = 0.0
+        for termo in set(tokenizar(consulta)):
+            if termo not in termos:
+                continue
+            n_termo = sum(1 for t in docs.values() if termo in t)
+            idf = math.log(1 + (len(docs) - n_termo + 0.5) / (n_termo + 0.5))
+            f = termos[termo]
+            score += idf * f * (K1 + 1) / (f + K1 * (1 - B + B * sum(termos.values()) / media))
+        if score:
+            scores[id_doc] = score
+    return sorted(scores.items(), key=lambda par: par[1], reverse=True)
+
+
+def test_tokenizacao_sem_acento_e_sem_stopwords():
+    assert tokenizar("Quais os sintomas da Dengue?") == ["sintomas", "dengue"]
+    assert termos_ponderados(FAQS[0]) == {"sintomas": 3, "dengue": 5, "doencas": 1}
+
+
+@pytest.mark.parametrize("consulta", ["dengue", "vacina dengue", "tomar vacina gripe", "febre"])
+def test_scores_iguais_ao_bm25_da_formula(consulta):
+    resultado = indice().buscar(consulta, k=10)
+    esperado = bm25_ingenuo(FAQS, consulta)
+    assert [id_doc for id_doc, _ in resultado] == [id_doc for id_doc, _ in esperado]
+    assert [s for _, s in resultado] == pytest.approx([s for _, s in esperado])
+
+
+def test_erro_de_digitacao_e_filtro_de_categoria():
+    assert indice().buscar("dipirna", k=3)[0][0] == 2
+    assert [id_doc for id_doc, _ in indice().buscar("dengue", k=5, categoria=" Vacinas")] == [3]
+    assert indice().buscar("xyzw", k=5) == [] and len(IndiceLexical([])) == 0
+
+
+def test_indice_acompanha_as_faqs_ativas_gravadas():
+    db = banco()
+    db.faqs.insert_many([{**d, "isActive": True} for d in FAQS])
+    assert construir_indice(db.faqs, db.indice_lexical) == 4
+
+    db.faqs.update_one({"_id": 3}, {"$set": {"isActive": False}})
+    db.faqs.update_many({"file_id": "f1"}, {"$set": {"isActive": False}})
+    assert atualizar_arquivos(db.faqs, db.indice_lexical, ["f1", "f2", "f2"]) == 1
+    assert [e["_id"] for e in db.indice_lexical.find()] == ["f2"]
+    assert [id_doc for id_doc, _ in IndiceLexical.do_mongo(db.indice_lexical).buscar("vacina", k=5)] == [4]
+
+    remover_arquivos(db.indice_lexical, ["f2"])
+    assert db.indice_lexical.count_documents({}) == 0
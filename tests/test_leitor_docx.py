@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from lib.leitor_docx import iterar_paragrafos
+from lib.parser_faq import LEITOR_PYTHON_DOCX, LEITOR_RAPIDO, ler_paragrafos_docx
+
+
+def documento() -> bytes:
+    doc = docx.Document()
+    doc.add_heading("Vacinas", level=1)
+    doc.add_paragraph("P: Quem pode vacinar? R: Todos.")
+    doc.add_paragraph("")
+    doc.add_paragraph("Primeiro item", style="List Bullet")
+    doc.add_paragraph("Segundo item", style="List Number")
+    quebra = doc.add_paragraph("Antes")
+    quebra.add_run().add_tab()
+    quebra.add_run("depois").add_break()
+    quebra.add_run("fim")
+    doc.add_paragraph("• marcador digitado")
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "Dentro da tabela"
+    doc.add_paragraph("Legenda", style="Caption")
+    saida = io.BytesIO()
+    doc.save(saida)
+    return saida.getvalue()
+
+
+def test_mesmos_paragrafos_e_estilos_do_python_docx():
+    conteudo = documento()
+    esperados = [(p.text, p.style.name) for p in docx.Document(io.BytesIO(conteudo)).paragraphs]
+    assert [(p.texto, p.estilo) for p in iterar_paragrafos(conteudo)] == esperados
+
+
+def test_leitores_devolvem_o_mesmo_markdown():
+    conteudo = documento()
+    rapido = ler_paragrafos_docx(conteudo, leitor=LEITOR_RAPIDO)
+    assert rapido == ler_paragrafos_docx(conteudo, leitor=LEITOR_PYTHON_DOCX)
+    assert "- Primeiro item" in rapido and "- marcador digitado" in rapido
+    assert "Dentro da tabela" not in rapido
+
+
+def test_falha_do_leitor_rapido_cai_no_python_docx(monkeypatch):
+    def quebrado(origem):
+        origem.read()
+        raise ValueError("xml inesperado")
+        yield
+
+    monkeypatch.setattr("lib.parser_faq.iterar_paragrafos", quebrado)
+    conteudo = documento()
+    assert ler_paragrafos_docx(conteudo, leitor=LEITOR_RAPIDO) == ler_paragrafos_docx(conteudo, leitor=LEITOR_PYTHON_DOCX)
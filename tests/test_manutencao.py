@@ -0,0 +1,104 @@
+import pytest
+
+import limpar_banco
+from lib.coordenacao import (CHAVE_MANUTENCAO, PREFIXO_LEASE, PREFIXO_SINCRONIZACAO, manutencao_ativa,
+                             manutencao_exclusiva, sessao_sincronizacao, sincronizacoes_ativas)
+from lib.indice_lexical import COL_INDICE_LEXICAL
+from lib.orcamento_embedding import COL_BACKLOG
+from lib.troca_colecao import ID_ALIAS, colecao_ativa, remover_anterior, trocar_por_alias
+from tests.falsos import ColecaoComRelogio, banco
+
+
+def test_sincronizacao_recusa_comecar_durante_a_manutencao():
+    meta = ColecaoComRelogio()
+    with manutencao_exclusiva(meta, "limpeza"):
+        assert manutencao_ativa(meta) == "limpeza"
+        with pytest.raises(RuntimeError):
+            with sessao_sincronizacao(meta, "sync"):
+                pass
+        assert sincronizacoes_ativas(meta) == []
+    assert manutencao_ativa(meta) is None
+    with sessao_sincronizacao(meta, "sync"):
+        assert sincronizacoes_ativas(meta) == ["sync"]
+
+
+def test_sessao_apaga_o_proprio_lease_ao_sair():
+    meta = ColecaoComRelogio()
+    for _ in range(3):
+        with sessao_sincronizacao(meta):
+            assert len(sincronizacoes_ativas(meta)) == 1
+    assert meta.count_documents({"_id": {"$regex": f"^{PREFIXO_LEASE}{PREFIXO_SINCRONIZACAO}"}}) == 0
+
+
+def test_manutencao_espera_as_sincronizacoes_em_andamento():
+    meta = ColecaoComRelogio()
+    with sessao_sincronizacao(meta, "sync"):
+        with pytest.raises(TimeoutError):
+            with manutencao_exclusiva(meta, "limpeza", espera=0, intervalo=0):
+                pass
+    # Ao sair com erro, o lease de manutenção é solto e a próxima sincronização começa normalmente
+    assert manutencao_ativa(meta) is None
+
+
+def test_sincronizacao_que_morreu_deixa_de_bloquear_quando_o_lease_expira():
+    meta = ColecaoComRelogio()
+    sessao = sessao_sincronizacao(meta, "morta", duracao=60)
+    sessao.__enter__()  # Nunca sai: o processo "morreu"
+    assert sincronizacoes_ativas(meta) == ["morta"]
+    meta.avancar(61)
+    with manutencao_exclusiva(meta, "limpeza", espera=0, intervalo=0):
+        assert sincronizacoes_ativas(meta) == []
+
+
+def test_so_uma_manutencao_por_vez():
+    meta = ColecaoComRelogio()
+    with manutencao_exclusiva(meta, "a"):
+        with pytest.raises(RuntimeError):
+            with manutencao_exclusiva(meta, "b"):
+                pass
+
+
+def test_limpar_dados_mantem_alias_e_lease_e_esvazia_backlog():
+    db = banco()
+    db["faq_v2"].insert_many([{"_id": 1}, {"_id": 2}])
+    db[limpar_banco.COL_META].insert_many([
+        {"_id": ID_ALIAS, "colecao": "faq_v2"}, {"_id": PREFIXO_LEASE + CHAVE_MANUTENCAO, "dono": "eu"},
+        {"_id": "arquivo1", "file_id": "arquivo1"}, {"_id": PREFIXO_LEASE + "arquivo1", "versao_concluida": "v1"}])
+    db[COL_BACKLOG].insert_one({"content_hash": "h"})
+    db[COL_INDICE_LEXICAL].insert_one({"_id": "arquivo1", "faqs": []})
+
+    limpar_banco.limpar_dados(db, "faq_v2")
+
+    assert db["faq_v2"].count_documents({}) == 0
+    assert sorted(d["_id"] for d in db[limpar_banco.COL_META].find()) == sorted(
+        [ID_ALIAS, PREFIXO_LEASE + CHAVE_MANUTENCAO])
+    assert db[COL_BACKLOG].count_documents({}) == 0
+    assert db[COL_INDICE_LEXICAL].count_documents({}) == 0
+
+
+def test_troca_por_alias_mantem_a_anterior_ate_ser_removida_explicitamente():
+    db = banco()
+    meta = db["sync_metadata"]
+    db["faq"].insert_one({"_id": 1})
+    db["faq_novo"].insert_one({"_id": 1})
+    assert colecao_ativa(meta, "faq") == "faq"
+    assert trocar_por_alias(db, meta, "faq_novo", "faq") == "faq"
+    assert colecao_ativa(meta, "faq") == "faq_novo"
+    assert "faq" in db.list_collection_names()
+
+    assert remover_anterior(db, meta) == "faq"
+    assert "faq" not in db.list_collection_names()
+    assert remover_anterior(db, meta) is None
+
+
+def test_troca_seguinte_remove_so_a_reserva_da_troca_passada():
+    db = banco()
+    meta = db["sync_metadata"]
+    for nome in ("faq", "faq_1", "faq_2", "faq_3"):
+        db[nome].insert_one({"_id": 1})
+    trocar_por_alias(db, meta, "faq_1", "faq")
+    trocar_por_alias(db, meta, "faq_2", "faq")
+    assert {"faq", "faq_1", "faq_2"} <= set(db.list_collection_names())  # O nome fixo nunca sai na troca
+    trocar_por_alias(db, meta, "faq_3", "faq")
+    assert "faq_1" not in db.list_collection_names()
+    assert {"faq", "faq_2", "faq_3"} <= set(db.list_collection_names())
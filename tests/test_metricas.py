@@ -0,0 +1,98 @@
+import json
+import logging
+import threading
+
+import pytest
+
+import lib.metricas as metricas_mod
+from lib.metricas import Histograma, MetricasExecucao, ProgressoAmostrado, iniciar_log_em_fila, parar_log_em_fila
+
+
+def test_histograma_acumula_buckets_no_estilo_prometheus():
+    h = Histograma((0.1, 1.0))
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        h.observar(valor)
+    assert h.cumulativos() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    resumo = h.para_dict()
+    assert (resumo["execucoes"], resumo["segundos_min"], resumo["segundos_max"]) == (4, 0.05, 3.0)
+    assert resumo["segundos_total"] == pytest.approx(3.65)
+
+
+def test_etapas_e_contadores_de_varias_threads():
+    metricas = MetricasExecucao("testes")
+
+    def trabalhar():
+        for _ in range(100):
+            with metricas.etapa("parse"):
+                pass
+            metricas.contar("faqs", 2)
+
+    threads = [threading.Thread(target=trabalhar) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with pytest.raises(RuntimeError):
+        with metricas.etapa("gravacao"):
+            raise RuntimeError("falhou")  # Também é medida
+
+    assert metricas.etapas["parse"].contagem == 400
+    assert metricas.etapas["gravacao"].contagem == 1
+    assert metricas.contadores == {"faqs": 800}
+
+
+def test_relatorios_json_e_prometheus(tmp_path):
+    metricas = MetricasExecucao("enviar_dados")
+    metricas.observar("download", 0.02)
+    metricas.contar("bytes_baixados", 1024)
+    metricas.sucesso = False
+    caminho_json, caminho_prom = metricas.salvar(str(tmp_path / "metricas"))
+
+    with open(caminho_json, encoding="utf-8") as f:
+        relatorio = json.load(f)
+    assert relatorio["etapas"]["download"]["execucoes"] == 1
+    assert relatorio["contadores"] == {"bytes_baixados": 1024} and relatorio["sucesso"] is False
+
+    with open(caminho_prom, encoding="utf-8") as f:
+        texto = f.read()
+    assert 'faq_sync_etapa_segundos_bucket{script="enviar_dados",etapa="download",le="0.025"} 1' in texto
+    assert 'faq_sync_etapa_segundos_count{script="enviar_dados",etapa="download"} 1' in texto
+    assert 'faq_sync_bytes_baixados{script="enviar_dados"} 1024' in texto
+    assert 'faq_sync_sucesso{script="enviar_dados"} 0' in texto
+    assert not (tmp_path / "metricas" / "enviar_dados.prom.tmp").exists()
+
+
+def test_progresso_loga_por_fracao_e_no_fim(monkeypatch, caplog):
+    agora = [0.0]
+    monkeypatch.setattr(metricas_mod.time, "monotonic", lambda: agora[0])
+    progresso = ProgressoAmostrado(100, fracao=0.25, intervalo=1000)
+    with caplog.at_level(logging.INFO, logger="lib.metricas"):
+        for _ in range(100):
+            agora[0] += 0.1
+            progresso.avancar()
+    assert [r.getMessage().split()[1] for r in caplog.records] == ["25/100", "50/100", "75/100", "100/100"]
+
+
+def test_log_em_fila_entrega_tudo_e_devolve_os_handlers():
+    raiz = logging.getLogger()
+    registros = []
+
+    class Coletor(logging.Handler):
+        def emit(self, record):
+            registros.append(record.getMessage())
+
+    coletor = Coletor()
+    raiz.addHandler(coletor)
+    nivel = raiz.level
+    raiz.setLevel(logging.INFO)
+    try:
+        ouvinte = iniciar_log_em_fila()
+        assert coletor not in raiz.handlers
+        for i in range(50):
+            logging.getLogger("testes").info(f"linha {i}")
+        parar_log_em_fila(ouvinte)
+        assert coletor in raiz.handlers
+        assert registros == [f"linha {i}" for i in range(50)]
+    finally:
+        raiz.removeHandler(coletor)
+        raiz.setLevel(nivel)
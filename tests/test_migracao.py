@@ -0,0 +1,69 @@
+from lib.migracao_embedding import (ESTADO_CONCLUIDA, carregar_migracao, concluir_migracao, garantir_indice_destino,
+                                    iniciar_migracao, medir_cobertura, perfil_destino, perfil_em_uso)
+from lib.perfil_embedding import ID_PERFIL_ATIVO, PerfilEmbedding, carregar_perfil
+from lib.vetores import FORMATO_FLOAT32, FORMATO_INT8, FORMATO_LISTA, codificar
+from tests.falsos import banco
+
+
+class ColecaoComIndices:
+    """FAQs no mongomock com os índices de busca do Atlas guardados em memória."""
+
+    def __init__(self, colecao):
+        self.colecao = colecao
+        self.indices = {}
+
+    def __getattr__(self, nome):
+        return getattr(self.colecao, nome)
+
+    def list_search_indexes(self):
+        return [{"name": nome, "latestDefinition": definicao} for nome, definicao in self.indices.items()]
+
+    def create_search_index(self, model):
+        self.indices[model.document["name"]] = model.document["definition"]
+
+    def drop_search_index(self, nome):
+        del self.indices[nome]
+
+
+def test_destino_alterna_campo_e_indice_entre_migracoes():
+    origem = PerfilEmbedding()
+    destino = perfil_destino(origem, PerfilEmbedding(dimensao=768, formato=FORMATO_INT8))
+    assert (destino.campo, destino.indice, destino.dimensao) == ("embedding_v2", "vector_index_v2", 768)
+    volta = perfil_destino(destino, PerfilEmbedding(dimensao=1536))
+    assert (volta.campo, volta.indice) == ("embedding", "vector_index")
+
+
+def test_perfil_em_uso_deduzido_dos_vetores_gravados(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_DIMENSAO", "768")
+    db = banco()
+    assert perfil_em_uso(db.faqs, db.sync_metadata).dimensao == 768  # Banco vazio: vale o .env
+    db.faqs.insert_one({"embedding": codificar([0.1] * 1536, FORMATO_INT8)})
+    perfil = perfil_em_uso(db.faqs, db.sync_metadata)
+    assert (perfil.dimensao, perfil.formato) == (1536, FORMATO_INT8)
+    db.faqs.replace_one({}, {"embedding": [0.1] * 3072})
+    assert perfil_em_uso(db.faqs, db.sync_metadata).formato == FORMATO_LISTA
+
+
+def test_ciclo_da_migracao_em_dois_campos():
+    db = banco()
+    faqs = ColecaoComIndices(db.faqs)
+    origem = PerfilEmbedding(dimensao=3072, formato=FORMATO_FLOAT32)
+    destino = perfil_destino(origem, PerfilEmbedding(dimensao=768))
+    faqs.indices[origem.indice] = origem.definicao_indice()
+    db.faqs.insert_many([{"_id": i, "embedding": [0.1], "embedding_v2": [0.2] if i < 3 else None} for i in range(4)])
+
+    iniciar_migracao(db.sync_metadata, origem, destino)
+    garantir_indice_destino(faqs, destino)
+    garantir_indice_destino(faqs, destino)
+    assert carregar_migracao(db.sync_metadata)["destino"] == destino
+    assert carregar_perfil(db.sync_metadata) == origem  # Busca e sincronizador seguem no campo antigo
+    assert set(faqs.indices) == {"vector_index", "vector_index_v2"}
+    assert medir_cobertura(db.faqs, destino) == {"total": 4, "migrados": 3, "faltantes": 1, "cobertura": 75.0}
+
+    concluir_migracao(faqs, db.sync_metadata, origem, destino)
+    assert carregar_perfil(db.sync_metadata) == destino
+    assert carregar_migracao(db.sync_metadata) is None
+    assert db.sync_metadata.find_one({"_id": "migracao_embedding"})["estado"] == ESTADO_CONCLUIDA
+    assert db.faqs.count_documents({"embedding": {"$exists": True}}) == 0
+    assert set(faqs.indices) == {"vector_index_v2"}
+    assert db.sync_metadata.find_one({"_id": ID_PERFIL_ATIVO})["campo"] == "embedding_v2"
@@ -0,0 +1,73 @@
+import pytest
+
+import tests.falsos  # noqa: F401  (bulk_write com as operações do pymongo atual)
+from lib.orcamento_embedding import (POLITICA_PRIORIDADE, POLITICA_RECENCIA, AlocadorOrcamento,
+                                     BacklogEmbeddings)
+from lib.repositorio_embeddings import RepositorioEmbeddings
+from tests.falsos import banco
+from tests.test_backfill import PERFIL, AgendadorFalso
+
+
+def arquivo(file_id, pasta, nome=None, modificado="2026-01-01"):
+    return {"id": file_id, "pasta": pasta, "name": nome or f"FAQ {file_id}.docx", "modifiedTime": modificado}
+
+
+def test_divide_igual_entre_subpastas_e_depois_entre_arquivos():
+    alocador = AlocadorOrcamento(12)
+    alocador.planejar([arquivo("a", "vacinas"), arquivo("b1", "remedios"), arquivo("b2", "remedios"),
+                       arquivo("b3", "remedios")])
+    assert alocador.cotas == {"a": 6, "b1": 2, "b2": 2, "b3": 2}
+    assert alocador.prioridade("a") == 2.0 and alocador.prioridade("b1") == pytest.approx(0.6667)
+
+    assert alocador.reservar("b1", 5) == 2  # Passou da cota: o resto vai para o backlog
+    assert alocador.reservar("desconhecido", 1) == 0
+    assert alocador.consumir(100) == 10 and alocador.restante == 0
+    alocador.devolver(3)
+    assert alocador.restante == 3
+
+
+def test_recencia_e_prioridade_mudam_os_pesos():
+    arquivos = [arquivo("velho", "x", modificado="2026-01-01"), arquivo("novo", "x", modificado="2026-03-01")]
+    recencia = AlocadorOrcamento(30, POLITICA_RECENCIA)
+    recencia.planejar(arquivos)
+    assert recencia.cotas == {"novo": 20, "velho": 10}
+
+    prioridade = AlocadorOrcamento(50, POLITICA_PRIORIDADE, prioridades=["Vacinas "])
+    prioridade.planejar([arquivo("v", "x", nome="FAQ VACINAS.docx"), arquivo("m", "x", nome="FAQ MEDICAMENTOS.docx")])
+    assert prioridade.cotas == {"v": 40, "m": 10}
+
+    with pytest.raises(ValueError):
+        AlocadorOrcamento(10, "aleatoria")
+
+
+def test_backlog_guarda_a_maior_prioridade_e_alterna_categorias():
+    backlog = BacklogEmbeddings(banco().embedding_backlog, PERFIL.modelo, PERFIL.dimensao)
+    backlog.enfileirar([{"content_hash": h, "texto": h, "category": c, "priority": p}
+                        for h, c, p in [("v1", "vacinas", 1.0), ("v2", "vacinas", 1.0), ("v3", "vacinas", 1.0),
+                                        ("m1", "remedios", 1.0), ("u1", "urgente", 2.0)]])
+    backlog.enfileirar([{"content_hash": "v3", "texto": "v3", "category": "vacinas", "priority": 0.5}])
+
+    assert backlog.tamanho() == 5
+    assert [c["content_hash"] for c in backlog.candidatos(10)] == ["u1", "v1", "m1", "v2", "v3"]
+    assert BacklogEmbeddings(backlog.collection, PERFIL.modelo, 768).tamanho() == 0
+
+
+def test_drenar_gera_reaproveita_e_descarta_sem_passar_do_orcamento():
+    db = banco()
+    db.faqs.insert_many([{"content_hash": h, PERFIL.campo: None} for h in ("novo1", "novo2", "novo3", "armazem")]
+                        + [{"content_hash": "ja_tem", PERFIL.campo: [1.0, 0.0]}])
+    repositorio = RepositorioEmbeddings(db.embedding_store, PERFIL.modelo, PERFIL.dimensao)
+    repositorio.salvar({"armazem": [0.0, 1.0]})
+    backlog = BacklogEmbeddings(db.embedding_backlog, PERFIL.modelo, PERFIL.dimensao)
+    backlog.enfileirar([{"content_hash": h, "texto": f"texto {h}", "priority": p}
+                        for h, p in [("ja_tem", 3.0), ("armazem", 2.0), ("novo1", 1.0), ("novo2", 1.0), ("novo3", 1.0)]])
+    agendador = AgendadorFalso()
+    alocador = AlocadorOrcamento(2)
+
+    resultado = backlog.drenar(db.faqs, agendador, repositorio, PERFIL, limite=10, alocador=alocador)
+
+    assert resultado == {"gerados": 2, "reaproveitados": 1, "descartados": 1, "documentos": 3}
+    assert agendador.gerados == ["texto novo1", "texto novo2"]
+    assert [c["content_hash"] for c in backlog.candidatos(10)] == ["novo3"]
+    assert db.faqs.find_one({"content_hash": "armazem"})[PERFIL.campo] == [0.0, 1.0]
+    assert db.faqs.count_documents({PERFIL.campo: None}) == 1
@@ -0,0 +1,42 @@
+import pytest
+
+from lib.parser_faq import _normalizar_unicode, categoria_do_nome, extrair_faqs, normalizar_para_busca
+
+
+def test_pergunta_e_resposta_na_mesma_linha():
+    resultado = extrair_faqs(["P: Posso tomar dipirona? R: Sim, com orientação. TAGS: dor, febre FONTE: Bula."], "medicamentos")
+    [faq] = resultado.faqs
+    assert faq.pergunta == "Posso tomar dipirona?"
+    assert faq.resposta == "Sim, com orientação."
+    assert faq.tags == ["dor", "febre"]
+    assert faq.fonte == "Bula"
+    assert (faq.categoria, faq.linha) == ("medicamentos", 1)
+    assert resultado.avisos == []
+
+
+def test_pergunta_e_resposta_em_linhas_separadas_com_metadados_na_seguinte():
+    resultado = extrair_faqs(["[ASSUNTO: Vacinas]", "1. P: Quem pode vacinar?", "R: Todos acima de 6 meses.",
+                              "TAGS: #vacina, #idade"])
+    [faq] = resultado.faqs
+    assert (faq.pergunta, faq.resposta, faq.categoria) == ("Quem pode vacinar?", "Todos acima de 6 meses.", "vacinas")
+    assert faq.tags == ["vacina", "idade"]
+    assert faq.linha == 3
+
+
+def test_avisos_de_resposta_sem_pergunta_e_pergunta_sem_resposta():
+    resultado = extrair_faqs(["R: Solta.", "P: Ficou sem resposta?"])
+    assert resultado.faqs == []
+    assert [(a.linha, a.mensagem) for a in resultado.avisos] == [
+        (1, "Resposta sem pergunta correspondente"),
+        (2, "Pergunta ficou sem resposta (R:)"),
+    ]
+
+
+@pytest.mark.parametrize("texto", ["Vacinação  contra a GRIPE?", "Ação — é  só ¨teste¨!", "  ", "Ñandú ǅ ǈ", "Ɓ 中文 ✓",
+                                   "“Posso” tomar – é d’água…", "a\u2002b\u200bc\u2028d ‰ ⁄ ‼"])
+def test_tabela_de_busca_igual_ao_caminho_completo(texto):
+    assert normalizar_para_busca(texto) == _normalizar_unicode(texto)
+
+
+def test_categoria_do_nome():
+    assert categoria_do_nome("FAQ VACINAS.docx") == "vacinas"
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ("pymongo", "google.genai", "googleapiclient", "docx")
+
+
+def _rodar(codigo, cwd=RAIZ, **env):
+    ambiente = {**os.environ, "PYTHONPATH": RAIZ, **env}
+    return subprocess.run([sys.executable, "-c", codigo], cwd=cwd, env=ambiente, capture_output=True, text=True)
+
+
+def test_importar_enviar_dados_nao_carrega_os_sdks():
+    resultado = _rodar(f"import sys, enviar_dados; print(sorted(m for m in sys.modules for p in {PESADOS!r} "
+                       f"if m == p or m.startswith(p + '.')))")
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip() == "[]"
+
+
+def test_check_nao_abre_conexao_nem_arquivo_de_log(tmp_path):
+    credenciais = tmp_path / "credentials.json"
+    credenciais.write_text("{}")
+    resultado = _rodar("import sys, enviar_dados; enviar_dados.main(['--check']); "
+                       "print('pymongo' in sys.modules)", cwd=tmp_path, FILE_CREDENTIALS=str(credenciais))
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip() == "False"
+    assert not (tmp_path / "sync_ms_inteligente.log").exists()
@@ -0,0 +1,36 @@
+import os
+import threading
+
+from lib.agendador_embedding import AgendadorEmbedding
+from lib.metricas import MetricasExecucao
+from lib.perfilador import Perfilador
+from tests.test_embedding import servico_falso
+
+
+def test_agendador_sem_pool_roda_na_thread_de_quem_chama():
+    threads = set()
+    servico = servico_falso(768)
+    original = servico.embed_content
+
+    def registrar(*args, **kwargs):
+        threads.add(threading.get_ident())
+        return original(*args, **kwargs)
+
+    servico.embed_content = registrar
+    agendador = AgendadorEmbedding(servico, rpm=6000, tpm=10 ** 6, concorrencia=1)
+    assert len(agendador.gerar(["a", "b", "c"])) == 3
+    assert threads == {threading.get_ident()}
+
+
+def test_etapas_em_serie_ganham_o_proprio_perfil(tmp_path):
+    metricas = MetricasExecucao("testes")
+    perfilador = metricas.perfilador = Perfilador(str(tmp_path), "testes")
+    agendador = AgendadorEmbedding(servico_falso(768), rpm=6000, tpm=10 ** 6, concorrencia=1, metricas=metricas)
+    with perfilador:
+        with metricas.etapa("embedding", "faq.docx"):
+            agendador.gerar(["a", "b"])
+
+    assert perfilador.sem_perfil == 0
+    assert {"execucao", "embedding", "embedding_api"} <= set(perfilador.por_etapa)
+    assert "faq.docx" in perfilador.por_arquivo
+    assert os.path.exists(os.path.join(perfilador.pasta, "etapa_embedding_api.prof"))
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from lib.pipeline_sync import ConfigPipeline, PipelineSync
+
+
+def extrair(trabalho):
+    """No nível do módulo: em processos, a função vai por pickle."""
+    if trabalho["conteudo"] == "quebrado":
+        raise ValueError("docx inválido")
+    return {**trabalho, "itens": [f"{trabalho['arquivo']['name']}#{i}" for i in range(3)]}
+
+
+def trabalhos(n):
+    return [{"arquivo": {"id": str(i), "name": f"FAQ {i}.docx"}} for i in range(n)]
+
+
+class Etapas:
+    def __init__(self, falha_download=(), falha_gravacao=()):
+        self.falha_download = set(falha_download)
+        self.falha_gravacao = set(falha_gravacao)
+        self.lotes_embedding = []
+        self.lotes_gravacao = []
+        self.gravados = []
+        self._lock = threading.Lock()
+
+    def baixar(self, trabalho):
+        nome = trabalho["arquivo"]["name"]
+        if nome in self.falha_download:
+            raise IOError("download interrompido")
+        return {**trabalho, "conteudo": "quebrado" if nome == "FAQ quebrado.docx" else nome}
+
+    def embutir(self, lote):
+        with self._lock:
+            self.lotes_embedding.append(len(lote))
+        for trabalho in lote:
+            trabalho["vetores"] = len(trabalho["itens"])
+
+    def gravar(self, lote):
+        if any(t["arquivo"]["name"] in self.falha_gravacao for t in lote):
+            raise RuntimeError("bulk_write falhou")
+        with self._lock:
+            self.lotes_gravacao.append(len(lote))
+            self.gravados.extend(t["arquivo"]["name"] for t in lote if t["vetores"] == 3)
+
+
+def executar(config, etapas, lista):
+    pipeline = PipelineSync(etapas.baixar, extrair, etapas.embutir, etapas.gravar, config)
+    pipeline.executar(iter(lista))
+    return pipeline
+
+
+@pytest.mark.parametrize("config", [
+    ConfigPipeline(modo_serial=True),
+    ConfigPipeline(downloads_paralelos=3, parsers_paralelos=2, tamanho_fila=2, parser_em_processos=False),
+    ConfigPipeline(downloads_paralelos=2, parsers_paralelos=2, parser_em_processos=True),
+], ids=["serial", "threads", "processos"])
+def test_todos_os_arquivos_passam_por_todas_as_etapas(config):
+    etapas = Etapas()
+    pipeline = executar(config, etapas, trabalhos(12))
+    assert sorted(etapas.gravados) == sorted(f"FAQ {i}.docx" for i in range(12))
+    assert pipeline.falhas == []
+
+
+def test_lotes_respeitam_os_limites():
+    etapas = Etapas()
+    config = ConfigPipeline(downloads_paralelos=4, parsers_paralelos=2, itens_por_lote_embedding=6,
+                            arquivos_por_lote_gravacao=4, parser_em_processos=False)
+    executar(config, etapas, trabalhos(20))
+    assert sum(etapas.lotes_embedding) == 20 and max(etapas.lotes_embedding) <= 2
+    assert sum(etapas.lotes_gravacao) == 20 and max(etapas.lotes_gravacao) <= 4
+
+
+@pytest.mark.parametrize("serial", [True, False])
+def test_falha_em_um_arquivo_nao_para_os_outros(serial):
+    etapas = Etapas(falha_download={"FAQ 1.docx"})
+    lista = trabalhos(4) + [{"arquivo": {"id": "q", "name": "FAQ quebrado.docx"}}]
+    config = ConfigPipeline(modo_serial=serial, parser_em_processos=False)
+    pipeline = executar(config, etapas, lista)
+    assert sorted(pipeline.falhas) == ["FAQ 1.docx", "FAQ quebrado.docx"]
+    assert sorted(etapas.gravados) == ["FAQ 0.docx", "FAQ 2.docx", "FAQ 3.docx"]
+
+
+def test_falha_na_gravacao_descarta_o_lote_inteiro():
+    etapas = Etapas(falha_gravacao={"FAQ 0.docx"})
+    pipeline = executar(ConfigPipeline(modo_serial=True), etapas, trabalhos(3))
+    assert pipeline.falhas == ["FAQ 0.docx"]
+    assert etapas.gravados == ["FAQ 1.docx", "FAQ 2.docx"]
+
+
+@pytest.mark.parametrize("serial", [True, False])
+def test_falha_ao_percorrer_os_trabalhos_encerra_o_pipeline_com_erro(serial):
+    def reivindicados():
+        yield from trabalhos(3)
+        raise ConnectionError("Mongo fora do ar")
+
+    etapas = Etapas()
+    pipeline = PipelineSync(etapas.baixar, extrair, etapas.embutir, etapas.gravar,
+                            ConfigPipeline(modo_serial=serial, parser_em_processos=False))
+    with pytest.raises(ConnectionError):
+        pipeline.executar(reivindicados())
+    assert sorted(etapas.gravados) == ["FAQ 0.docx", "FAQ 1.docx", "FAQ 2.docx"]
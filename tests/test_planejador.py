@@ -0,0 +1,54 @@
+from lib.planejador import carregar_metadados, estimar_embeddings, montar_plano
+from tests.falsos import banco
+
+
+def arquivo(file_id, modificado="2026-01-02", nome=None, md5=None):
+    arq = {"id": file_id, "name": nome or f"FAQ {file_id}.docx", "modifiedTime": modificado}
+    if md5:
+        arq["md5Checksum"] = md5
+    return arq
+
+
+def meta(file_id, modificado="2026-01-01", nome=None, md5=None):
+    return {"file_id": file_id, "last_modified": modificado, "file_name": nome or f"FAQ {file_id}.docx",
+            "md5_checksum": md5}
+
+
+def ids(lista):
+    return [arq["id"] for arq in lista]
+
+
+def test_separa_pular_tocar_e_reprocessar():
+    metadados = {m["file_id"]: m for m in [
+        meta("igual", modificado="2026-01-02", md5="a"),
+        meta("so_data", md5="b"),
+        meta("renomeado", modificado="2026-01-02", nome="antigo.docx", md5="c"),
+        meta("mudou", md5="d"),
+    ]}
+    plano = montar_plano([arquivo("igual", md5="a"), arquivo("so_data", md5="b"), arquivo("renomeado", md5="c"),
+                          arquivo("mudou", md5="novo"), arquivo("novo", md5="e")], metadados)
+    assert ids(plano["pular"]) == ["igual"]
+    assert ids(plano["tocar"]) == ["so_data", "renomeado"]
+    assert ids(plano["reprocessar"]) == ["mudou", "novo"]
+    assert plano["duplicados"] == []
+
+
+def test_sem_md5_decide_pela_data():
+    metadados = {"doc": meta("doc", modificado="2026-01-02")}
+    assert ids(montar_plano([arquivo("doc")], metadados)["pular"]) == ["doc"]
+    assert ids(montar_plano([arquivo("doc", modificado="2026-02-01")], metadados)["reprocessar"]) == ["doc"]
+
+
+def test_carrega_metadados_em_uma_consulta_por_id_ou_checksum():
+    col_meta = banco().sync_metadata
+    col_meta.insert_many([meta("a", md5="x"), meta("b", md5="y"), meta("c", md5="z"), {"_id": "checkpoint"}])
+    assert set(carregar_metadados(col_meta)) == {"a", "b", "c"}
+    assert set(carregar_metadados(col_meta, file_ids=["a"], checksums=["z", None])) == {"a", "c"}
+
+
+def test_estimativa_conta_so_o_que_falta_no_cache():
+    itens = [{"content_hash": h, "question": "Pergunta?", "answer": "Resposta."} for h in ("h1", "h2", "h2", "h3")]
+    estimativa = estimar_embeddings(itens, {"h1": [0.1]})
+    assert (estimativa["itens"], estimativa["reutilizados"], estimativa["novos"]) == (4, 1, 2)
+    assert estimativa["requisicoes"] == 1
+    assert estimativa["tokens"] > 0 and estimativa["custo_usd"] > 0
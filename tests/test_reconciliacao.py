@@ -0,0 +1,55 @@
+import pytest
+
+import tests.falsos  # noqa: F401  (bulk_write com as operações do pymongo atual)
+from lib.reconciliacao import Reconciliador, diferenca_arquivo
+from tests.falsos import banco
+
+
+def item(hash_, linha=1, categoria="vacinas", embedding=(0.6, 0.8), file_id="f1"):
+    return {"file_id": file_id, "content_hash": hash_, "question": f"P {hash_}", "answer": f"R {hash_}",
+            "line_reference": linha, "category": categoria, "tags": [], "source": "", "file_origin": "FAQ.docx",
+            "isActive": True, "embedding": list(embedding) if embedding else None}
+
+
+def gravado(_id, hash_, tem_embedding=True, **campos):
+    doc = {k: v for k, v in item(hash_, **campos).items() if k not in ("question", "answer", "embedding")}
+    return {"_id": _id, **doc, "tem_embedding": tem_embedding}
+
+
+def test_so_gera_as_operacoes_que_mudaram():
+    existentes = [gravado(1, "a"), gravado(2, "b", linha=2), gravado(3, "sumiu", linha=3), gravado(4, "sem_vetor",
+                                                                                                  tem_embedding=False)]
+    itens = [item("a"), item("b", linha=5), item("novo", linha=6), item("sem_vetor")]
+    operacoes, contagem = diferenca_arquivo(existentes, itens)
+
+    assert contagem == {"inseridos": 1, "atualizados": 2, "removidos": 1, "inalterados": 1}
+    por_tipo = {}
+    for op in operacoes:
+        por_tipo.setdefault(type(op).__name__, []).append(op)
+    assert por_tipo["InsertOne"][0]._doc["content_hash"] == "novo"
+    assert por_tipo["DeleteOne"][0]._filter == {"_id": 3}
+    atualizacoes = {op._filter["_id"]: op._doc["$set"] for op in por_tipo["UpdateOne"]}
+    assert set(atualizacoes[2]) == {"line_reference", "updatedAt"}
+    assert atualizacoes[4]["embedding"] == pytest.approx([0.6, 0.8])
+
+
+def test_hash_repetido_pareia_um_a_um():
+    operacoes, contagem = diferenca_arquivo([gravado(1, "x")], [item("x"), item("x")])
+    assert contagem == {"inseridos": 1, "atualizados": 0, "removidos": 0, "inalterados": 1}
+
+
+def test_tocar_atualiza_metadados_e_file_origin_dos_renomeados():
+    db = banco()
+    db.faqs.insert_many([{**item("a"), "file_origin": "FAQ.docx"},
+                         {**item("b", file_id="f2"), "file_origin": "Outro.docx"}])
+    db.sync_metadata.insert_many([{"file_id": "f1", "file_name": "FAQ.docx", "last_modified": "2026-01-01"},
+                                  {"file_id": "f2", "file_name": "Outro.docx", "last_modified": "2026-01-01"}])
+    Reconciliador(db.faqs, db.sync_metadata, usar_transacao=False).tocar([
+        {"id": "f1", "name": "FAQ novo.docx", "modifiedTime": "2026-01-02", "md5Checksum": "m1"},
+        {"id": "f2", "name": "Outro.docx", "modifiedTime": "2026-01-03"},
+    ])
+
+    assert {d["file_id"]: d["file_origin"] for d in db.faqs.find()} == {"f1": "FAQ novo.docx", "f2": "Outro.docx"}
+    metas = {d["file_id"]: d for d in db.sync_metadata.find()}
+    assert (metas["f1"]["file_name"], metas["f1"]["md5_checksum"]) == ("FAQ novo.docx", "m1")
+    assert metas["f2"]["last_modified"] == "2026-01-03" and "md5_checksum" not in metas["f2"]
@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import lib.recuperacao as recuperacao
+from lib.busca_local import IndiceLocal
+from lib.perfil_embedding import PerfilEmbedding
+from lib.recuperacao import CacheConsultas, ClienteEmbeddingConsultas, Recuperador, fundir_rrf
+from tests.falsos import banco
+
+
+class ServicoFalso:
+    def __init__(self, vetores=None, erro=None):
+        self.vetores = vetores or {}
+        self.erro = erro
+        self.perguntas = []
+
+    def gerar(self, pergunta):
+        self.perguntas.append(pergunta)
+        if self.erro:
+            raise self.erro
+        return self.vetores.get(pergunta, [1.0, 0.0])
+
+
+class LexicalFalso:
+    def __init__(self, ranking):
+        self.ranking = ranking
+
+    def buscar(self, pergunta, k, categoria=None):
+        return self.ranking[:k]
+
+
+def test_rrf_premia_quem_aparece_nas_duas_listas():
+    a, b, c = ({"_id": i, "question": i} for i in "abc")
+    resultado = fundir_rrf({"vetorial": [(a, 0.9), (b, 0.8)], "lexical": [(b, 7.0), (c, 5.0)]}, k=3)
+    assert [r.id for r in resultado] == ["b", "a", "c"]
+    assert resultado[0].origens == ["vetorial", "lexical"]
+    assert (resultado[0].score_vetorial, resultado[0].score_lexical) == (0.8, 7.0)
+    assert resultado[0].score == pytest.approx(1 / 62 + 1 / 61)
+    assert len(fundir_rrf({"vetorial": [(a, 1.0), (b, 1.0)]}, k=1)) == 1
+
+
+def test_cache_de_consultas_lru_com_validade(monkeypatch):
+    agora = [0.0]
+    monkeypatch.setattr(recuperacao.time, "monotonic", lambda: agora[0])
+    cache = CacheConsultas(capacidade=2, ttl_segundos=10)
+    cache.guardar("a", [1.0])
+    cache.guardar("b", [2.0])
+    assert cache.obter("a") == [1.0]
+    cache.guardar("c", [3.0])  # "b" era o menos usado
+    assert cache.obter("b") is None and len(cache) == 2
+    agora[0] = 11
+    assert cache.obter("a") is None and len(cache) == 1
+    assert (cache.acertos, cache.faltas) == (1, 2)
+
+
+def test_perguntas_iguais_sem_acento_nao_chamam_a_api_de_novo():
+    servico = ServicoFalso()
+    cliente = ClienteEmbeddingConsultas(servico)
+    cliente.embutir("Dengue: sintomas?")
+    cliente.embutir("dengue   SINTOMAS")
+    assert cliente.chamadas_api == 1
+    with pytest.raises(ValueError):
+        cliente.embutir("?!")
+
+
+def preparar(servico):
+    col = banco().faqs
+    docs = [{"_id": str(i), "question": f"Pergunta {i}", "answer": f"Resposta {i}", "category": "vacinas",
+             "isActive": i != 3} for i in range(4)]
+    col.insert_many(docs)
+    vetores = np.array([[1.0, 0.0], [0.8, 0.6], [0.0, 1.0], [0.9, 0.1]], dtype=np.float32)
+    indice = IndiceLocal(vetores, [dict(d) for d in docs])
+    lexical = LexicalFalso([("1", 9.0), ("3", 8.0), ("2", 4.0)])  # "3" já foi desativado no banco
+    return Recuperador(col, ClienteEmbeddingConsultas(servico), PerfilEmbedding(dimensao=768),
+                       indice_local=indice, indice_lexical=lexical)
+
+
+def test_busca_hibrida_funde_vetorial_e_lexical():
+    resultados = preparar(ServicoFalso()).buscar("vacina", k=3)
+    assert [r.id for r in resultados] == ["1", "2", "0"]
+    assert resultados[0].origens == ["vetorial", "lexical"]
+    assert all(r.id != "3" for r in resultados)
+
+
+def test_sem_gemini_segue_so_com_a_lexical():
+    resultados = preparar(ServicoFalso(erro=RuntimeError("cota"))).buscar("vacina", k=3)
+    assert [r.id for r in resultados] == ["1", "2"]
+    assert all(r.origens == ["lexical"] for r in resultados)
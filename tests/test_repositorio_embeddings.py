@@ -0,0 +1,40 @@
+import pytest
+
+import tests.falsos  # noqa: F401  (bulk_write com as operações do pymongo atual)
+from lib.repositorio_embeddings import RepositorioEmbeddings, gerar_hash_conteudo
+from lib.vetores import FORMATO_INT8, codificar, decodificar
+from tests.falsos import banco
+
+
+def test_hash_muda_com_o_conteudo():
+    assert gerar_hash_conteudo("P", "R") == gerar_hash_conteudo("P", "R")
+    assert gerar_hash_conteudo("P", "R") != gerar_hash_conteudo("P", "R.")
+
+
+def test_vetores_separados_por_modelo_e_dimensao_sem_sobrescrever():
+    colecao = banco().embedding_store
+    r3 = RepositorioEmbeddings(colecao, "gemini-embedding-001", 3)
+    r2 = RepositorioEmbeddings(colecao, "gemini-embedding-001", 2)
+    r3.salvar({"h1": [0.0, 0.6, 0.8]})
+    r3.salvar({"h1": [1.0, 0.0, 0.0], "h2": [1.0, 0.0, 0.0]})  # h1 já existe: fica o primeiro
+
+    assert decodificar(r3.buscar(["h1", "h1", "h3"])["h1"]) == pytest.approx([0.0, 0.6, 0.8])
+    assert set(r3.carregar_todos()) == {"h1", "h2"}
+    assert r2.buscar(["h1"]) == {} and r2.carregar_todos() == {}
+
+
+def test_semeia_dimensao_menor_e_aproveita_so_vetores_com_precisao():
+    db = banco()
+    RepositorioEmbeddings(db.embedding_store, "gemini-embedding-001", 4).salvar({"maior": [3.0, 4.0, 9.0, 9.0]})
+    db.faqs.insert_many([
+        {"content_hash": "faq", "embedding": [0.0, 2.0]},
+        {"content_hash": "curto", "embedding": [1.0]},
+        {"content_hash": "int8", "embedding": codificar([0.6, 0.8], FORMATO_INT8)},
+        {"content_hash": "sem_vetor", "embedding": None},
+    ])
+    repositorio = RepositorioEmbeddings(db.embedding_store, "gemini-embedding-001", 2)
+
+    assert repositorio.semear_de(db.faqs) == 2
+    vetores = {h: decodificar(v) for h, v in repositorio.carregar_todos().items()}
+    assert vetores == {"maior": pytest.approx([0.6, 0.8]), "faq": pytest.approx([0.0, 2.0])}
+    assert repositorio.semear_de(db.faqs) == 0  # Só semeia um armazém vazio
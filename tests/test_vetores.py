@@ -0,0 +1,70 @@
+import math
+import random
+
+import pytest
+
+from lib.perfil_embedding import PerfilEmbedding, carregar_perfil, dimensao_do_indice, salvar_perfil_ativo
+from lib.vetores import (FORMATO_FLOAT32, FORMATO_INT8, FORMATO_LISTA, ajustar_dimensao, codificar, decodificar,
+                         dimensao_de, eh_int8, normalizar)
+from tests.falsos import banco
+
+
+def aleatorio(dimensao, semente=1):
+    rng = random.Random(semente)
+    return normalizar([rng.gauss(0, 1) for _ in range(dimensao)])
+
+
+def cosseno(a, b):
+    return math.fsum(x * y for x, y in zip(a, b)) / math.hypot(*a) / math.hypot(*b)
+
+
+def test_float32_ida_e_volta_preserva_o_vetor():
+    vetor = aleatorio(768)
+    gravado = codificar(vetor, FORMATO_FLOAT32)
+    assert not eh_int8(gravado) and dimensao_de(gravado) == 768
+    assert decodificar(gravado) == pytest.approx(vetor, abs=1e-7)
+    assert codificar(gravado, FORMATO_FLOAT32) is gravado  # Já no formato: sem recodificar
+    assert len(gravado) == 2 + 4 * 768
+
+
+def test_int8_ida_e_volta_preserva_o_cosseno():
+    vetor = aleatorio(768)
+    gravado = codificar(vetor, FORMATO_INT8)
+    assert eh_int8(gravado) and dimensao_de(gravado) == 768 and len(gravado) == 2 + 768
+    volta = decodificar(gravado)
+    assert math.isclose(math.hypot(*volta), 1.0)
+    assert cosseno(vetor, volta) > 0.999
+    assert codificar(codificar(vetor, FORMATO_FLOAT32), FORMATO_LISTA) == pytest.approx(vetor, abs=1e-7)
+
+
+def test_truncar_renormaliza_e_nao_amplia():
+    assert ajustar_dimensao([3.0, 4.0, 12.0], 2) == pytest.approx([0.6, 0.8])
+    with pytest.raises(ValueError):
+        ajustar_dimensao([1.0], 2)
+    assert normalizar([0.0, 0.0]) == [0.0, 0.0]
+
+
+def test_perfil_valida_dimensao_e_formato():
+    with pytest.raises(ValueError):
+        PerfilEmbedding(dimensao=64)
+    with pytest.raises(ValueError):
+        PerfilEmbedding(formato="float16")
+    perfil = PerfilEmbedding(dimensao=768, formato=FORMATO_INT8)
+    assert eh_int8(perfil.vetor_consulta(aleatorio(768)))
+    assert isinstance(PerfilEmbedding(dimensao=768).vetor_consulta(aleatorio(768)), list)
+
+
+def test_perfil_gravado_vale_mais_que_o_env(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_DIMENSAO", "1536")
+    col_meta = banco().sync_metadata
+    assert carregar_perfil(col_meta).dimensao == 1536
+    salvar_perfil_ativo(col_meta, PerfilEmbedding(dimensao=768, campo="embedding_768", indice="vector_index_768"))
+    perfil = carregar_perfil(col_meta)
+    assert (perfil.dimensao, perfil.campo, perfil.indice) == (768, "embedding_768", "vector_index_768")
+
+
+def test_dimensao_do_indice():
+    indice = {"name": "vector_index", "latestDefinition": PerfilEmbedding(dimensao=768).definicao_indice()}
+    assert dimensao_do_indice([indice]) == 768
+    assert dimensao_do_indice([indice], "outro") is None
+    assert dimensao_do_indice([{"name": "vector_index"}]) == 0